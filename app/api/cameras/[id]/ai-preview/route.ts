@@ -0,0 +1,30 @@
+import { NextRequest } from 'next/server';
+
+const DETECTION_SERVER_URL = `http://127.0.0.1:${process.env.DETECTION_SERVER_PORT || '8765'}`;
+
+// Annotated MJPEG preview from the detection server (boxes of the latest analysed frame drawn on).
+// The detector only renders while a viewer is connected; ?fps=N sets this viewer's frame rate.
+export async function GET(request: NextRequest, { params }: { params: { id: string } }) {
+  const cameraId = params.id;
+  const fps = request.nextUrl.searchParams.get('fps');
+  const previewUrl = `${DETECTION_SERVER_URL}/preview/${encodeURIComponent(cameraId)}${fps ? `?fps=${encodeURIComponent(fps)}` : ''}`;
+
+  try {
+    const response = await fetch(previewUrl, { cache: 'no-store', signal: request.signal });
+
+    if (!response.ok || !response.body) {
+      console.error(`[AI Preview][${cameraId}] Detection server error: ${response.status}`);
+      return new Response(`Preview error: ${response.status}`, { status: 502 });
+    }
+
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': response.headers.get('content-type') || 'multipart/x-mixed-replace; boundary=frame',
+        'Cache-Control': 'no-cache'
+      }
+    });
+  } catch (error: any) {
+    console.error(`[AI Preview][${cameraId}] Error:`, error.message);
+    return new Response(`Detection server not reachable: ${error.message}`, { status: 502 });
+  }
+}
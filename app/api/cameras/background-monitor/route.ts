@@ -8,7 +8,9 @@ class CameraStatusMonitor {
   private static instance: CameraStatusMonitor;
   private intervalId: NodeJS.Timeout | null = null;
   private isRunning = false;
-  private aiProcesses: Map<string, ChildProcess> = new Map(); // Track AI detection processes
+  private aiServer: ChildProcess | null = null; // Shared Python detection server (one model for all cameras)
+  private aiCameras: Set<string> = new Set(); // Cameras registered with the detection server
+  private aiServerUrl = `http://127.0.0.1:${process.env.DETECTION_SERVER_PORT || '8765'}`;
 
   private constructor() {}
 
@@ -58,85 +60,122 @@ class CameraStatusMonitor {
     return {
       running: this.isRunning,
       intervalId: !!this.intervalId,
-      aiProcessesRunning: this.aiProcesses.size,
-      monitoredCameras: Array.from(this.aiProcesses.keys())
+      aiServerRunning: !!this.aiServer,
+      aiCamerasMonitored: this.aiCameras.size,
+      monitoredCameras: Array.from(this.aiCameras)
     };
   }
 
   private stopAllAIProcesses() {
-    console.log(`🤖 Stopping ${this.aiProcesses.size} AI detection processes...`);
-    this.aiProcesses.forEach((process, cameraId) => {
+    console.log(`🤖 Stopping AI detection server (${this.aiCameras.size} cameras)...`);
+    if (this.aiServer) {
       try {
-        process.kill('SIGTERM');
-        console.log(`🛑 Stopped AI process for camera: ${cameraId}`);
+        this.aiServer.kill('SIGTERM');
+        console.log('🛑 Stopped AI detection server');
       } catch (error) {
-        console.error(`❌ Error stopping AI process for camera ${cameraId}:`, error);
+        console.error('❌ Error stopping AI detection server:', error);
       }
+      this.aiServer = null;
+    }
+    this.aiCameras.clear();
+  }
+
+  private ensureAIServer() {
+    if (this.aiServer) {
+      return;
+    }
+
+    // Path to the Python detection server (loads the model once for all cameras)
+    const pythonScript = path.join(process.cwd(), 'detection_server.py');
+    const pythonExecutable = path.join(process.cwd(), 'env', 'Scripts', 'python.exe');
+
+    console.log(`🐍 Python executable: ${pythonExecutable}`);
+    console.log(`📜 Script path: ${pythonScript}`);
+
+    const aiServer = spawn(pythonExecutable, [pythonScript], {
+      cwd: process.cwd(),
+      stdio: ['pipe', 'pipe', 'pipe'],
+      env: { ...process.env, PYTHONUNBUFFERED: '1' }
     });
-    this.aiProcesses.clear();
+
+    // Handle process output
+    aiServer.stdout.on('data', (data) => {
+      console.log(`🤖 AI: ${data.toString().trim()}`);
+    });
+
+    aiServer.stderr.on('data', (data) => {
+      console.error(`❌ AI Error: ${data.toString().trim()}`);
+    });
+
+    aiServer.on('close', (code) => {
+      console.log(`🤖 AI detection server exited with code: ${code}`);
+      this.aiServer = null;
+      this.aiCameras.clear(); // Cameras are re-registered once the server is back
+    });
+
+    aiServer.on('error', (error) => {
+      console.error('❌ Failed to start AI detection server:', error);
+      this.aiServer = null;
+      this.aiCameras.clear();
+    });
+
+    this.aiServer = aiServer;
+    console.log('✅ AI detection server started');
   }
 
   private async startAIDetection(camera: any) {
-    if (this.aiProcesses.has(camera._id.toString())) {
+    const cameraId = camera._id.toString();
+    if (this.aiCameras.has(cameraId)) {
       console.log(`🔄 AI detection already running for camera: ${camera.name}`);
       return; // Already running
     }
 
     try {
       console.log(`🤖 Starting AI detection for camera: ${camera.name}`);
-      
-      // Path to the Python AI detection script
-      const pythonScript = path.join(process.cwd(), 'mdl.py');
-      const pythonExecutable = path.join(process.cwd(), 'env', 'Scripts', 'python.exe');
-      
-      console.log(`🐍 Python executable: ${pythonExecutable}`);
-      console.log(`📜 Script path: ${pythonScript}`);
-      console.log(`📹 Stream URL: ${camera.streamUrl}`);
-      
-      // Spawn Python process for AI detection using virtual environment
-      const streamUrl = camera.streamUrl.endsWith('/video') ? camera.streamUrl : `${camera.streamUrl}/video`;
-      
-      const aiProcess = spawn(pythonExecutable, [
-        pythonScript,
-        camera._id.toString(), // camera_id
-        streamUrl, // stream_url with /video endpoint
-        camera.name, // camera_name
-        camera.location || 'Unknown Location' // location
-      ], {
-        cwd: process.cwd(),
-        stdio: ['pipe', 'pipe', 'pipe'],
-        env: { ...process.env, PYTHONUNBUFFERED: '1' }
-      });
-
-      // Handle process output
-      aiProcess.stdout.on('data', (data) => {
-        console.log(`🤖 AI[${camera.name}]: ${data.toString().trim()}`);
-      });
-
-      aiProcess.stderr.on('data', (data) => {
-        console.error(`❌ AI[${camera.name}] Error: ${data.toString().trim()}`);
-      });
+      this.ensureAIServer();
 
-      aiProcess.on('close', (code) => {
-        console.log(`🤖 AI process for ${camera.name} exited with code: ${code}`);
-        this.aiProcesses.delete(camera._id.toString());
+      const streamUrl = camera.streamUrl.endsWith('/video') ? camera.streamUrl : `${camera.streamUrl}/video`;
+      console.log(`📹 Stream URL: ${streamUrl}`);
+
+      // Register the camera with the running detection server
+      const response = await fetch(`${this.aiServerUrl}/cameras`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          cameraId,
+          streamUrl, // stream_url with /video endpoint
+          cameraName: camera.name,
+          location: camera.location || 'Unknown Location',
+          ...(camera.roi ? { roi: camera.roi } : {}),
+          ...(camera.priority !== undefined ? { priority: camera.priority } : {}),
+          ...(camera.minAnalysisFps !== undefined ? { minFps: camera.minAnalysisFps } : {})
+        })
       });
 
-      aiProcess.on('error', (error) => {
-        console.error(`❌ Failed to start AI process for ${camera.name}:`, error);
-        this.aiProcesses.delete(camera._id.toString());
-      });
+      if (!response.ok) {
+        console.error(`❌ AI detection server rejected camera ${camera.name}: ${response.status}`);
+        return;
+      }
 
-      // Store the process
-      this.aiProcesses.set(camera._id.toString(), aiProcess);
-      
+      this.aiCameras.add(cameraId);
       console.log(`✅ AI detection started for camera: ${camera.name}`);
-      
+
     } catch (error) {
+      // The server may still be loading the model; the next status check retries
       console.error(`❌ Error starting AI detection for camera ${camera.name}:`, error);
     }
   }
 
+  private async stopAIDetection(cameraId: string, cameraName: string) {
+    try {
+      await fetch(`${this.aiServerUrl}/cameras/${encodeURIComponent(cameraId)}`, { method: 'DELETE' });
+      console.log(`🛑 Stopped AI detection for camera: ${cameraName}`);
+    } catch (error) {
+      console.error(`❌ Error stopping AI detection for camera ${cameraName}:`, error);
+    }
+    this.aiCameras.delete(cameraId);
+  }
+
   private async checkAllCameraStatuses() {
     console.log('�🚨🚨 STARTING CAMERA STATUS CHECK 🚨🚨🚨');
     try {
@@ -212,10 +251,10 @@ class CameraStatusMonitor {
           { $set: updateData }
         );
 
-        // Manage AI detection processes
+        // Manage AI detection for this camera
         const cameraId = camera._id.toString();
         const shouldRunAI = status === 'online'; // Always run AI for online cameras
-        const isAIRunning = this.aiProcesses.has(cameraId);
+        const isAIRunning = this.aiCameras.has(cameraId);
 
         console.log(`🔍 Camera ${camera.name}: status=${status}, shouldRunAI=${shouldRunAI}, isAIRunning=${isAIRunning}`);
 
@@ -224,16 +263,7 @@ class CameraStatusMonitor {
           await this.startAIDetection(camera);
         } else if (!shouldRunAI && isAIRunning) {
           // Stop AI detection if camera is offline
-          const process = this.aiProcesses.get(cameraId);
-          if (process) {
-            try {
-              process.kill('SIGTERM');
-              console.log(`🛑 Stopped AI process for camera: ${camera.name}`);
-            } catch (error) {
-              console.error(`❌ Error stopping AI process for camera ${camera.name}:`, error);
-            }
-            this.aiProcesses.delete(cameraId);
-          }
+          await this.stopAIDetection(cameraId, camera.name);
         }
 
         if (status === 'online') {
@@ -243,7 +273,7 @@ class CameraStatusMonitor {
         }
       }
 
-      console.log(`📊 Status check complete: ${onlineCount} online, ${offlineCount} offline | AI processes: ${this.aiProcesses.size}`);
+      console.log(`📊 Status check complete: ${onlineCount} online, ${offlineCount} offline | AI cameras: ${this.aiCameras.size}`);
       
     } catch (error) {
       console.error('❌ Error in background camera status check:', error);
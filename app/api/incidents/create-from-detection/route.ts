@@ -4,14 +4,16 @@ import { promises as fs } from 'fs';
 import path from 'path';
 import clientPromise from '@/lib/mongodb';
 
-async function saveIncidentImage(imageBase64: string, filename: string): Promise<string> {
+async function saveIncidentImage(image: string | Buffer, filename: string): Promise<string> {
   try {
     // Create snapshots directory in public folder for web access
     const snapshotsDir = path.join(process.cwd(), 'public', 'incident-snapshots');
     await fs.mkdir(snapshotsDir, { recursive: true });
     
-    // Remove data URL prefix if present
-    const base64Data = imageBase64.replace(/^data:image\/[a-z]+;base64,/, '');
+    // Multipart uploads arrive as raw JPEG bytes; JSON bodies carry base64 (data URL prefix optional)
+    const imageData = typeof image === 'string'
+      ? Buffer.from(image.replace(/^data:image\/[a-z]+;base64,/, ''), 'base64')
+      : image;
     
     // Generate unique filename
     const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
@@ -19,7 +21,7 @@ async function saveIncidentImage(imageBase64: string, filename: string): Promise
     const imagePath = path.join(snapshotsDir, imageName);
     
     // Save image
-    await fs.writeFile(imagePath, base64Data, 'base64');
+    await fs.writeFile(imagePath, imageData);
     
     // Return web-accessible path
     return `/incident-snapshots/${imageName}`;
@@ -29,9 +31,110 @@ async function saveIncidentImage(imageBase64: string, filename: string): Promise
   }
 }
 
+// Read a detection report sent as multipart/form-data (binary JPEG), a form-encoded track
+// update (no image) or JSON (base64 image)
+async function parseDetectionBody(request: NextRequest): Promise<any> {
+  const contentType = request.headers.get('content-type') || '';
+  if (!contentType.startsWith('multipart/form-data') &&
+      !contentType.startsWith('application/x-www-form-urlencoded')) {
+    return request.json();
+  }
+
+  const form = await request.formData();
+  const field = (name: string) => {
+    const value = form.get(name);
+    return typeof value === 'string' ? value : undefined;
+  };
+
+  const imageFile = form.get('image') || form.get('snapshot');
+  const image = imageFile && typeof imageFile !== 'string'
+    ? Buffer.from(await imageFile.arrayBuffer())
+    : undefined;
+  const bbox = field('bbox');
+  const confidence = field('confidence');
+  const processingTime = field('processingTime');
+
+  return {
+    cameraId: field('cameraId'),
+    cameraName: field('cameraName'),
+    location: field('location'),
+    detectionType: field('detectionType'),
+    confidence: confidence !== undefined ? parseFloat(confidence) : undefined,
+    timestamp: field('timestamp'),
+    image,
+    bbox: bbox ? JSON.parse(bbox) : undefined,
+    severity: field('severity'),
+    processingTime: processingTime !== undefined ? parseFloat(processingTime) : undefined,
+    trackId: field('trackId'),
+    clipPath: field('clipPath')
+  };
+}
+
+// Apply a tracker update to the incident already opened for this track.
+// Returns the incident id, or null when no incident exists for the track yet.
+async function updateTrackedIncident(trackId: string, update: {
+  confidence: number;
+  timestamp: string;
+  bbox?: number[];
+  severity?: string;
+}): Promise<string | null> {
+  const lastSeen = new Date(update.timestamp).toISOString();
+  const boundingBoxes = update.bbox ? [{
+    x: update.bbox[0],
+    y: update.bbox[1],
+    width: update.bbox[2] - update.bbox[0],
+    height: update.bbox[3] - update.bbox[1]
+  }] : undefined;
+
+  try {
+    const client = await clientPromise;
+    const incidents = client.db('codex').collection('incidents');
+    const existing = await incidents.findOneAndUpdate(
+      { 'aiMetadata.trackId': trackId },
+      {
+        $set: {
+          confidence: update.confidence,
+          'aiMetadata.lastSeen': lastSeen,
+          ...(boundingBoxes ? { 'aiMetadata.boundingBoxes': boundingBoxes } : {}),
+          ...(update.severity === 'high' ? { priority: 'high' } : {}),
+          updatedAt: new Date()
+        },
+        $max: { 'aiMetadata.maxConfidence': update.confidence },
+        $inc: { 'aiMetadata.updateCount': 1 }
+      }
+    );
+    return existing ? existing.id : null;
+  } catch (dbError) {
+    console.error('❌ Database connection failed, updating fallback storage:', dbError);
+  }
+
+  const incidentsFile = path.join(process.cwd(), 'data', 'incidents.json');
+  try {
+    const incidents: Incident[] = JSON.parse(await fs.readFile(incidentsFile, 'utf-8'));
+    const incident = incidents.find(item => item.aiMetadata?.trackId === trackId);
+    if (!incident || !incident.aiMetadata) {
+      return null;
+    }
+    incident.confidence = update.confidence;
+    incident.aiMetadata.lastSeen = lastSeen;
+    incident.aiMetadata.maxConfidence = Math.max(incident.aiMetadata.maxConfidence || 0, update.confidence);
+    incident.aiMetadata.updateCount = (incident.aiMetadata.updateCount || 0) + 1;
+    if (boundingBoxes) {
+      incident.aiMetadata.boundingBoxes = boundingBoxes;
+    }
+    if (update.severity === 'high') {
+      incident.priority = 'high';
+    }
+    await fs.writeFile(incidentsFile, JSON.stringify(incidents, null, 2));
+    return incident.id;
+  } catch {
+    return null;
+  }
+}
+
 export async function POST(request: NextRequest) {
   try {
-    const body = await request.json();
+    const body = await parseDetectionBody(request);
     const {
       cameraId,
       cameraName,
@@ -41,7 +144,10 @@ export async function POST(request: NextRequest) {
       timestamp,
       image,
       bbox,
-      severity
+      severity,
+      processingTime,
+      trackId,
+      clipPath
     } = body;
 
     // Validate required fields
@@ -52,12 +158,31 @@ export async function POST(request: NextRequest) {
       );
     }
 
+    // Ongoing event: an image-less follow-up updates the incident already opened for this track.
+    // Reports with a snapshot open an incident and always create one.
+    if (trackId && !image) {
+      const updatedId = await updateTrackedIncident(trackId, { confidence, timestamp, bbox, severity });
+      if (updatedId) {
+        return NextResponse.json({
+          success: true,
+          incidentId: updatedId,
+          message: `Incident ${updatedId} updated for track ${trackId}`,
+          updated: true
+        });
+      }
+    }
+
     // Save incident image if provided
     let imageUrl = '';
     if (image) {
       imageUrl = await saveIncidentImage(image, `detection_${cameraId}_${Date.now()}`);
     }
 
+    // Pre/post-event clip: the file appears once the post-event seconds are recorded;
+    // clips under public/ are served by Next.js
+    const clipFile = clipPath ? clipPath.replace(/\\/g, '/') : '';
+    const clipUrl = clipFile.startsWith('public/') ? clipFile.slice('public'.length) : undefined;
+
     // Create new incident
     const incidentId = `inc_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
     const newIncident: Incident = {
@@ -76,7 +201,14 @@ export async function POST(request: NextRequest) {
       detectionMethod: 'AI',
       aiMetadata: {
         modelVersion: 'YOLOv8-FireSmoke-v1.0',
-        processingTime: 0, // Could be measured
+        processingTime: Number(processingTime) || 0, // Detector-measured ms for the alerting frame
+        ...(trackId ? {
+          trackId,
+          lastSeen: new Date(timestamp).toISOString(),
+          maxConfidence: confidence,
+          updateCount: 0
+        } : {}),
+        ...(clipPath ? { clipPath, ...(clipUrl ? { clipUrl } : {}) } : {}),
         boundingBoxes: bbox ? [{
           x: bbox[0],
           y: bbox[1], 
@@ -166,8 +298,10 @@ export async function GET() {
     usage: {
       endpoint: '/api/incidents/create-from-detection',
       method: 'POST',
+      contentTypes: ['multipart/form-data (image as a JPEG file part)', 'application/json (image as base64)'],
       requiredFields: ['cameraId', 'detectionType', 'confidence', 'timestamp'],
-      optionalFields: ['cameraName', 'location', 'image', 'bbox', 'severity']
+      optionalFields: ['cameraName', 'location', 'image', 'bbox', 'severity', 'processingTime', 'trackId', 'clipPath'],
+      tracking: 'Reports with a trackId and no image update the incident opened for that track (confidence, bbox); reports with an image always create one'
     }
   });
 }
\ No newline at end of file
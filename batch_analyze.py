@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Batch Analysis of Recorded Footage
+Re-checks archived video with FireSmokeDetector (after an incident, or after a
+model update) without going through a live-stream loop. Videos are split into
+time chunks that a process pool analyses in parallel: each worker loads the
+detector's inference stack (backend, cascade, tiling) once, without the live
+detector's notifier, preview or clip threads, samples frames at --sample-fps
+and runs batched predict calls.
+
+Every chunk streams its per-frame results to a .part file that is renamed when
+the chunk is complete, so an interrupted run picks up where it stopped: rerun
+the same command and finished chunks are skipped. Results live under a run
+directory keyed by the model weights and analysis settings, so a model update
+starts a fresh run instead of mixing results.
+
+Output (<output>/<run key>/):
+    <video>-<id>.detections.jsonl   one line per analysed frame:
+                                    {"f": frame, "t": seconds, "d": [[x1, y1, x2, y2, conf, cls], ...], "c": 1}
+                                    ("d" only with fire/smoke boxes, "c" when temporal confirmation passed)
+    summary.json                    per video: frames analysed, fire/smoke segments
+
+Temporal confirmation (CONFIRM_* settings, as in the live detector) runs when the
+chunks of a video are merged, over all of its records in order, so an event that
+straddles a chunk boundary is confirmed the same way as one inside a chunk.
+
+Usage:
+    python batch_analyze.py footage/ archive/cam3_2024-05-01.mp4 --workers 4 --sample-fps 2
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+
+import cv2
+
+from inference_backends import weights_hash
+from temporal_filter import confirmation_from_env
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.m4v', '.ts', '.webm')
+
+_worker = {}  # Per-process state: the inference stack and the analysis settings
+
+
+def list_videos(paths):
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _dirs, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in files if name.lower().endswith(VIDEO_EXTENSIONS))
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            videos.extend(glob.glob(path))
+    return sorted(set(os.path.abspath(video) for video in videos))
+
+
+def video_id(path):
+    """
+    Stable short name for a video's results: file name plus a hash of path, size and mtime
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1(f"{path}|{stat.st_size}|{int(stat.st_mtime)}".encode('utf-8')).hexdigest()[:8]
+    return f"{os.path.splitext(os.path.basename(path))[0]}-{digest}"
+
+
+def plan_chunks(videos, chunk_seconds, sample_fps):
+    """
+    Split every video into chunks of chunk_seconds
+    Returns (chunks, videos_info); a chunk is a dict with video, id, index, start and end frame (None = EOF)
+    """
+    chunks, info = [], {}
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            print(f"⚠️ Cannot open {path}, skipping")
+            continue
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        step = max(int(round(fps / sample_fps)), 1)
+        chunk_frames = max(int(chunk_seconds * fps) // step, 1) * step  # Chunks start on sampled frames
+        starts = list(range(0, frame_count, chunk_frames)) if frame_count > 0 else [0]
+        vid = video_id(path)
+        info[vid] = {'path': path, 'fps': fps, 'frames': frame_count, 'step': step, 'chunks': len(starts)}
+        for index, start in enumerate(starts):
+            end = starts[index + 1] if index + 1 < len(starts) else None
+            chunks.append({'video': path, 'id': vid, 'index': index, 'start': start, 'end': end,
+                           'fps': fps, 'step': step})
+    return chunks, info
+
+
+def chunk_path(run_dir, chunk):
+    return os.path.join(run_dir, chunk['id'], f"chunk_{chunk['index']:05d}.jsonl")
+
+
+def _init_worker(model_path, backend, conf, min_confidence, batch_size, roi, threads):
+    if threads:
+        os.environ['INFERENCE_THREADS'] = str(threads)
+    from detection_postprocess import FireSmokeFilter
+    from mdl import create_inference
+    from roi_masks import RoiMask
+    from thread_budget import apply_thread_budget, budget_from_env
+
+    budget = budget_from_env()
+    apply_thread_budget(**budget)
+    inference_backend, tiler = create_inference(model_path, backend, threads=budget['threads'],
+                                                precision=os.getenv('INFERENCE_PRECISION', 'fp32'))
+    _worker.update(backend=inference_backend, tiler=tiler, fire_smoke_filter=FireSmokeFilter(inference_backend.names),
+                   roi=RoiMask(roi) if roi else None, conf=conf, min_confidence=min_confidence,
+                   batch_size=batch_size)
+
+
+def _predict(frames):
+    roi = _worker['roi']
+    views = [roi.crop(frame) for frame in frames] if roi is not None else frames
+    if _worker['tiler'] is not None:
+        results = _worker['tiler'].predict(views, conf=_worker['conf'])
+    else:
+        results = _worker['backend'].predict(views, conf=_worker['conf'])
+    return [roi.to_frame(result) for result in results] if roi is not None else results
+
+
+def _flush(pending, fps, output_file):
+    """
+    Predict the pending (frame_index, frame) pairs as one batch and write their records
+    """
+    results = _predict([frame for _, frame in pending])
+    detections = 0
+    for (frame_index, _), result in zip(pending, results):
+        selected = _worker['fire_smoke_filter'].select(result, min_confidence=_worker['min_confidence'])
+        record = {'f': frame_index, 't': round(frame_index / fps, 3)}
+        if selected.found:
+            record['d'] = [[round(float(value), 1) for value in row[:4]] + [round(float(row[4]), 3), int(row[5])]
+                           for row in selected.data]
+            detections += 1
+        output_file.write(json.dumps(record, separators=(',', ':')) + '\n')
+    return detections
+
+
+def analyse_chunk(chunk, run_dir):
+    """
+    Analyse one chunk in a pool worker; returns counters for the progress report
+    """
+    started = time.perf_counter()
+    target = chunk_path(run_dir, chunk)
+    cap = cv2.VideoCapture(chunk['video'])
+    if chunk['start']:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, chunk['start'])
+
+    decoded = analysed = detections = 0
+    frame_index = chunk['start']
+    pending = []  # Sampled (frame_index, frame) pairs waiting for the next batched predict
+    with open(target + '.part', 'w') as output_file:
+        while chunk['end'] is None or frame_index < chunk['end']:
+            # grab() skips the BGR conversion of frames that are not sampled
+            if not cap.grab():
+                break
+            decoded += 1
+            if frame_index % chunk['step'] == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    pending.append((frame_index, frame))
+            frame_index += 1
+            if len(pending) >= _worker['batch_size']:
+                detections += _flush(pending, chunk['fps'], output_file)
+                analysed += len(pending)
+                pending.clear()
+        if pending:
+            detections += _flush(pending, chunk['fps'], output_file)
+            analysed += len(pending)
+    cap.release()
+    os.replace(target + '.part', target)
+    return {'id': chunk['id'], 'index': chunk['index'], 'decoded': decoded, 'analysed': analysed,
+            'detections': detections, 'seconds': time.perf_counter() - started}
+
+
+def _analyse_chunk_task(args):
+    return analyse_chunk(*args)
+
+
+def merge_video(run_dir, vid, info, gap_seconds=5.0):
+    """
+    Concatenate a video's chunk files, confirm detections over the whole video and summarise its
+    fire/smoke segments
+    """
+    merged_path = os.path.join(run_dir, f"{vid}.detections.jsonl")
+    temporal_filter = confirmation_from_env()
+    analysed, segments, current = 0, [], None
+    with open(merged_path, 'w') as merged:
+        for index in range(info['chunks']):
+            with open(os.path.join(run_dir, vid, f"chunk_{index:05d}.jsonl")) as chunk_file:
+                for line in chunk_file:
+                    analysed += 1
+                    record = json.loads(line)
+                    record.pop('c', None)  # Chunk files of older runs carried per-chunk confirmation
+                    confidence = max(row[4] for row in record['d']) if 'd' in record else 0.0
+                    if temporal_filter.update(vid, confidence):
+                        record['c'] = 1
+                    merged.write(json.dumps(record, separators=(',', ':')) + '\n')
+                    if 'd' not in record:
+                        continue
+                    if current is not None and record['t'] - current['end'] <= gap_seconds:
+                        current['end'] = record['t']
+                        current['maxConfidence'] = max(current['maxConfidence'], confidence)
+                        current['frames'] += 1
+                        current['confirmed'] = current['confirmed'] or 'c' in record
+                    else:
+                        current = {'start': record['t'], 'end': record['t'], 'maxConfidence': confidence,
+                                   'frames': 1, 'confirmed': 'c' in record}
+                        segments.append(current)
+    return {'video': info['path'], 'results': os.path.basename(merged_path), 'fps': info['fps'],
+            'framesAnalysed': analysed, 'segments': segments}
+
+
+def main():
+    from inference_backends import BACKENDS
+    from thread_budget import available_cores
+
+    parser = argparse.ArgumentParser(description="Resumable fire/smoke analysis of recorded footage")
+    parser.add_argument('inputs', nargs='+', help="Video files, directories or glob patterns")
+    parser.add_argument('--output', default='batch_results')
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'best_01.pt'))
+    parser.add_argument('--backend', default=os.getenv('INFERENCE_BACKEND', 'torch'), choices=BACKENDS)
+    parser.add_argument('--workers', type=int, default=max(len(available_cores()) // 4, 1))
+    parser.add_argument('--threads', type=int, default=0, help="Inference threads per worker (0 = cores / workers)")
+    parser.add_argument('--sample-fps', type=float, default=2.0, help="Analysed frames per second of video")
+    parser.add_argument('--chunk-seconds', type=float, default=120.0)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--conf', type=float, default=0.25, help="Model confidence threshold")
+    parser.add_argument('--min-confidence', type=float, default=0.5, help="Fire/smoke confidence kept in results")
+    parser.add_argument('--roi', default=None, help="ROI shapes as JSON (see roi_masks.py)")
+    args = parser.parse_args()
+
+    videos = list_videos(args.inputs)
+    if not videos:
+        print("❌ No videos found")
+        return
+    roi = json.loads(args.roi) if args.roi else None
+    settings = {'model': weights_hash(args.model), 'backend': args.backend, 'sampleFps': args.sample_fps,
+                'chunkSeconds': args.chunk_seconds, 'conf': args.conf, 'minConfidence': args.min_confidence,
+                'roi': roi}
+    run_key = hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()[:10]
+    run_dir = os.path.join(args.output, run_key)
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, 'settings.json'), 'w') as settings_file:
+        json.dump(settings, settings_file, indent=2)
+
+    chunks, info = plan_chunks(videos, args.chunk_seconds, args.sample_fps)
+    for vid in info:
+        os.makedirs(os.path.join(run_dir, vid), exist_ok=True)
+    todo = [chunk for chunk in chunks if not os.path.exists(chunk_path(run_dir, chunk))]
+    print(f"🎞️ {len(info)} videos, {len(chunks)} chunks | run {run_dir} | "
+          f"{len(chunks) - len(todo)} chunks already done")
+
+    threads = args.threads or max(len(available_cores()) // args.workers, 1)
+    decoded = analysed = detections = 0
+    started = time.perf_counter()
+    try:
+        if todo:
+            import multiprocessing
+            context = multiprocessing.get_context('spawn')
+            with context.Pool(args.workers, initializer=_init_worker,
+                              initargs=(args.model, args.backend, args.conf, args.min_confidence,
+                                        args.batch_size, roi, threads)) as pool:
+                tasks = [(chunk, run_dir) for chunk in todo]
+                for done, result in enumerate(pool.imap_unordered(_analyse_chunk_task, tasks), 1):
+                    decoded += result['decoded']
+                    analysed += result['analysed']
+                    detections += result['detections']
+                    elapsed = time.perf_counter() - started
+                    print(f"✅ [{done}/{len(todo)}] {result['id']} chunk {result['index']} | "
+                          f"{result['analysed']} frames, {result['detections']} with fire/smoke | "
+                          f"overall {analysed / elapsed:.1f} frames/s")
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted - rerun the same command to resume")
+        return
+
+    elapsed = time.perf_counter() - started
+    summary = {'settings': settings, 'videos': [merge_video(run_dir, vid, video) for vid, video in info.items()]}
+    with open(os.path.join(run_dir, 'summary.json'), 'w') as summary_file:
+        json.dump(summary, summary_file, indent=2)
+
+    for video in summary['videos']:
+        confirmed = sum(1 for segment in video['segments'] if segment['confirmed'])
+        print(f"📊 {os.path.basename(video['video'])}: {video['framesAnalysed']} frames analysed, "
+              f"{len(video['segments'])} fire/smoke segments ({confirmed} confirmed)")
+    if analysed:
+        print(f"⏱️ This run: {analysed} frames analysed ({decoded} decoded) in {elapsed:.1f}s | "
+              f"{analysed / elapsed:.1f} frames/s with {args.workers} workers x {threads} threads")
+    print(f"📝 Results: {run_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Detection Pipeline Benchmark
+Replays video files or image folders through FireSmokeDetector.process_batch as
+if they were live cameras (motion/colour gating, ROI, tiling and alerting
+included) and measures throughput without needing a real stream. Each run
+(model x backend x camera count) reports FPS, end-to-end latency percentiles,
+per-stage timings (decode, preprocess, inference, postprocess, snapshot encode,
+upload) and incident delivery latency from the notifier, and all runs are
+written to JSON so releases can be compared.
+
+Usage:
+    python benchmark_detection.py --sources footage/warehouse.mp4 snapshots \\
+        --models best_01.pt best_03.pt --backends torch onnx --cameras 1 4 8 --output bench.json
+    python benchmark_detection.py ... --baseline bench_previous.json   # exit 1 on regression
+    python benchmark_detection.py --sources footage/fire_test.mp4 --cameras 1 --color-gate
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from color_gate import ColorFlickerGate
+from detector_metrics import STAGE_SECONDS
+from inference_backends import BACKENDS, list_images
+
+STAGES = ('decode', 'preprocess', 'inference', 'postprocess', 'encode', 'upload')
+
+
+class ReplaySource:
+    """
+    Endless frame source over a video file or an image folder
+    """
+    def __init__(self, path):
+        self.path = path
+        self.images = list_images([path]) if os.path.isdir(path) else None
+        self.index = 0
+        self.cap = None if self.images is not None else cv2.VideoCapture(path)
+        if self.images is not None and not self.images:
+            raise ValueError(f"No images in {path}")
+        if self.cap is not None and not self.cap.isOpened():
+            raise ValueError(f"Cannot open video {path}")
+
+    def read(self):
+        """
+        Next frame, or None if it cannot be decoded (unreadable image, video that will not rewind)
+        """
+        if self.images is not None:
+            frame = cv2.imread(self.images[self.index % len(self.images)])
+            self.index += 1
+            return frame
+
+        ret, frame = self.cap.read()
+        if not ret:
+            # Loop the recording so long runs do not run out of frames
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+class IncidentSink(BaseHTTPRequestHandler):
+    """
+    Stand-in for the Next.js incident API so incident uploads have somewhere to deliver
+    """
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = b'{"success": true, "incidentId": "bench"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_incident_sink():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), IncidentSink)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+
+def summarize(values):
+    if not values:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    values = np.asarray(values)
+    return {
+        'mean': round(float(values.mean()), 3),
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p95': round(float(np.percentile(values, 95)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3)
+    }
+
+
+def stage_totals():
+    """
+    Seconds and observation count per stage recorded so far by the pipeline's STAGE_SECONDS histogram
+    """
+    with STAGE_SECONDS.lock:
+        return {key[0]: (series[-2], series[-1]) for key, series in STAGE_SECONDS.series.items()}
+
+
+def wait_for_delivery(notifier, enqueued, timeout=30.0):
+    """
+    Wait until the notifier has finished with every report enqueued so far (or timeout passes)
+    """
+    deadline = time.time() + timeout
+    while notifier.delivered + notifier.dropped < enqueued and time.time() < deadline:
+        time.sleep(0.05)
+
+
+def benchmark_run(detector, sources, cameras, frames_per_camera, batch_size, snapshot_every, warmup=2):
+    """
+    Replay frames_per_camera frames for each of `cameras` simulated cameras through process_batch
+    Frames a source cannot decode are skipped and counted
+    Returns the run summary (FPS, latency percentiles, per-stage timings in ms per frame, notifier delivery)
+    """
+    replays = [ReplaySource(sources[i % len(sources)]) for i in range(cameras)]
+    camera_ids = [f"bench_{cameras}x_{i}" for i in range(cameras)]
+    for camera_id in camera_ids:
+        detector.preview.register(camera_id)
+    decode_ms = []
+    latencies = []
+    analysed = skipped = 0
+    detections = 0
+
+    frame = replays[0].read()
+    if frame is None:
+        raise ValueError(f"Cannot decode a frame from {replays[0].path}")
+    for _ in range(warmup):
+        detector.backend.predict([frame], conf=detector.confidence_threshold)
+
+    notifier = detector.notifier
+    notifier.latencies.clear()  # Delivery latency of this run only
+    notified_before, delivered_before = notifier.enqueued, notifier.delivered
+    stages_before = stage_totals()
+
+    started = time.perf_counter()
+    for round_index in range(frames_per_camera):
+        for first in range(0, cameras, batch_size):
+            batch, decode_started = [], []
+            for replay, camera_id in zip(replays[first:first + batch_size], camera_ids[first:first + batch_size]):
+                read_started = time.perf_counter()
+                frame = replay.read()
+                if frame is None:
+                    skipped += 1
+                    continue
+                decode_ms.append((time.perf_counter() - read_started) * 1000)
+                decode_started.append(read_started)
+                batch.append((frame, camera_id, camera_id, 'benchmark'))
+            if not batch:
+                continue
+
+            outcomes = detector.process_batch(batch)
+
+            done = time.perf_counter()
+            latencies.extend((done - t) * 1000 for t in decode_started)
+            analysed += len(batch)
+            detections += sum(1 for found, _confidence in outcomes if found)
+
+            # Alert path cost (snapshot encode + queued upload), sampled so the sink is not flooded
+            if snapshot_every and round_index % snapshot_every == 0:
+                frame, camera_id = batch[0][0], batch[0][1]
+                height, width = frame.shape[:2]
+                detector.handle_detection(frame, camera_id, camera_id, 'benchmark', {
+                    'label': 'fire', 'confidence': 0.0, 'bbox': [0, 0, width, height]
+                })
+
+    elapsed = time.perf_counter() - started
+    for replay in replays:
+        replay.release()
+
+    wait_for_delivery(notifier, notifier.enqueued)
+    stages_after = stage_totals()
+    stages = {}
+    for stage in STAGES[1:]:
+        seconds, count = stages_after.get(stage, (0.0, 0))
+        seconds_before, count_before = stages_before.get(stage, (0.0, 0))
+        count -= count_before
+        stages[stage] = {
+            'mean': round((seconds - seconds_before) * 1000 / count, 3) if count else 0.0,
+            'count': count
+        }
+    stages = {'decode': dict(summarize(decode_ms), count=len(decode_ms)), **stages}
+    notifier_stats = notifier.stats()
+    for camera_id in camera_ids:
+        detector.forget_camera(camera_id)
+
+    return {
+        'cameras': cameras,
+        'batchSize': batch_size,
+        'framesAnalysed': analysed,
+        'framesUndecodable': skipped,
+        'fireSmokeFrames': detections,
+        'seconds': round(elapsed, 3),
+        'fps': round(analysed / elapsed, 2) if elapsed else 0.0,
+        'latencyMs': summarize(latencies),
+        'stagesMs': stages,
+        'notifier': {
+            'reports': notifier.enqueued - notified_before,
+            'delivered': notifier_stats['delivered'] - delivered_before,
+            'deliveryLatencyMs': {'p50': notifier_stats['latencyP50Ms'], 'p95': notifier_stats['latencyP95Ms']}
+        }
+    }
+
+
+def color_gate_report(detector, sources, frames_per_source, analysis_fps=2.0, min_confidence=None):
+    """
+    Replay each source through the colour/flicker gate and the model on every frame
+    A miss is a frame where the model finds fire/smoke but the gate had no candidates
+    Args:
+        min_confidence: Model confidence that counts as fire/smoke (default: the detector's confirmation
+            min_score, the same threshold the live miss estimate uses)
+    """
+    if min_confidence is None:
+        min_confidence = detector.temporal_filter.min_score
+    report = []
+    for path in sources:
+        replay = ReplaySource(path)
+        gate = ColorFlickerGate()
+        analysed = passed = positives = missed = 0
+        for index in range(frames_per_source):
+            frame = replay.read()
+            if frame is None:
+                break
+            analysed += 1
+            infer, _regions, forced = gate.check(frame, now=index / analysis_fps)
+            has_candidates = infer and not forced
+            passed += has_candidates
+
+            data = detector.backend.predict([frame], conf=detector.confidence_threshold)[0]
+            if detector.fire_smoke_filter.select(data, min_confidence=min_confidence).found:
+                positives += 1
+                missed += not has_candidates
+        replay.release()
+
+        report.append({
+            'source': path,
+            'frames': analysed,
+            'gatePassRate': round(passed / analysed, 3) if analysed else None,
+            'modelPositiveFrames': positives,
+            'gateMisses': missed,
+            'missRate': round(missed / positives, 3) if positives else None
+        })
+    return report
+
+
+def run_key(run):
+    return (run['model'], run['backend'], run['cameras'], run['batchSize'])
+
+
+def compare_with_baseline(runs, baseline_path, tolerance):
+    """
+    Print FPS / p95 latency changes against a previous report; returns True if anything regressed
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = {run_key(run): run for run in json.load(baseline_file)['runs']}
+
+    regressed = False
+    for run in runs:
+        previous = baseline.get(run_key(run))
+        if previous is None:
+            continue
+        fps_change = (run['fps'] - previous['fps']) / previous['fps'] if previous['fps'] else 0.0
+        p95_change = ((run['latencyMs']['p95'] - previous['latencyMs']['p95']) / previous['latencyMs']['p95']
+                      if previous['latencyMs']['p95'] else 0.0)
+        bad = fps_change < -tolerance or p95_change > tolerance
+        regressed = regressed or bad
+        status = "❌ REGRESSION" if bad else "✅"
+        print(f"{status} {run['model']} {run['backend']} x{run['cameras']}: "
+              f"fps {fps_change:+.1%}, p95 latency {p95_change:+.1%}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the fire/smoke detection pipeline")
+    parser.add_argument('--sources', nargs='+', default=['snapshots'], help="Video files or image folders")
+    parser.add_argument('--models', nargs='+', default=['best_01.pt'])
+    parser.add_argument('--backends', nargs='+', default=['torch'], choices=BACKENDS)
+    parser.add_argument('--cameras', nargs='+', type=int, default=[1, 4])
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--frames', type=int, default=100, help="Frames analysed per camera per run")
+    parser.add_argument('--snapshot-every', type=int, default=10,
+                        help="Also send a synthetic alert every N rounds to measure encode + delivery (0 = never)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help="Previous JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Allowed FPS / p95 change before failing")
+    parser.add_argument('--color-gate', action='store_true',
+                        help="Also report the colour/flicker gate's pass and miss rate against the model")
+    args = parser.parse_args()
+
+    # Keep benchmark alerts away from the real spool and API
+    os.environ['INCIDENT_SPOOL_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_spool_'), 'spool.db')
+    httpd, sink_url = start_incident_sink()
+
+    from mdl import FireSmokeDetector
+
+    runs = []
+    for model_path in args.models:
+        for backend in args.backends:
+            print(f"\n🔧 Loading {model_path} ({backend})...")
+            detector = FireSmokeDetector(model_path=model_path, api_base_url=sink_url, backend=backend)
+
+            for cameras in args.cameras:
+                run = benchmark_run(detector, args.sources, cameras, args.frames, args.batch_size,
+                                    args.snapshot_every)
+                run.update({'model': model_path, 'backend': backend})
+                runs.append(run)
+
+                stage_str = " | ".join(f"{stage} {run['stagesMs'][stage]['mean']:.1f}" for stage in STAGES)
+                print(f"📈 x{cameras:<3} {run['fps']:7.1f} FPS | latency p50 {run['latencyMs']['p50']:.0f} "
+                      f"p95 {run['latencyMs']['p95']:.0f} p99 {run['latencyMs']['p99']:.0f} ms")
+                print(f"   stages (ms/frame): {stage_str}")
+                delivery = run['notifier']['deliveryLatencyMs']
+                print(f"   incident delivery: {run['notifier']['reports']} report(s), "
+                      f"p50 {delivery['p50']:.0f} p95 {delivery['p95']:.0f} ms after detection")
+
+            if args.color_gate:
+                gate_report = color_gate_report(detector, args.sources, args.frames)
+                runs[-1]['colorGate'] = gate_report
+                for entry in gate_report:
+                    miss_rate = f"{entry['missRate']:.1%}" if entry['missRate'] is not None else "n/a"
+                    print(f"🎨 {entry['source']}: gate passes {entry['gatePassRate']:.1%} of frames, "
+                          f"misses {entry['gateMisses']}/{entry['modelPositiveFrames']} model hits ({miss_rate})")
+
+            detector.close()
+
+    httpd.shutdown()
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'host': {
+            'platform': platform.platform(),
+            'python': sys.version.split()[0],
+            'cpuCount': os.cpu_count(),
+            'opencv': cv2.__version__
+        },
+        'sources': args.sources,
+        'runs': runs
+    }
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"\n📝 Results written: {args.output}")
+
+    if args.baseline and compare_with_baseline(runs, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Pre/Post-Event Clip Recorder
+Keeps the last seconds of every camera in memory so an alert can come with a
+short video of what happened before it, not just one annotated JPEG.
+
+Each camera has a ring of JPEG-compressed frames (bytes, not arrays) bounded by
+a byte budget: a 1280x720 frame is ~2.7 MB raw but ~60-120 KB as JPEG, so a few
+MB hold 10+ seconds at the clip frame rate. On an alert the frames of the last
+pre_seconds are taken from the ring, the recorder keeps collecting for
+post_seconds, and the MP4 is written on a background thread. The clip path is
+known immediately, so it can go out with the incident report.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from detector_metrics import METRICS
+
+CLIPS = METRICS.counter('detector_clips_total', 'Event clips by outcome', ['outcome'])
+
+
+class ClipBuffer:
+    def __init__(self, max_bytes=8 * 1024 * 1024, fps=5.0, jpeg_quality=70, max_width=1280):
+        """
+        Args:
+            max_bytes: Memory budget for the compressed frames of this camera
+            fps: Frames per second kept (decoded frames in between are not encoded)
+            jpeg_quality: JPEG quality of the stored frames
+            max_width: Frames wider than this are scaled down before encoding
+        """
+        self.max_bytes = max_bytes
+        self.interval = 1.0 / fps
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+        self.max_width = max_width
+        self.frames = deque()  # (frame_time, jpeg bytes), oldest first
+        self.bytes = 0
+        self.last_time = 0.0
+        self.lock = threading.Lock()
+
+        self.frames_added = 0
+        self.frames_evicted = 0
+
+    def add(self, frame, frame_time):
+        """
+        Encode and store the frame if the clip frame rate is due; returns the stored entry or None
+        """
+        if frame_time - self.last_time < self.interval:
+            return None
+        self.last_time = frame_time
+        if frame.shape[1] > self.max_width:
+            scale = self.max_width / frame.shape[1]
+            frame = cv2.resize(frame, (self.max_width, int(frame.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', frame, self.encode_params)
+        if not ok:
+            return None
+
+        entry = (frame_time, encoded.tobytes())
+        with self.lock:
+            self.frames.append(entry)
+            self.bytes += len(entry[1])
+            self.frames_added += 1
+            while self.bytes > self.max_bytes and len(self.frames) > 1:
+                _, evicted = self.frames.popleft()
+                self.bytes -= len(evicted)
+                self.frames_evicted += 1
+        return entry
+
+    def since(self, start_time):
+        with self.lock:
+            return [entry for entry in self.frames if entry[0] >= start_time]
+
+    def stats(self):
+        with self.lock:
+            seconds = self.frames[-1][0] - self.frames[0][0] if len(self.frames) > 1 else 0.0
+            return {
+                'memoryBytes': self.bytes,
+                'memoryLimitBytes': self.max_bytes,
+                'frames': len(self.frames),
+                'secondsBuffered': round(seconds, 1),
+                'avgFrameKb': round(self.bytes / len(self.frames) / 1024, 1) if self.frames else None,
+                'framesEvicted': self.frames_evicted
+            }
+
+
+class ClipRecorder:
+    def __init__(self, output_dir='public/incident-clips', pre_seconds=10.0, post_seconds=10.0,
+                 buffer_bytes=8 * 1024 * 1024, fps=5.0, jpeg_quality=70, max_width=1280):
+        """
+        Args:
+            output_dir: Where MP4 clips are written
+            pre_seconds: Seconds before the alert included in the clip (bounded by the buffer budget)
+            post_seconds: Seconds after the alert included in the clip
+            buffer_bytes: Memory budget per camera for the compressed frame ring
+            fps, jpeg_quality, max_width: Settings of the stored frames (see ClipBuffer)
+        """
+        self.output_dir = output_dir
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.buffer_settings = {'max_bytes': buffer_bytes, 'fps': fps, 'jpeg_quality': jpeg_quality,
+                                'max_width': max_width}
+        self.buffers = {}  # camera_id -> ClipBuffer
+        self.jobs = {}  # camera_id -> clip being recorded: {'path', 'frames', 'end'}
+        self.lock = threading.Lock()
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='clip-writer')
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.clips_written = 0
+        self.clips_failed = 0
+
+    def add_frame(self, camera_id, frame, frame_time=None):
+        """
+        Feed a decoded frame (called from the capture thread); cheap when the clip frame rate is not due
+        """
+        frame_time = frame_time if frame_time is not None else time.time()
+        buffer = self.buffers.get(camera_id)
+        if buffer is None:
+            with self.lock:
+                buffer = self.buffers.setdefault(camera_id, ClipBuffer(**self.buffer_settings))
+        entry = buffer.add(frame, frame_time)
+        if entry is not None and camera_id in self.jobs:
+            with self.lock:
+                job = self.jobs.get(camera_id)
+                if job is not None:
+                    job['frames'].append(entry)
+        self._finish_due(frame_time)
+
+    def start_clip(self, camera_id, event_time=None):
+        """
+        Start a clip around an alert; returns the path the MP4 will be written to (None without frames)
+        An alert during a clip that is still recording extends it instead of starting another
+        """
+        event_time = event_time if event_time is not None else time.time()
+        with self.lock:
+            job = self.jobs.get(camera_id)
+            if job is not None:
+                job['end'] = max(job['end'], event_time + self.post_seconds)
+                return job['path']
+            buffer = self.buffers.get(camera_id)
+            if buffer is None:
+                return None
+            safe_id = ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(camera_id))
+            name = f"clip_{safe_id}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(event_time))}.mp4"
+            job = {'path': os.path.join(self.output_dir, name),
+                   'frames': buffer.since(event_time - self.pre_seconds),
+                   'end': event_time + self.post_seconds}
+            self.jobs[camera_id] = job
+        print(f"🎬 Recording clip for camera {camera_id}: {job['path']}")
+        return job['path']
+
+    def _finish_due(self, now, grace=5.0, force=False):
+        # Clips end when a frame past their end time arrives, or after a grace period if the stream stalls
+        with self.lock:
+            due = [camera_id for camera_id, job in self.jobs.items()
+                   if force or now >= job['end'] and (self.buffers[camera_id].last_time >= job['end'] or
+                                                      now >= job['end'] + grace)]
+            jobs = [self.jobs.pop(camera_id) for camera_id in due]
+        for job in jobs:
+            self.writer.submit(self._write, job)
+
+    def _write(self, job):
+        frames = job['frames']
+        try:
+            if not frames:
+                raise ValueError("no frames buffered")
+            first = cv2.imdecode(np.frombuffer(frames[0][1], dtype=np.uint8), cv2.IMREAD_COLOR)
+            height, width = first.shape[:2]
+            duration = frames[-1][0] - frames[0][0]
+            fps = min(max((len(frames) - 1) / duration, 1.0), 30.0) if duration > 0 else 1.0
+            temp_path = job['path'][:-4] + '.part.mp4'
+            writer = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+            if not writer.isOpened():
+                raise OSError(f"cannot open video writer for {temp_path}")
+            try:
+                for _, jpeg in frames:
+                    frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if frame.shape[:2] != (height, width):
+                        frame = cv2.resize(frame, (width, height))  # Stream resolution changed mid-clip
+                    writer.write(frame)
+            finally:
+                writer.release()
+            os.replace(temp_path, job['path'])
+            self.clips_written += 1
+            CLIPS.inc(outcome='written')
+            print(f"🎬 Clip written: {job['path']} ({len(frames)} frames, {duration:.1f}s)")
+        except (OSError, ValueError, cv2.error) as e:
+            self.clips_failed += 1
+            CLIPS.inc(outcome='failed')
+            print(f"❌ Could not write clip {job['path']}: {e}")
+
+    def stats(self, camera_id):
+        buffer = self.buffers.get(camera_id)
+        if buffer is None:
+            return {}
+        stats = buffer.stats()
+        stats['recording'] = camera_id in self.jobs
+        return stats
+
+    def forget(self, camera_id):
+        """
+        Drop a camera's buffer; a clip still recording is written with what it has
+        """
+        with self.lock:
+            job = self.jobs.pop(camera_id, None)
+            self.buffers.pop(camera_id, None)
+        if job is not None:
+            self.writer.submit(self._write, job)
+
+    def close(self):
+        """
+        Write clips still recording and wait for the writer
+        """
+        self._finish_due(time.time(), force=True)
+        self.writer.shutdown(wait=True)
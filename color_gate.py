@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Colour/Flicker Gate
+Zero-ML pre-filter run before the model. Each frame is reduced to a small
+thumbnail and scored for:
+- fire: flame-coloured pixels (red/orange/yellow hue, saturated, bright,
+  R > G > B) whose brightness keeps flickering between analysed frames
+- smoke: low-saturation, mid-brightness pixels that drift slightly away from a
+  slowly updated background (diffuse change rather than hard-edged motion)
+
+Frames without candidate pixels skip inference, except for a forced check every
+few seconds. The forced checks double as a miss estimate: when the model finds
+fire/smoke at alert confidence (the confirmation min_score) on a frame the gate
+rejected, that is counted as a gate miss.
+Candidate regions are returned in frame pixels so inference can be limited to them.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+
+class ColorFlickerGate:
+    def __init__(self, size=(160, 90), flicker_threshold=12.0, smoke_change=(4.0, 40.0), min_pixels=6,
+                 force_interval=10.0, background_rate=0.05, padding=0.5):
+        """
+        Args:
+            size: (width, height) of the analysis thumbnail
+            flicker_threshold: Smoothed brightness change (0-255) for a flame pixel to count as flickering
+            smoke_change: (min, max) gray-level difference from the background that looks like smoke
+            min_pixels: Candidate thumbnail pixels needed to run inference
+            force_interval: Seconds after which inference runs even without candidates
+            background_rate: Update rate of the smoke background model
+            padding: Candidate region padding as a fraction of its size
+        """
+        self.size = size
+        self.flicker_threshold = flicker_threshold
+        self.smoke_change = smoke_change
+        self.min_pixels = min_pixels
+        self.force_interval = force_interval
+        self.background_rate = background_rate
+        self.padding = padding
+        self.kernel = np.ones((2, 2), dtype=np.uint8)
+
+        self.previous_value = None
+        self.flicker = None  # Smoothed per-pixel brightness change
+        self.background = None  # Slow running average of the gray thumbnail
+        self.last_inference_time = 0.0
+
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.forced_checks = 0
+        self.fire_candidates = 0
+        self.smoke_candidates = 0
+        self.misses = 0
+
+    def candidate_mask(self, frame):
+        """
+        Fire and smoke candidate masks of the thumbnail (bool arrays)
+        """
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        hue, saturation, value = (hsv[..., i].astype(np.int16) for i in range(3))
+        blue, green, red = (small[..., i].astype(np.int16) for i in range(3))
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+        flame_colour = (((hue <= 35) | (hue >= 170)) & (saturation >= 90) & (value >= 150) &
+                        (red > green) & (green > blue))
+
+        value_float = value.astype(np.float32)
+        if self.previous_value is None:
+            self.previous_value = value_float
+            self.flicker = np.zeros_like(value_float)
+            self.background = gray
+        change = np.abs(value_float - self.previous_value)
+        self.flicker += 0.5 * (change - self.flicker)
+        self.previous_value = value_float
+        fire = flame_colour & (self.flicker >= self.flicker_threshold)
+
+        drift = np.abs(gray - self.background)
+        smoke = ((saturation < 60) & (value >= 80) & (value <= 230) &
+                 (drift >= self.smoke_change[0]) & (drift <= self.smoke_change[1]))
+        self.background += self.background_rate * (gray - self.background)
+
+        # Drop isolated pixels (sensor noise, compression artefacts)
+        fire = cv2.morphologyEx(fire.astype(np.uint8), cv2.MORPH_OPEN, self.kernel) > 0
+        smoke = cv2.morphologyEx(smoke.astype(np.uint8), cv2.MORPH_OPEN, self.kernel) > 0
+        return fire, smoke
+
+    def regions(self, mask, frame_shape):
+        """
+        Padded bounding rectangles (x1, y1, x2, y2) of the candidate blobs in frame pixels
+        """
+        count, _, blob_stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+        height, width = frame_shape[:2]
+        scale_x, scale_y = width / self.size[0], height / self.size[1]
+        rects = []
+        for x, y, w, h, area in blob_stats[1:count]:
+            pad_x, pad_y = w * self.padding, h * self.padding
+            rects.append((int(max((x - pad_x) * scale_x, 0)), int(max((y - pad_y) * scale_y, 0)),
+                          int(min((x + w + pad_x) * scale_x, width)), int(min((y + h + pad_y) * scale_y, height))))
+        return rects
+
+    def check(self, frame, now=None):
+        """
+        Returns:
+            (infer, regions, forced): whether the model should run, candidate regions in frame
+            pixels, and whether this is a forced check without candidates
+        """
+        now = now if now is not None else time.time()
+        self.frames_checked += 1
+        fire, smoke = self.candidate_mask(frame)
+        fire_pixels, smoke_pixels = int(np.count_nonzero(fire)), int(np.count_nonzero(smoke))
+
+        if fire_pixels + smoke_pixels >= self.min_pixels:
+            self.fire_candidates += fire_pixels >= self.min_pixels
+            self.smoke_candidates += smoke_pixels >= self.min_pixels
+            self.last_inference_time = now
+            return True, self.regions(fire | smoke, frame.shape), False
+
+        if now - self.last_inference_time >= self.force_interval:
+            self.forced_checks += 1
+            self.last_inference_time = now
+            return True, [], True
+
+        self.frames_skipped += 1
+        return False, [], False
+
+    def record_miss(self):
+        """
+        The model found fire/smoke at alert confidence on a frame this gate had no candidates for
+        """
+        self.misses += 1
+
+    def stats(self):
+        checked = max(self.frames_checked, 1)
+        return {
+            'framesChecked': self.frames_checked,
+            'framesSkipped': self.frames_skipped,
+            'skipRatio': round(self.frames_skipped / checked, 3),
+            'fireCandidates': self.fire_candidates,
+            'smokeCandidates': self.smoke_candidates,
+            'forcedChecks': self.forced_checks,
+            'misses': self.misses,
+            'missRate': round(self.misses / self.forced_checks, 3) if self.forced_checks else None
+        }
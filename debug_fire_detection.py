@@ -13,6 +13,9 @@ import os
 import sys
 from datetime import datetime
 from ultralytics import YOLO
+from frame_sampler import AdaptiveSampler
+from detection_postprocess import FireSmokeFilter, boxes_to_array
+from preview_server import PreviewHub, start_preview_server
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -27,6 +30,7 @@ class FireSmokeDetector:
         """
         try:
             self.model = YOLO(model_path)
+            self.fire_smoke_filter = FireSmokeFilter(self.model.names)
             print(f"✅ Model loaded successfully: {model_path}")
             print(f"🏷️ Model classes: {list(self.model.names.values())}")
         except Exception as e:
@@ -42,6 +46,10 @@ class FireSmokeDetector:
         # Create snapshots directory
         os.makedirs('snapshots', exist_ok=True)
         
+        # Live view with the detections drawn on, in the browser instead of a cv2.imshow window
+        self.preview = PreviewHub(self.model.names, fps=float(os.getenv('PREVIEW_FPS', 10)))
+        self.preview_port = int(os.getenv('PREVIEW_PORT', 8090))
+        
         print(f"🎯 Detection confidence threshold: {confidence_threshold} ({confidence_threshold*100}%)")
         print(f"🚨 Alert threshold: 0.6 (60%) - LOWERED FOR TESTING")
         print(f"⏰ Cooldown between alerts: {self.detection_cooldown} seconds")
@@ -52,42 +60,17 @@ class FireSmokeDetector:
         """
         # Perform detection
         results = self.model.predict(source=frame, conf=self.confidence_threshold, verbose=False)
-        detections = results[0].boxes
+        all_detections = boxes_to_array(results[0].boxes)  # (N, 6): x1, y1, x2, y2, conf, cls
+        detections = self.fire_smoke_filter.select(all_detections)
         
-        detection_found = False
-        highest_confidence = 0
-        best_detection = None
-        all_detections = []
+        detection_found = detections.found
+        highest_confidence = detections.best_confidence
         
-        if detections is not None and len(detections) > 0:
-            for det in detections:
-                cls_id = int(det.cls[0])
-                conf = float(det.conf[0])
-                label = self.model.names[cls_id]
-                
-                all_detections.append({
-                    'label': label,
-                    'confidence': conf,
-                    'bbox': det.xyxy[0].tolist()
-                })
-                
-                if show_debug:
-                    print(f"🔍 Detected: {label} ({conf:.2f} confidence)")
-                
-                # Check if detected object is fire or smoke
-                if label.lower() in ['fire', 'smoke']:
-                    if conf > highest_confidence:
-                        highest_confidence = conf
-                        best_detection = {
-                            'label': label,
-                            'confidence': conf,
-                            'bbox': det.xyxy[0].tolist(),
-                            'cls_id': cls_id
-                        }
-                        detection_found = True
-                        
-                        if show_debug:
-                            print(f"🔥 FIRE/SMOKE DETECTED: {label} ({conf:.2f} confidence)")
+        if show_debug:
+            for conf, cls_id in all_detections[:, 4:6]:
+                print(f"🔍 Detected: {self.model.names[int(cls_id)]} ({conf:.2f} confidence)")
+            if detection_found:
+                print(f"🔥 FIRE/SMOKE DETECTED: {detections.best_label} ({highest_confidence:.2f} confidence)")
         
         if show_debug and len(all_detections) == 0:
             print("👁️ No objects detected in frame")
@@ -103,7 +86,7 @@ class FireSmokeDetector:
                 
                 self.last_detection_time[camera_id] = current_time
                 print(f"🚨 ALERT THRESHOLD REACHED! Confidence: {highest_confidence:.2f}")
-                self.handle_detection(frame, camera_id, camera_name, location, best_detection)
+                self.handle_detection(frame, camera_id, camera_name, location, detections.best())
         
         return detection_found, highest_confidence, all_detections
     
@@ -190,6 +173,10 @@ class FireSmokeDetector:
         print(f"📍 Location: {location}")
         print(f"🎯 Looking for: fire, smoke")
         print(f"💡 TIP: Hold a lighter or match in front of camera to test")
+        preview_host = os.getenv('PREVIEW_HOST', '127.0.0.1')
+        self.preview.register(camera_id)
+        start_preview_server(self.preview, preview_host, self.preview_port)
+        print(f"👀 Live preview: http://{preview_host}:{self.preview_port}/preview/{camera_id}")
         print("=" * 60)
         
         if stream_url == "0":
@@ -203,6 +190,8 @@ class FireSmokeDetector:
         
         frame_count = 0
         detection_count = 0
+        # Higher analysis rate than production for faster response while testing
+        sampler = AdaptiveSampler(target_fps=5.0, idle_fps=5.0, boost_fps=10.0)
         
         try:
             while True:
@@ -212,32 +201,27 @@ class FireSmokeDetector:
                     break
                 
                 frame_count += 1
+                self.preview.update_frame(camera_id, frame)
                 
-                # Process every 5th frame for faster response
-                if frame_count % 5 == 0:
-                    print(f"\n📋 Frame {frame_count} - Analyzing...")
+                # Analyse at the sampler's rate regardless of the camera's FPS
+                if sampler.due():
+                    print(f"\n📋 Frame {frame_count} - Analyzing... ({sampler.current_fps():.1f} fps)")
+                    started = time.time()
                     detected, confidence, all_detections = self.process_frame(
                         frame, camera_id, camera_name, location, show_debug=True
                     )
+                    sampler.record(time.time() - started, confidence)
+                    self.preview.update_detections(camera_id, all_detections, detected and confidence >= 0.6)
+                    print(f"⏱️ Inference: {(time.time() - started) * 1000:.0f}ms")
                     
                     if detected:
                         detection_count += 1
                         print(f"🎉 Total detections so far: {detection_count}")
                 
-                # Show frame with detections (optional)
-                cv2.imshow(f"🔥 Fire Detection - {camera_name}", frame)
-                
-                # Press 'q' to quit
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-                
-                time.sleep(0.2)  # Faster processing for testing
-                
         except KeyboardInterrupt:
             print(f"\n🛑 Monitoring stopped")
         finally:
             cap.release()
-            cv2.destroyAllWindows()
             print(f"📊 Final stats: {frame_count} frames processed, {detection_count} fire/smoke detections")
 
 def main():
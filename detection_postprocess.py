@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Vectorised Detection Post-Processing
+Turns a predict result into a compact, array-backed fire/smoke record in one
+shot: the boxes are copied off the model once as an (N, 6) array
+[x1, y1, x2, y2, conf, cls], fire/smoke classes are selected with a precomputed
+class-id mask and the best box is found with argmax. No per-box Python objects
+are created unless an alert actually needs a dict.
+"""
+
+import numpy as np
+
+FIRE_SMOKE_LABELS = ('fire', 'smoke')
+
+_EMPTY = np.zeros((0, 6), dtype=np.float32)
+
+
+def boxes_to_array(boxes):
+    """
+    Convert ultralytics Boxes (or an existing (N, 6) array) to a float32 numpy array
+    """
+    if boxes is None:
+        return _EMPTY
+    data = getattr(boxes, 'data', boxes)
+    if hasattr(data, 'cpu'):
+        data = data.cpu().numpy()
+    data = np.asarray(data, dtype=np.float32)
+    if data.size == 0:
+        return _EMPTY
+    return data.reshape(-1, data.shape[-1])[:, :6]
+
+
+class FireSmokeDetections:
+    """
+    Fire/smoke boxes of one frame, kept as a single (M, 6) array
+    """
+    __slots__ = ('data', 'best_index', 'names')
+
+    def __init__(self, data, names):
+        self.data = data
+        self.names = names
+        self.best_index = int(np.argmax(data[:, 4])) if len(data) else -1
+
+    @property
+    def found(self):
+        return self.best_index >= 0
+
+    @property
+    def best_confidence(self):
+        return float(self.data[self.best_index, 4]) if self.found else 0.0
+
+    @property
+    def best_cls(self):
+        return int(self.data[self.best_index, 5]) if self.found else -1
+
+    @property
+    def best_label(self):
+        return self.names[self.best_cls] if self.found else None
+
+    @property
+    def best_bbox(self):
+        return self.data[self.best_index, :4] if self.found else None
+
+    def __len__(self):
+        return len(self.data)
+
+    def best(self):
+        """
+        Best detection as the dict used by the alert path (None if nothing found)
+        """
+        if not self.found:
+            return None
+        return {
+            'label': self.best_label,
+            'confidence': self.best_confidence,
+            'bbox': self.best_bbox.tolist(),
+            'cls_id': self.best_cls
+        }
+
+
+class FireSmokeFilter:
+    def __init__(self, names, labels=FIRE_SMOKE_LABELS):
+        """
+        Args:
+            names: Model class names, {class_id: name}
+            labels: Class names (case-insensitive) to keep
+        """
+        self.names = names
+        wanted = {label.lower() for label in labels}
+        self.class_mask = np.zeros(max(names) + 1 if names else 1, dtype=bool)
+        for class_id, name in names.items():
+            if name.lower() in wanted:
+                self.class_mask[class_id] = True
+
+    def select(self, boxes, min_confidence=0.0):
+        """
+        Keep only fire/smoke boxes (at or above min_confidence)
+        Args:
+            boxes: ultralytics Boxes or (N, 6) array
+        Returns:
+            FireSmokeDetections
+        """
+        data = boxes_to_array(boxes)
+        if len(data):
+            cls_ids = data[:, 5].astype(np.intp)
+            keep = self.class_mask[np.clip(cls_ids, 0, len(self.class_mask) - 1)]
+            keep &= cls_ids < len(self.class_mask)
+            if min_confidence > 0:
+                keep &= data[:, 4] >= min_confidence
+            data = data[keep]
+        return FireSmokeDetections(data, self.names)
+
+
+def non_max_suppression(data, iou_threshold=0.7, max_detections=300):
+    """
+    Class-aware greedy NMS over an (N, 6) [x1, y1, x2, y2, conf, cls] array
+    Returns the kept rows, highest confidence first
+    """
+    if len(data) == 0:
+        return _EMPTY
+    order = np.argsort(-data[:, 4])
+    data = data[order]
+
+    # Shift each class into its own coordinate range so boxes of different classes never overlap
+    offset = data[:, 5:6] * (data[:, :4].max() + 1)
+    boxes = data[:, :4] + offset
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    keep = []
+    candidates = np.arange(len(data))
+    while len(candidates) and len(keep) < max_detections:
+        best = candidates[0]
+        keep.append(best)
+        rest = candidates[1:]
+        x1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+        y1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+        x2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+        y2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        iou = inter / (areas[best] + areas[rest] - inter + 1e-9)
+        candidates = rest[iou <= iou_threshold]
+    return data[keep]
+
+
+def box_iou(a, b):
+    """
+    IoU matrix between (N, 4) and (M, 4) xyxy boxes
+    """
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
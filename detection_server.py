@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Fire/Smoke Detection Server
+Loads the YOLO model once and analyses frames from many cameras with shared,
+batched predict calls. Cameras are added and removed at runtime through a small
+HTTP control API on localhost.
+
+Usage: python detection_server.py [--port 8765] [--model best_01.pt] [--batch-size 8] [--decoder-processes]
+
+Control API:
+    GET    /health              Server status
+    GET    /cameras             List monitored cameras with counters
+    GET    /metrics             Prometheus metrics (stage latency histograms, per-camera counters)
+    GET    /preview/<cameraId>  Annotated MJPEG stream (?fps=N), /preview/<cameraId>.jpg for one frame
+    POST   /cameras             {"cameraId", "streamUrl", "cameraName", "location", "analysisFps",
+                                 "tileRegions", "roi", "capture": {"backend", "scaleTo", "skip"},
+                                 "priority", "minFps"}
+    DELETE /cameras/<cameraId>  Stop monitoring a camera
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from detector_metrics import METRICS
+from ffmpeg_capture import CAPTURE_BACKENDS, SKIP_MODES
+from frame_grabber import LatestFrameGrabber
+from frame_sampler import AdaptiveSampler
+from inference_backends import BACKENDS
+from inference_scheduler import EVIDENCE_FIRE, EVIDENCE_MOTION, EVIDENCE_NONE, InferenceScheduler
+from mdl import FireSmokeDetector
+from preview_server import handle_preview_request
+from roi_masks import RoiMask
+from shm_transport import ShmCaptureManager
+from thread_budget import available_cores
+from tiled_inference import validate_regions
+
+
+def parse_capture_options(options):
+    """
+    Validate per-camera decode settings from the control API; missing keys use the CAPTURE_* env defaults
+    """
+    if not options:
+        return None
+    backend, skip = options.get('backend'), options.get('skip')
+    if backend is not None and backend not in CAPTURE_BACKENDS:
+        raise ValueError(f"capture.backend must be one of {', '.join(CAPTURE_BACKENDS)}")
+    if skip is not None and skip not in SKIP_MODES:
+        raise ValueError(f"capture.skip must be one of {', '.join(SKIP_MODES)}")
+    scale_to = options.get('scaleTo')
+    return {'backend': backend, 'scale_to': int(scale_to) if scale_to else None, 'skip': skip}
+
+
+class CameraStream:
+    """
+    One monitored camera: a latest-frame grabber plus per-camera counters
+    """
+    def __init__(self, camera_id, stream_url, camera_name, location, analysis_fps=2.0, capture=None,
+                 capture_options=None, on_frame=None):
+        self.camera_id = camera_id
+        self.stream_url = stream_url
+        self.camera_name = camera_name
+        self.location = location
+
+        # Decode in this process's threads, or in a decoder process through shared memory
+        if capture is not None:
+            self.grabber = capture.open(camera_id, stream_url, name=camera_name, capture_options=capture_options)
+        else:
+            self.grabber = LatestFrameGrabber(stream_url, name=camera_name, capture_options=capture_options,
+                                              on_frame=on_frame, camera_id=camera_id)
+        self.on_frame = on_frame if capture is not None else None  # Shared-memory frames are fed when taken
+        self.sampler = AdaptiveSampler(target_fps=analysis_fps)
+        self.frames_analyzed = 0
+        self.detection_count = 0
+
+    def start(self):
+        self.grabber.start()
+
+    def stop(self):
+        self.grabber.stop()
+
+    def take_frame(self):
+        """
+        Return (frame, frame_time) for the newest frame if it has not been analysed yet, otherwise None
+        """
+        item = self.grabber.read(timeout=0)
+        if item is None:
+            return None
+        if self.on_frame is not None:
+            self.on_frame(item[0], item[2])
+        return item[0], item[2]
+
+    def status(self, detector, scheduler):
+        status = {
+            'cameraId': self.camera_id,
+            'cameraName': self.camera_name,
+            'location': self.location,
+            'streamUrl': self.stream_url,
+            'framesAnalyzed': self.frames_analyzed,
+            'detections': self.detection_count
+        }
+        status.update(self.grabber.stats())
+        status.update(self.sampler.stats())
+        status['motionGate'] = detector.gating_stats(self.camera_id)
+        status['alertEvidence'] = detector.temporal_filter.state(self.camera_id)
+        status['colorGate'] = detector.color_gate_stats(self.camera_id)
+        status['schedule'] = scheduler.camera_stats(self.camera_id)
+        status['clipBuffer'] = detector.clip_stats(self.camera_id)
+        status['previewViewers'] = detector.preview.viewers(self.camera_id)
+        return status
+
+
+class DetectionServer:
+    """
+    Shares one FireSmokeDetector between all cameras and batches their frames
+    """
+    def __init__(self, detector, batch_size=8, analysis_fps=2.0, capture=None, scheduler=None,
+                 evidence_window=30.0):
+        """
+        Args:
+            capture: Optional ShmCaptureManager; cameras are then decoded in separate processes
+            scheduler: InferenceScheduler sharing the analysis budget between cameras
+            evidence_window: Seconds a fire/smoke hit or motion keeps a camera ahead for leftover capacity
+        """
+        self.detector = detector
+        self.batch_size = batch_size
+        self.analysis_fps = analysis_fps  # Default analysed frames per second per camera
+        self.capture = capture
+        self.scheduler = scheduler or InferenceScheduler()
+        self.evidence_window = evidence_window
+        self.cameras = {}
+        self.cameras_lock = threading.Lock()
+        self.running = False
+        self.batches_run = 0
+
+    def add_camera(self, camera_id, stream_url, camera_name, location, analysis_fps=None, tile_regions=None,
+                   roi=None, capture_options=None, priority=None, min_fps=None):
+        """
+        Args:
+            capture_options: Optional {'backend', 'scaleTo', 'skip'} decode settings for this camera
+            priority: Scheduling priority (default 1; e.g. kitchen 3, car park 0.5)
+            min_fps: Guaranteed analysed frames per second (default MIN_ANALYSIS_FPS or 0.2)
+        """
+        # Validate everything first so a rejected request leaves no per-camera state behind
+        capture_options = parse_capture_options(capture_options)
+        if tile_regions:
+            tile_regions = validate_regions(tile_regions)
+        if roi:
+            RoiMask(roi)
+        with self.cameras_lock:
+            if camera_id in self.cameras:
+                return False
+            self.scheduler.add_camera(camera_id, priority=priority if priority is not None else 1.0,
+                                      min_fps=min_fps if min_fps is not None
+                                      else float(os.getenv('MIN_ANALYSIS_FPS', 0.2)))
+            if tile_regions:
+                self.detector.tile_regions[camera_id] = tile_regions
+            if roi:
+                self.detector.set_roi(camera_id, roi)
+            self.detector.preview.register(camera_id)
+            on_frame = lambda frame, frame_time: self.detector.record_frame(camera_id, frame, frame_time)
+            stream = CameraStream(camera_id, stream_url, camera_name, location,
+                                  analysis_fps=analysis_fps or self.analysis_fps, capture=self.capture,
+                                  capture_options=capture_options, on_frame=on_frame)
+            self.cameras[camera_id] = stream
+        stream.start()
+        print(f"🎥 Camera added: {camera_name} ({location}) | {stream_url}")
+        return True
+
+    def remove_camera(self, camera_id):
+        with self.cameras_lock:
+            stream = self.cameras.pop(camera_id, None)
+            self.scheduler.remove_camera(camera_id)
+        if stream is None:
+            return False
+        stream.stop()
+        self.detector.forget_camera(camera_id)
+        print(f"🛑 Camera removed: {stream.camera_name}")
+        return True
+
+    def status(self):
+        with self.cameras_lock:
+            streams = list(self.cameras.values())
+        return {
+            'running': self.running,
+            'cameras': len(streams),
+            'batchSize': self.batch_size,
+            'batchesRun': self.batches_run,
+            'notifier': self.detector.notifier.stats(),
+            'cascade': self.detector.backend.stats() if hasattr(self.detector.backend, 'stats') else None,
+            'scheduler': self.scheduler.stats()
+        }
+
+    def camera_statuses(self):
+        with self.cameras_lock:
+            streams = list(self.cameras.values())
+        return [stream.status(self.detector, self.scheduler) for stream in streams]
+
+    def _evidence(self, stream, now):
+        if now - stream.sampler.last_hit_time < self.evidence_window:
+            return EVIDENCE_FIRE
+        if now - self.detector.last_motion_time(stream.camera_id) < self.evidence_window:
+            return EVIDENCE_MOTION
+        return EVIDENCE_NONE
+
+    def _collect_batch(self):
+        now = time.time()
+        with self.cameras_lock:
+            streams = dict(self.cameras)
+            # Each camera's sampler says what it wants; the scheduler decides what it gets
+            self.scheduler.allocate({camera_id: (stream.sampler.current_fps(now), self._evidence(stream, now))
+                                     for camera_id, stream in streams.items()}, now)
+            due = self.scheduler.order(streams, now)
+
+        batch = []
+        for camera_id in due:
+            if len(batch) >= self.batch_size:
+                break
+            item = streams[camera_id].take_frame()
+            if item is not None:
+                batch.append((streams[camera_id], item[0], item[1]))
+        return batch
+
+    def run(self):
+        """
+        Inference loop: gather due frames from all cameras and predict them together
+        """
+        self.running = True
+        print(f"🤖 Inference loop started (batch size {self.batch_size})")
+
+        while self.running:
+            batch = self._collect_batch()
+            if not batch:
+                time.sleep(0.01)
+                continue
+
+            started = time.time()
+            try:
+                results = self.detector.process_batch([
+                    (frame, stream.camera_id, stream.camera_name, stream.location)
+                    for stream, frame, _frame_time in batch
+                ])
+            except Exception as e:
+                print(f"❌ Batch detection error: {e}")
+                continue
+
+            self.batches_run += 1
+            finished = time.time()
+            per_frame_time = (finished - started) / len(batch)
+            self.scheduler.record_batch(len(batch), finished - started)
+            for (stream, _, frame_time), (detected, confidence) in zip(batch, results):
+                stream.sampler.record(per_frame_time, confidence)
+                self.scheduler.record(stream.camera_id, frame_time, finished)
+                stream.frames_analyzed += 1
+                if detected:
+                    stream.detection_count += 1
+
+    def stop(self):
+        self.running = False
+        with self.cameras_lock:
+            camera_ids = list(self.cameras.keys())
+        for camera_id in camera_ids:
+            self.remove_camera(camera_id)
+        if self.capture is not None:
+            self.capture.close()
+
+
+class ControlRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON control API for adding and removing cameras
+    """
+    def log_message(self, format, *args):
+        pass  # Keep the detector output readable
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length == 0:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def do_GET(self):
+        detection_server = self.server.detection_server
+        if self.path == '/health':
+            self._send_json(200, {'success': True, 'status': detection_server.status()})
+        elif self.path == '/cameras':
+            self._send_json(200, {'success': True, 'cameras': detection_server.camera_statuses()})
+        elif self.path == '/metrics':
+            body = METRICS.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif not handle_preview_request(self, detection_server.detector.preview):
+            self._send_json(404, {'success': False, 'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path != '/cameras':
+            self._send_json(404, {'success': False, 'error': 'Not found'})
+            return
+
+        try:
+            body = self._read_json()
+        except ValueError:
+            self._send_json(400, {'success': False, 'error': 'Invalid JSON'})
+            return
+
+        camera_id = body.get('cameraId')
+        stream_url = body.get('streamUrl')
+        if not camera_id or not stream_url:
+            self._send_json(400, {'success': False, 'error': 'cameraId and streamUrl are required'})
+            return
+
+        try:
+            added = self.server.detection_server.add_camera(
+                str(camera_id),
+                stream_url,
+                body.get('cameraName', str(camera_id)),
+                body.get('location', 'Unknown Location'),
+                analysis_fps=float(body['analysisFps']) if body.get('analysisFps') else None,
+                tile_regions=body.get('tileRegions'),
+                roi=body.get('roi'),
+                capture_options=body.get('capture'),
+                priority=float(body['priority']) if body.get('priority') is not None else None,
+                min_fps=float(body['minFps']) if body.get('minFps') is not None else None
+            )
+        except (TypeError, ValueError) as e:
+            self._send_json(400, {'success': False, 'error': f'Invalid camera settings: {e}'})
+            return
+        self._send_json(200, {'success': True, 'added': added})
+
+    def do_DELETE(self):
+        prefix = '/cameras/'
+        if not self.path.startswith(prefix):
+            self._send_json(404, {'success': False, 'error': 'Not found'})
+            return
+
+        removed = self.server.detection_server.remove_camera(unquote(self.path[len(prefix):]))
+        if removed:
+            self._send_json(200, {'success': True})
+        else:
+            self._send_json(404, {'success': False, 'error': 'Camera not monitored'})
+
+
+def start_control_api(detection_server, host, port):
+    httpd = ThreadingHTTPServer((host, port), ControlRequestHandler)
+    httpd.daemon_threads = True
+    httpd.detection_server = detection_server
+    thread = threading.Thread(target=httpd.serve_forever, name="control-api", daemon=True)
+    thread.start()
+    return httpd
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared fire/smoke detection server")
+    parser.add_argument('--host', default=os.getenv('DETECTION_SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('DETECTION_SERVER_PORT', 8765)))
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'best_01.pt'))
+    parser.add_argument('--backend', default=os.getenv('INFERENCE_BACKEND', 'torch'), choices=BACKENDS)
+    parser.add_argument('--int8', action='store_true', default=os.getenv('INFERENCE_PRECISION') == 'int8',
+                        help="Load the INT8 model built by quantize_model.py (onnx backend)")
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('DETECTION_BATCH_SIZE', 8)))
+    parser.add_argument('--fps', type=float, default=float(os.getenv('ANALYSIS_FPS', 2.0)),
+                        help="Default analysed frames per second per camera")
+    parser.add_argument('--decoder-processes', action='store_true', default=os.getenv('SHM_CAPTURE') == '1',
+                        help="Decode streams in separate processes and hand frames over in shared memory")
+    parser.add_argument('--cameras-per-decoder', type=int, default=int(os.getenv('CAMERAS_PER_DECODER', 8)))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('INFERENCE_THREADS', 0)),
+                        help="Inference threads (torch / ONNX Runtime / OpenVINO); 0 = library default")
+    parser.add_argument('--cpu-affinity', default=os.getenv('CPU_AFFINITY'),
+                        help="Cores for the inference process, e.g. 0-5")
+    parser.add_argument('--decoder-cores', type=int, default=int(os.getenv('DECODER_CORES', 0)),
+                        help="With --decoder-processes: pin decoders to the last N cores, inference to the rest")
+    parser.add_argument('--budget-fps', type=float, default=float(os.getenv('INFERENCE_BUDGET_FPS', 0)),
+                        help="Analysed frames per second for all cameras together (0 = measure capacity)")
+    parser.add_argument('--utilisation', type=float, default=float(os.getenv('INFERENCE_UTILISATION', 0.8)),
+                        help="Share of the measured inference capacity to hand out when --budget-fps is 0")
+    args = parser.parse_args()
+
+    print("🚀 Fire/Smoke Detection Server Starting...")
+    # The detector reads its thread budget from the environment (see thread_budget.py)
+    decoder_cores = None
+    if args.decoder_processes and args.decoder_cores:
+        cores = available_cores()
+        if args.decoder_cores >= len(cores):
+            parser.error(f"--decoder-cores must leave cores for inference ({len(cores)} available)")
+        decoder_cores = cores[-args.decoder_cores:]
+        if not args.cpu_affinity:
+            args.cpu_affinity = ','.join(str(core) for core in cores[:-args.decoder_cores])
+    if args.threads:
+        os.environ['INFERENCE_THREADS'] = str(args.threads)
+    if args.cpu_affinity:
+        os.environ['CPU_AFFINITY'] = args.cpu_affinity
+    print("🔧 Loading model once for all cameras...")
+    precision = 'int8' if args.int8 else 'fp32'
+    detector = FireSmokeDetector(model_path=args.model, backend=args.backend, precision=precision)
+    print(f"✅ Model loaded: {args.model} ({args.backend} backend, {precision})")
+
+    capture = None
+    if args.decoder_processes:
+        capture = ShmCaptureManager(cameras_per_process=args.cameras_per_decoder,
+                                    max_width=int(os.getenv('SHM_MAX_WIDTH', 1920)),
+                                    max_height=int(os.getenv('SHM_MAX_HEIGHT', 1080)),
+                                    cores=decoder_cores)
+        print(f"🧵 Decoding in separate processes ({args.cameras_per_decoder} cameras each)")
+
+    scheduler = InferenceScheduler(budget_fps=args.budget_fps or None, utilisation=args.utilisation)
+    if args.budget_fps:
+        print(f"⚖️ Inference budget: {args.budget_fps:g} analysed frames/s across all cameras")
+    detection_server = DetectionServer(detector, batch_size=args.batch_size, analysis_fps=args.fps,
+                                       capture=capture, scheduler=scheduler)
+    httpd = start_control_api(detection_server, args.host, args.port)
+    print(f"🌐 Control API listening on http://{args.host}:{args.port}")
+
+    try:
+        detection_server.run()
+    except KeyboardInterrupt:
+        print("\n🛑 Detection server stopping...")
+    finally:
+        detection_server.stop()
+        detector.close()
+        httpd.shutdown()
+        print("📊 Detection server stopped")
+
+
+if __name__ == "__main__":
+    main()
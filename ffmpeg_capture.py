@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+FFmpeg / PyAV Capture Backends
+cv2.VideoCapture decodes every frame at full resolution and converts it to BGR,
+even though the detector only analyses a few frames per second at the model's
+input size. These captures decode through PyAV (libav in-process) or an ffmpeg
+subprocess pipe and let the decoder do the work:
+
+- scale_to: frames are scaled (longer side, aspect kept) and converted to BGR
+  by swscale in the same pass, so no full-resolution BGR frame is ever built
+- skip: 'nonref' skips decoding non-reference frames, 'keyframes' decodes only
+  keyframes (one per GOP, typically every 1-4 s) for low-priority cameras
+
+Both classes expose the cv2.VideoCapture subset the grabbers use (isOpened,
+read, release), so frame_grabber.open_capture can return them directly.
+
+Decode CPU benchmark against OpenCV:
+    python ffmpeg_capture.py --source footage/warehouse.mp4 --frames 300 --scale-to 640
+"""
+
+import argparse
+import json
+import os
+import select
+import shutil
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+SKIP_MODES = ('none', 'nonref', 'keyframes')
+CAPTURE_BACKENDS = ('opencv', 'pyav', 'ffmpeg')
+
+
+def scaled_size(width, height, scale_to):
+    """
+    Output size with the longer side at most scale_to (even dimensions, never upscaled)
+    """
+    if not scale_to or max(width, height) <= scale_to:
+        return width, height
+    scale = scale_to / max(width, height)
+    return max(int(round(width * scale / 2)) * 2, 2), max(int(round(height * scale / 2)) * 2, 2)
+
+
+def _is_network(stream_url):
+    return str(stream_url).startswith(('rtsp://', 'rtmp://', 'http://', 'https://'))
+
+
+class PyAvCapture:
+    def __init__(self, stream_url, scale_to=None, skip='none', timeout=10.0):
+        """
+        Args:
+            stream_url: File path or network stream URL
+            scale_to: Longer output side in pixels (None keeps the source size)
+            skip: 'none', 'nonref' or 'keyframes'
+            timeout: Seconds to wait when opening / reading a network stream
+        """
+        import av
+
+        self.scale_to = scale_to
+        self.container = None
+        self.frames = None
+        options = {'rtsp_transport': 'tcp', 'fflags': 'nobuffer', 'flags': 'low_delay'} \
+            if str(stream_url).startswith('rtsp://') else {}
+        try:
+            self.container = av.open(str(stream_url), options=options, timeout=timeout)
+            stream = self.container.streams.video[0]
+            stream.thread_type = 'AUTO'
+            if skip == 'keyframes':
+                stream.codec_context.skip_frame = 'NONKEY'
+            elif skip == 'nonref':
+                stream.codec_context.skip_frame = 'NONREF'
+            self.frames = self.container.decode(stream)
+        except (av.error.FFmpegError, OSError, IndexError) as e:
+            print(f"❌ PyAV could not open {stream_url}: {e}")
+            self.release()
+
+    def isOpened(self):
+        return self.frames is not None
+
+    def read(self):
+        if self.frames is None:
+            return False, None
+        try:
+            frame = next(self.frames)
+        except Exception:
+            # End of file, network error or corrupt packet: same contract as VideoCapture.read()
+            return False, None
+        width, height = scaled_size(frame.width, frame.height, self.scale_to)
+        # Scale and convert to BGR in one swscale pass
+        return True, frame.reformat(width=width, height=height, format='bgr24').to_ndarray()
+
+    def release(self):
+        if self.container is not None:
+            self.container.close()
+        self.container = None
+        self.frames = None
+
+
+class FfmpegPipeCapture:
+    def __init__(self, stream_url, scale_to=None, skip='none', ffmpeg='ffmpeg', ffprobe='ffprobe', timeout=15.0):
+        """
+        Args:
+            stream_url: File path or network stream URL
+            scale_to: Longer output side in pixels (None keeps the source size)
+            skip: 'none', 'nonref' or 'keyframes'
+            ffmpeg, ffprobe: Executables to run
+            timeout: Seconds ffprobe may take to read the stream size, and ffmpeg to deliver a frame
+                (a stalled stream is then a failed read, so the grabber's reconnect takes over)
+        """
+        self.process = None
+        self.timeout = timeout
+        self.size = self._probe_size(stream_url, ffprobe, timeout)
+        if self.size is None:
+            print(f"❌ ffprobe could not read the video size of {stream_url}")
+            return
+        self.size = scaled_size(*self.size, scale_to)
+        self.frame_bytes = self.size[0] * self.size[1] * 3
+
+        command = [ffmpeg, '-nostdin', '-loglevel', 'error']
+        timeout_us = str(int(timeout * 1000000))
+        if str(stream_url).startswith('rtsp://'):
+            command += ['-rtsp_transport', 'tcp', '-timeout', timeout_us]
+        elif _is_network(stream_url):
+            command += ['-rw_timeout', timeout_us]
+        if _is_network(stream_url):
+            command += ['-fflags', 'nobuffer', '-flags', 'low_delay']
+        if skip == 'keyframes':
+            command += ['-skip_frame', 'nokey']
+        elif skip == 'nonref':
+            command += ['-skip_frame', 'noref']
+        command += ['-i', str(stream_url), '-an', '-sn',
+                    '-vf', f"scale={self.size[0]}:{self.size[1]}", '-vsync', 'passthrough',
+                    '-pix_fmt', 'bgr24', '-f', 'rawvideo', 'pipe:1']
+        try:
+            self.process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        except OSError as e:
+            print(f"❌ Could not start ffmpeg: {e}")
+
+    @staticmethod
+    def _probe_size(stream_url, ffprobe, timeout):
+        try:
+            output = subprocess.run(
+                [ffprobe, '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height',
+                 '-of', 'json', str(stream_url)],
+                capture_output=True, timeout=timeout, check=True
+            ).stdout
+            stream = json.loads(output)['streams'][0]
+            return int(stream['width']), int(stream['height'])
+        except (OSError, subprocess.SubprocessError, ValueError, KeyError, IndexError):
+            return None
+
+    def isOpened(self):
+        return self.process is not None and self.process.poll() is None
+
+    def read(self):
+        if self.process is None:
+            return False, None
+        # Read with a deadline: a stream that stalls without closing would block a plain read forever
+        data = bytearray(self.frame_bytes)
+        view = memoryview(data)
+        received = 0
+        deadline = time.monotonic() + self.timeout
+        while received < self.frame_bytes:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.process.stdout], [], [], remaining)[0]:
+                print(f"⚠️ ffmpeg delivered no frame in {self.timeout:g}s, treating the stream as stalled")
+                self.release()  # Later reads fail at once, so the grabber reconnects without waiting again
+                return False, None
+            count = self.process.stdout.readinto(view[received:])
+            if not count:
+                return False, None  # ffmpeg exited (end of file or a network error)
+            received += count
+        return True, np.frombuffer(data, dtype=np.uint8).reshape(self.size[1], self.size[0], 3)
+
+    def release(self):
+        if self.process is None:
+            return
+        self.process.kill()
+        self.process.wait()
+        self.process.stdout.close()
+        self.process = None
+
+
+def create_capture(stream_url, backend='opencv', scale_to=None, skip='none', timeout=None):
+    """
+    Open a capture with the VideoCapture interface for the selected decode backend
+    Args:
+        timeout: Optional open/read timeout in seconds (backend default when None)
+    """
+    if backend == 'pyav':
+        return PyAvCapture(stream_url, scale_to=scale_to, skip=skip, timeout=timeout or 10.0)
+    if backend == 'ffmpeg':
+        return FfmpegPipeCapture(stream_url, scale_to=scale_to, skip=skip, timeout=timeout or 15.0)
+    if backend != 'opencv':
+        raise ValueError(f"Unknown capture backend '{backend}', expected one of {', '.join(CAPTURE_BACKENDS)}")
+    source = int(stream_url) if str(stream_url).isdigit() else stream_url
+    if timeout:
+        timeout_ms = int(timeout * 1000)
+        cap = cv2.VideoCapture(source, cv2.CAP_ANY, [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+                                                     cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms])
+    else:
+        cap = cv2.VideoCapture(source)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+def benchmark_decode(stream_url, backend, frames=300, scale_to=None, skip='none'):
+    """
+    Decode up to `frames` frames and measure wall time and CPU (including an ffmpeg child)
+    """
+    before = os.times()
+    started = time.perf_counter()
+    cap = create_capture(stream_url, backend, scale_to=scale_to, skip=skip)
+    if not cap.isOpened():
+        return None
+
+    decoded, shape = 0, None
+    while decoded < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if backend == 'opencv' and scale_to:
+            # OpenCV has to decode at full size and resize afterwards
+            width, height = scaled_size(frame.shape[1], frame.shape[0], scale_to)
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        shape = frame.shape
+        decoded += 1
+    cap.release()  # Waits for an ffmpeg child so its CPU time shows up in os.times()
+
+    elapsed = time.perf_counter() - started
+    after = os.times()
+    cpu = (after.user - before.user + after.system - before.system +
+           after.children_user - before.children_user + after.children_system - before.children_system)
+    return {
+        'backend': backend,
+        'skip': skip,
+        'frames': decoded,
+        'outputSize': f"{shape[1]}x{shape[0]}" if shape else None,
+        'wallSeconds': round(elapsed, 3),
+        'fps': round(decoded / elapsed, 1) if elapsed else 0.0,
+        'cpuSeconds': round(cpu, 3),
+        'cpuMsPerFrame': round(cpu * 1000 / decoded, 2) if decoded else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare decode CPU per stream: OpenCV vs PyAV vs ffmpeg pipe")
+    parser.add_argument('--source', required=True, help="Video file or stream URL")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--scale-to', type=int, default=640, help="Longer output side (0 = source size)")
+    parser.add_argument('--backends', nargs='+', default=list(CAPTURE_BACKENDS), choices=CAPTURE_BACKENDS)
+    parser.add_argument('--skip', nargs='+', default=list(SKIP_MODES), choices=SKIP_MODES)
+    parser.add_argument('--output', default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for backend in args.backends:
+        if backend == 'ffmpeg' and shutil.which('ffmpeg') is None:
+            print("⚠️ ffmpeg not found on PATH, skipping")
+            continue
+        # OpenCV cannot skip frames inside the decoder
+        for skip in (args.skip if backend != 'opencv' else ['none']):
+            try:
+                result = benchmark_decode(args.source, backend, args.frames, args.scale_to or None, skip)
+            except ImportError:
+                print(f"⚠️ {backend} is not installed, skipping")
+                break
+            if result is None:
+                print(f"❌ {backend} could not open {args.source}")
+                break
+            results.append(result)
+            print(f"🎞️ {backend:<7} skip={skip:<9} {result['frames']:>5} frames {result['outputSize']} | "
+                  f"{result['fps']:>7.1f} fps | CPU {result['cpuMsPerFrame']} ms/frame")
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'source': args.source, 'results': results}, output_file, indent=2)
+        print(f"📝 Results written: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Fire/Smoke Region Tracker
+Small IoU tracker with a centroid fallback that gives every fire/smoke region
+a stable track id across analysed frames. The detector opens one incident per
+track and afterwards only sends cheap updates (confidence, bbox growth), so a
+fire burning for minutes is a single incident instead of one every cooldown.
+
+Matching is class-agnostic: fire and smoke boxes from the same region belong
+to the same event, and the track label follows its most confident detection.
+"""
+
+import itertools
+import time
+import uuid
+
+import numpy as np
+
+from detection_postprocess import box_iou
+
+# Track ids are <camera>-<run>-<n>: the run prefix keeps them unique across restarts, so a new
+# fire can never be matched to an old incident that reused the same counter value
+_run_id = uuid.uuid4().hex[:12]
+_track_ids = itertools.count(1)
+
+
+class Track:
+    __slots__ = ('track_id', 'cls_id', 'bbox', 'confidence', 'max_confidence', 'first_seen', 'last_seen',
+                 'hits', 'incident_opened', 'last_report_time', 'last_report_confidence', 'last_report_area')
+
+    def __init__(self, track_id, row, now):
+        self.track_id = track_id
+        self.cls_id = int(row[5])
+        self.bbox = row[:4].copy()
+        self.confidence = float(row[4])
+        self.max_confidence = self.confidence
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.incident_opened = False
+        self.last_report_time = 0.0
+        self.last_report_confidence = 0.0
+        self.last_report_area = 0.0
+
+    @property
+    def area(self):
+        return float(max(self.bbox[2] - self.bbox[0], 0) * max(self.bbox[3] - self.bbox[1], 0))
+
+    def update(self, row, now):
+        self.bbox = row[:4].copy()
+        self.confidence = float(row[4])
+        if self.confidence >= self.max_confidence:
+            self.max_confidence = self.confidence
+            self.cls_id = int(row[5])
+        self.last_seen = now
+        self.hits += 1
+
+    def mark_reported(self, now):
+        self.incident_opened = True
+        self.last_report_time = now
+        self.last_report_confidence = self.confidence
+        self.last_report_area = self.area
+
+    def update_due(self, now, interval=10.0, heartbeat=60.0, confidence_step=0.05, growth=0.2):
+        """
+        Whether an open incident should get an update: the region grew or got more
+        certain since the last report (at most once per interval), or a heartbeat is due
+        """
+        elapsed = now - self.last_report_time
+        if elapsed >= heartbeat:
+            return True
+        if elapsed < interval:
+            return False
+        return (self.confidence >= self.last_report_confidence + confidence_step or
+                self.area >= self.last_report_area * (1 + growth))
+
+    def detection(self, names):
+        """
+        The track as the detection dict used by the alert path
+        """
+        return {
+            'label': names[self.cls_id],
+            'confidence': self.confidence,
+            'bbox': self.bbox.tolist(),
+            'cls_id': self.cls_id,
+            'track_id': self.track_id
+        }
+
+
+class IoUTracker:
+    def __init__(self, camera_id, iou_threshold=0.3, centroid_threshold=0.5, max_age=30.0):
+        """
+        Args:
+            camera_id: Used as the prefix of track ids
+            iou_threshold: Minimum IoU to continue a track
+            centroid_threshold: Centroid distance, relative to the track's box diagonal, accepted
+                when the IoU is too low (flames change shape quickly)
+            max_age: Seconds a track survives without a matching detection
+        """
+        self.camera_id = camera_id
+        self.iou_threshold = iou_threshold
+        self.centroid_threshold = centroid_threshold
+        self.max_age = max_age
+        self.tracks = []
+
+    def update(self, data, now=None):
+        """
+        Match this frame's (N, 6) fire/smoke detections to the existing tracks
+        Returns:
+            Tracks seen in this frame (continued and new)
+        """
+        now = time.time() if now is None else now
+        self.tracks = [track for track in self.tracks if now - track.last_seen <= self.max_age]
+        if not len(data):
+            return []
+
+        matched_tracks = []
+        unmatched = np.ones(len(data), dtype=bool)
+        if self.tracks:
+            track_boxes = np.stack([track.bbox for track in self.tracks])
+            iou = box_iou(track_boxes, data[:, :4])
+
+            track_centres = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+            centres = (data[:, :2] + data[:, 2:4]) / 2
+            diagonals = np.hypot(track_boxes[:, 2] - track_boxes[:, 0], track_boxes[:, 3] - track_boxes[:, 1])
+            distance = np.linalg.norm(track_centres[:, None] - centres[None], axis=2) / (diagonals[:, None] + 1e-9)
+
+            valid = (iou >= self.iou_threshold) | (distance <= self.centroid_threshold)
+            # Prefer overlap, break ties (e.g. zero IoU) by the closest centre
+            affinity = np.where(valid, iou - distance * 1e-3, -np.inf)
+
+            # Greedy assignment, best pair first
+            while np.isfinite(affinity).any():
+                t, d = np.unravel_index(np.argmax(affinity), affinity.shape)
+                self.tracks[t].update(data[d], now)
+                matched_tracks.append(self.tracks[t])
+                unmatched[d] = False
+                affinity[t, :] = -np.inf
+                affinity[:, d] = -np.inf
+
+        for row in data[unmatched]:
+            track = Track(f"{self.camera_id}-{_run_id}-{next(_track_ids)}", row, now)
+            self.tracks.append(track)
+            matched_tracks.append(track)
+        return matched_tracks
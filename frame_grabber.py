@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Latest-Frame Grabber
+Decodes a camera stream on its own thread and keeps only the newest frame in a
+one-slot buffer, so the inference loop never works through a backlog of old
+frames (CAP_PROP_BUFFERSIZE=1 is ignored by many RTSP/HTTP backends).
+"""
+
+import os
+import threading
+import time
+
+from detector_metrics import FRAMES_DECODED, STAGE_SECONDS
+from ffmpeg_capture import create_capture
+from stream_connection import StreamConnector
+
+
+def open_capture(stream_url, capture_options=None, timeout=None):
+    """
+    Open a capture with the cv2.VideoCapture interface, treating digit-only URLs as local webcam indexes
+    Args:
+        capture_options: Optional {'backend', 'scale_to', 'skip'}; defaults come from CAPTURE_BACKEND
+            (opencv, pyav or ffmpeg), CAPTURE_SCALE_TO and CAPTURE_SKIP (none, nonref, keyframes)
+        timeout: Optional open/read timeout in seconds
+    """
+    options = {
+        'backend': os.getenv('CAPTURE_BACKEND', 'opencv'),
+        'scale_to': int(os.getenv('CAPTURE_SCALE_TO', 0)) or None,
+        'skip': os.getenv('CAPTURE_SKIP', 'none')
+    }
+    options.update({key: value for key, value in (capture_options or {}).items() if value is not None})
+    if str(stream_url).isdigit():
+        options['backend'] = 'opencv'  # Local webcams are only supported through OpenCV
+    return create_capture(stream_url, options['backend'], scale_to=options['scale_to'], skip=options['skip'],
+                          timeout=timeout)
+
+
+def stream_connector(stream_url, name=None, capture_options=None):
+    """
+    StreamConnector that opens candidate URLs with open_capture and the given capture options
+    """
+    return StreamConnector(stream_url, lambda url, timeout: open_capture(url, capture_options, timeout),
+                           name=name, probe_timeout=float(os.getenv('STREAM_PROBE_TIMEOUT', 5.0)))
+
+
+class LatestFrameGrabber:
+    def __init__(self, stream_url, name=None, stale_after=1.0, max_failures=10, capture_options=None,
+                 on_frame=None, camera_id=None):
+        """
+        Args:
+            stream_url: Camera URL or webcam index
+            name: Label used in log lines
+            camera_id: Camera label of the metrics (same as the analysed/skipped series; default name)
+            stale_after: Age in seconds after which a frame handed out counts as stale
+            max_failures: Consecutive failed reads before the stream is reconnected (with backoff)
+            capture_options: Decode backend / scaling / frame skipping (see open_capture)
+            on_frame: Optional callback(frame, frame_time) run on the capture thread for every decoded frame
+        """
+        self.stream_url = stream_url
+        self.capture_options = capture_options
+        self.name = name or str(stream_url)
+        self.camera_id = camera_id if camera_id is not None else self.name
+        self.on_frame = on_frame
+        self.connector = stream_connector(stream_url, self.name, capture_options)
+        self.stale_after = stale_after
+        self.max_failures = max_failures
+
+        self.condition = threading.Condition()
+        self.frame = None
+        self.frame_seq = 0       # Sequence number of the frame in the slot
+        self.frame_time = 0.0    # time.time() when the frame in the slot was decoded
+        self.consumed_seq = 0    # Highest sequence number handed to a reader
+
+        self.connected = False
+        self.running = False
+        self.thread = None
+
+        # Counters
+        self.frames_decoded = 0
+        self.frames_dropped = 0  # Decoded but overwritten before anyone read them
+        self.stale_frames = 0    # Handed out older than stale_after seconds
+        self.read_failures = 0
+        self.reconnects = 0
+
+    def start(self):
+        """
+        Open the stream and start the capture thread
+        Returns True if the first open succeeded; otherwise the thread keeps reconnecting in the background
+        """
+        cap, frame = self.connector.connect()
+        opened = cap is not None
+        self.connected = opened
+        if opened:
+            self._publish(frame)
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, args=(cap,),
+                                       name=f"grabber-{self.name}", daemon=True)
+        self.thread.start()
+        return opened
+
+    def stop(self):
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def is_alive(self):
+        return self.running and self.thread is not None and self.thread.is_alive()
+
+    def _capture_loop(self, cap):
+        consecutive_failures = 0
+
+        try:
+            while self.running:
+                if cap is None:
+                    cap, frame = self.connector.reconnect(lambda: self.running)
+                    if cap is None:
+                        break
+                    self.reconnects += 1
+                    self.connected = True
+                    self._publish(frame)
+                    continue
+
+                read_started = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    self.connected = False
+                    self.read_failures += 1
+                    consecutive_failures += 1
+                    if consecutive_failures > self.max_failures:
+                        print(f"🔄 Reconnecting stream for camera {self.name}")
+                        cap.release()
+                        cap = None
+                        consecutive_failures = 0
+                        continue
+                    time.sleep(1)
+                    continue
+
+                STAGE_SECONDS.observe(time.perf_counter() - read_started, stage='capture')
+                consecutive_failures = 0
+                self.connected = True
+                self._publish(frame)
+        finally:
+            if cap is not None:
+                cap.release()
+            self.connected = False
+
+    def _publish(self, frame):
+        FRAMES_DECODED.inc(camera=self.camera_id)
+        frame_time = time.time()
+        with self.condition:
+            if self.frame_seq > self.consumed_seq:
+                self.frames_dropped += 1
+            self.frame = frame
+            self.frame_seq += 1
+            self.frame_time = frame_time
+            self.frames_decoded += 1
+            self.condition.notify_all()
+        if self.on_frame is not None:
+            try:
+                self.on_frame(frame, frame_time)
+            except Exception as e:
+                print(f"❌ Frame callback error for camera {self.name}: {e}")
+
+    def read(self, timeout=1.0):
+        """
+        Wait for a frame newer than the last one handed out
+        Returns (frame, seq, frame_time) or None on timeout / stop
+        """
+        with self.condition:
+            if self.frame_seq <= self.consumed_seq and timeout > 0:
+                self.condition.wait_for(
+                    lambda: self.frame_seq > self.consumed_seq or not self.running,
+                    timeout=timeout
+                )
+            if self.frame is None or self.frame_seq <= self.consumed_seq:
+                return None
+
+            self.consumed_seq = self.frame_seq
+            frame, seq, frame_time = self.frame, self.frame_seq, self.frame_time
+
+        if time.time() - frame_time > self.stale_after:
+            self.stale_frames += 1
+        return frame, seq, frame_time
+
+    def stats(self):
+        stats = {
+            'connected': self.connected,
+            'framesDecoded': self.frames_decoded,
+            'framesDropped': self.frames_dropped,
+            'staleFrames': self.stale_frames,
+            'readFailures': self.read_failures,
+            'reconnects': self.reconnects
+        }
+        stats.update(self.connector.stats())
+        return stats
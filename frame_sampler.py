@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Adaptive Frame Sampler
+Decides when a camera's next frame should be analysed. The rate is expressed in
+analysed frames per second (not "every Nth frame"), so CPU use no longer depends
+on the camera's own FPS. The rate is raised right after a fire/smoke hit, drops
+back to an idle rate on quiet cameras, and is capped by the measured inference
+cost so one camera cannot take more than its share of a core.
+"""
+
+import time
+
+
+class AdaptiveSampler:
+    def __init__(self, target_fps=2.0, idle_fps=0.5, boost_fps=5.0, boost_duration=10.0,
+                 idle_after=60.0, max_cpu_share=0.5):
+        """
+        Args:
+            target_fps: Normal analysed frames per second
+            idle_fps: Rate used after idle_after seconds without any fire/smoke evidence
+            boost_fps: Rate used for boost_duration seconds after a fire/smoke hit
+            boost_duration: Seconds to stay boosted after the last hit
+            idle_after: Seconds without evidence before dropping to idle_fps
+            max_cpu_share: Highest fraction of wall time this camera may spend in inference
+        """
+        self.target_fps = target_fps
+        self.idle_fps = min(idle_fps, target_fps)
+        self.boost_fps = max(boost_fps, target_fps)
+        self.boost_duration = boost_duration
+        self.idle_after = idle_after
+        self.max_cpu_share = max_cpu_share
+
+        now = time.time()
+        self.last_analysis_time = 0.0
+        self.last_hit_time = 0.0
+        self.started_time = now
+
+        self.avg_inference_time = 0.0  # EMA of seconds spent per analysed frame
+        self.frames_analyzed = 0
+        self.boosts = 0
+
+    def current_fps(self, now=None):
+        """
+        Analysed-FPS the camera should run at right now
+        """
+        now = now if now is not None else time.time()
+
+        if now - self.last_hit_time < self.boost_duration:
+            fps = self.boost_fps
+        elif now - max(self.last_hit_time, self.started_time) > self.idle_after:
+            fps = self.idle_fps
+        else:
+            fps = self.target_fps
+
+        # Never plan more inference time than the CPU share allows
+        if self.avg_inference_time > 0:
+            fps = min(fps, self.max_cpu_share / self.avg_inference_time)
+        return fps
+
+    def next_delay(self, now=None):
+        """
+        Seconds until the next frame is due (0 if it is due now)
+        """
+        now = now if now is not None else time.time()
+        fps = self.current_fps(now)
+        if fps <= 0:
+            return 1.0
+        return max(0.0, self.last_analysis_time + 1.0 / fps - now)
+
+    def due(self, now=None):
+        return self.next_delay(now) <= 0
+
+    def record(self, inference_time, confidence=0.0, now=None):
+        """
+        Record one analysed frame
+        Args:
+            inference_time: Seconds the analysis took
+            confidence: Highest fire/smoke confidence in the frame (0 if none)
+        """
+        now = now if now is not None else time.time()
+        self.last_analysis_time = now
+        self.frames_analyzed += 1
+
+        if self.avg_inference_time == 0:
+            self.avg_inference_time = inference_time
+        else:
+            self.avg_inference_time = 0.8 * self.avg_inference_time + 0.2 * inference_time
+
+        if confidence > 0:
+            if now - self.last_hit_time >= self.boost_duration:
+                self.boosts += 1
+            self.last_hit_time = now
+
+    def stats(self):
+        return {
+            'analysisFps': round(self.current_fps(), 2),
+            'targetFps': self.target_fps,
+            'avgInferenceMs': round(self.avg_inference_time * 1000, 1),
+            'framesAnalyzed': self.frames_analyzed,
+            'boosts': self.boosts
+        }
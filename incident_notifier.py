@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Incident Notifier
+Delivers incident reports to the Next.js API from a background thread so a slow
+or unreachable server never blocks fire detection. Reports go through a bounded
+in-memory queue and a shared keep-alive requests.Session. Failed deliveries are
+retried with jittered exponential backoff, and while the API is down reports are
+kept in an append-only SQLite spool and replayed in order once it is back.
+"""
+
+import itertools
+import json
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from detector_metrics import STAGE_SECONDS
+
+
+class IncidentNotifier:
+    def __init__(self, spool_path='incident_spool.db', queue_size=100, timeout=(3.05, 10),
+                 backoff_base=1.0, backoff_max=60.0, verify=False):
+        """
+        Args:
+            spool_path: SQLite file holding reports that could not be delivered yet
+            queue_size: Maximum reports waiting in memory before the worker spills them to the spool
+            timeout: (connect, read) timeout for each POST
+            backoff_base: First retry delay in seconds
+            backoff_max: Longest retry delay in seconds
+            verify: TLS certificate verification (off for self-signed development servers)
+        """
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.verify = verify
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflow = deque()  # Reports that found the queue full; the worker moves them to the spool
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        spool_dir = os.path.dirname(spool_path)
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        self.spool_lock = threading.Lock()
+        self.spool = sqlite3.connect(spool_path, check_same_thread=False)
+        self.spool.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT, fields TEXT, "
+            "image BLOB, filename TEXT, enqueued REAL, seq INTEGER)"
+        )
+        self.spool.commit()
+        self.sequence = itertools.count()  # Enqueue order, kept when reports spill to the spool
+
+        # Stats
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed_attempts = 0
+        self.dropped = 0
+        self.spooled = 0
+        self.latencies = deque(maxlen=1000)  # Enqueue-to-delivery seconds of recent reports
+
+        self.stopping = threading.Event()
+        self.drain_deadline = 0.0  # Set by close(): queued reports are delivered until then
+        self.thread = threading.Thread(target=self._worker, name="incident-notifier", daemon=True)
+        self.thread.start()
+
+    def enqueue(self, url, fields, image_bytes=None, filename='snapshot.jpg'):
+        """
+        Queue a report for delivery without blocking the caller
+        Args:
+            url: Endpoint to POST the report to
+            fields: Form fields of the report
+            image_bytes: Optional JPEG sent as the 'image' file part
+        """
+        item = (url, fields, image_bytes, filename, time.time(), next(self.sequence))
+        self.enqueued += 1
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Memory queue is full (API slow or down): the worker writes it to the spool, not this thread
+            self.overflow.append(item)
+
+    def _drain_overflow(self):
+        while self.overflow:
+            self._spool_append(self.overflow.popleft())
+
+    def _spool_append(self, item):
+        url, fields, image_bytes, filename, enqueued, seq = item
+        with self.spool_lock:
+            self.spool.execute(
+                "INSERT INTO spool (url, fields, image, filename, enqueued, seq) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, json.dumps(fields), image_bytes, filename, enqueued, seq)
+            )
+            self.spool.commit()
+        self.spooled += 1
+
+    def _spool_head(self):
+        with self.spool_lock:
+            row = self.spool.execute(
+                "SELECT id, url, fields, image, filename, enqueued, seq FROM spool ORDER BY enqueued, seq LIMIT 1"
+            ).fetchone()
+        if row is None:
+            return None
+        row_id, url, fields, image_bytes, filename, enqueued, seq = row
+        return row_id, (url, json.loads(fields), image_bytes, filename, enqueued, seq)
+
+    def _spool_delete(self, row_id):
+        with self.spool_lock:
+            self.spool.execute("DELETE FROM spool WHERE id = ?", (row_id,))
+            self.spool.commit()
+
+    def spool_size(self):
+        with self.spool_lock:
+            return self.spool.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def _deliver(self, item):
+        """
+        POST one report
+        Returns True when done (delivered or permanently rejected), False to retry later
+        """
+        url, fields, image_bytes, filename, enqueued, _seq = item
+        files = {'image': (filename, image_bytes, 'image/jpeg')} if image_bytes else None
+        upload_started = time.perf_counter()
+        try:
+            response = self.session.post(url, data=fields, files=files, timeout=self.timeout, verify=self.verify)
+        except requests.exceptions.RequestException as e:
+            self.failed_attempts += 1
+            print(f"❌ Network error sending incident report: {e}")
+            return False
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - upload_started, stage='upload')
+
+        if response.status_code >= 500:
+            self.failed_attempts += 1
+            print(f"❌ Incident API error {response.status_code}, will retry")
+            return False
+
+        if response.status_code != 200:
+            # Client errors will not succeed on retry; drop so later reports are not blocked
+            self.dropped += 1
+            print(f"❌ Failed to report incident: {response.status_code} - {response.text}")
+            return True
+
+        latency = time.time() - enqueued
+        self.latencies.append(latency)
+        self.delivered += 1
+        try:
+            incident_id = response.json().get('incidentId')
+        except ValueError:
+            incident_id = None
+        if incident_id:
+            print(f"✅ Incident reported successfully - ID: {incident_id} ({latency * 1000:.0f}ms after detection)")
+        return True
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _worker(self):
+        attempt = 0
+        while True:
+            self._drain_overflow()
+            if self.stopping.is_set() and (self.queue.empty() or time.time() >= self.drain_deadline):
+                break
+            if self.spool_size() > 0:
+                # Keep delivery in order: newer queued reports go behind the spooled ones
+                while not self.queue.empty():
+                    self._spool_append(self.queue.get_nowait())
+
+                row_id, item = self._spool_head()
+                if self._deliver(item):
+                    self._spool_delete(row_id)
+                    attempt = 0
+                    continue
+            else:
+                try:
+                    item = self.queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if self._deliver(item):
+                    attempt = 0
+                    continue
+                self._spool_append(item)
+
+            if self.stopping.is_set():
+                break
+            delay = self._backoff(attempt)
+            attempt += 1
+            print(f"⏳ Incident API unreachable, {self.spool_size()} report(s) spooled, retrying in {delay:.1f}s")
+            self.stopping.wait(delay)
+
+        # Stopped: whatever is still in memory is spooled for the next start
+        while not self.queue.empty():
+            self._spool_append(self.queue.get_nowait())
+        self._drain_overflow()
+
+    def close(self, timeout=5.0):
+        """
+        Stop the worker: queued reports are delivered for up to `timeout` seconds, the rest is spooled
+        for the next start
+        """
+        self.drain_deadline = time.time() + timeout
+        self.stopping.set()
+        # A POST started just before the deadline can take the full request timeout (a backoff wait ends at once)
+        self.thread.join(timeout=timeout + sum(self.timeout) + 1.0)
+        if self.thread.is_alive():
+            print("⚠️ Incident notifier still busy at shutdown, leaving its session open")
+            return
+        self.session.close()
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            'enqueued': self.enqueued,
+            'delivered': self.delivered,
+            'failedAttempts': self.failed_attempts,
+            'dropped': self.dropped,
+            'queued': self.queue.qsize() + len(self.overflow),
+            'spooled': self.spool_size(),
+            'latencyP50Ms': percentile(0.5),
+            'latencyP95Ms': percentile(0.95)
+        }
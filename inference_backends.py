@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Inference Backends
+Selectable CPU inference runtimes for FireSmokeDetector. Every backend takes a
+list of BGR frames and returns one (N, 6) [x1, y1, x2, y2, conf, cls] array per
+frame in original-frame pixels, plus per-stage timings of the last call.
+
+    torch     ultralytics YOLO(model_path) (the original path)
+    onnx      ONNX Runtime with tuned intra-op threads
+    openvino  OpenVINO IR on the CPU plugin
+
+The .pt weights are exported once and cached next to them, keyed by a hash of
+the weights file and the input size, e.g. best_01-3f2a9c1d7b4e-640.onnx. An INT8
+model produced by quantize_model.py (best_01-3f2a9c1d7b4e-640-int8.onnx) is loaded
+with precision='int8'.
+
+Comparison benchmark:
+    python inference_backends.py --model best_01.pt --images snapshots public/incident-snapshots
+"""
+
+import abc
+import argparse
+import ast
+import glob
+import hashlib
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+from detection_postprocess import box_iou, boxes_to_array, non_max_suppression
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+
+def weights_hash(model_path, length=12):
+    """
+    Short sha256 of a weights file, used to key exported artifacts
+    """
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as weights_file:
+        for chunk in iter(lambda: weights_file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def exported_path(model_path, export_format, imgsz=640):
+    stem, _ = os.path.splitext(model_path)
+    key = f"{weights_hash(model_path)}-{imgsz}"  # Exports have a fixed input size
+    if export_format == 'openvino':
+        return f"{stem}-{key}_openvino_model"
+    return f"{stem}-{key}.onnx"
+
+
+def quantized_path(model_path, imgsz=640):
+    """
+    Where quantize_model.py writes the INT8 ONNX model for these weights
+    """
+    stem, _ = os.path.splitext(exported_path(model_path, 'onnx', imgsz))
+    return f"{stem}-int8.onnx"
+
+
+def export_cached(model_path, export_format='onnx', imgsz=640):
+    """
+    Export .pt weights to ONNX or OpenVINO IR once and reuse the cached artifact
+    Returns the path of the exported model
+    """
+    target = exported_path(model_path, export_format, imgsz)
+    if os.path.exists(target):
+        return target
+
+    from ultralytics import YOLO
+
+    print(f"📦 Exporting {model_path} to {export_format} (one-time)...")
+    # Dynamic batch axis so the detection server, tiling and the cascade can send several frames per call
+    output = YOLO(model_path).export(format=export_format, imgsz=imgsz, dynamic=True)
+    shutil.move(str(output), target)
+    print(f"✅ Exported model cached: {target}")
+    return target
+
+
+def letterbox(frame, size):
+    """
+    Resize keeping aspect ratio and pad to size x size (same geometry as ultralytics)
+    Returns (image, gain, (pad_x, pad_y))
+    """
+    h, w = frame.shape[:2]
+    gain = min(size / h, size / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return image, gain, (left, top)
+
+
+class TorchBackend:
+    name = 'torch'
+
+    def __init__(self, model_path, imgsz=640, threads=None):
+        from ultralytics import YOLO
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.imgsz = imgsz
+        self.last_timings = {}
+
+    def predict(self, frames, conf=0.25, iou=0.7):
+        results = self.model.predict(source=frames, conf=conf, iou=iou, imgsz=self.imgsz, verbose=False)
+        # ultralytics reports per-image milliseconds for each stage
+        self.last_timings = {
+            stage: sum(result.speed.get(stage, 0.0) for result in results)
+            for stage in ('preprocess', 'inference', 'postprocess')
+        }
+        return [boxes_to_array(result.boxes) for result in results]
+
+
+class ExportedYoloBackend(abc.ABC):
+    """
+    Shared letterbox pre-processing and vectorised YOLOv8 decoding for exported models
+    """
+    def __init__(self, imgsz=640):
+        self.imgsz = imgsz
+        self.names = {}
+        self.last_timings = {}
+
+    @abc.abstractmethod
+    def _run(self, blob):
+        """
+        Run the model on an NCHW float32 blob; returns the raw head output (batch, 4 + num_classes, anchors)
+        """
+
+    def preprocess(self, frames):
+        images, geometry = [], []
+        for frame in frames:
+            image, gain, pad = letterbox(frame, self.imgsz)
+            images.append(image)
+            geometry.append((gain, pad, frame.shape[:2]))
+        blob = cv2.dnn.blobFromImages(images, scalefactor=1 / 255.0, swapRB=True)
+        return blob, geometry
+
+    def decode(self, output, geometry, conf, iou):
+        """
+        output: (4 + num_classes, anchors) raw head output of one image
+        """
+        scores = output[4:]
+        cls_ids = scores.argmax(axis=0)
+        confidences = scores[cls_ids, np.arange(scores.shape[1])]
+        keep = confidences >= conf
+        if not keep.any():
+            return np.zeros((0, 6), dtype=np.float32)
+
+        cx, cy, w, h = output[:4, keep]
+        data = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2,
+                         confidences[keep], cls_ids[keep]], axis=1).astype(np.float32)
+        data = non_max_suppression(data, iou)
+
+        # Map back from the letterboxed input to original-frame pixels
+        gain, (pad_x, pad_y), (frame_h, frame_w) = geometry
+        data[:, [0, 2]] = np.clip((data[:, [0, 2]] - pad_x) / gain, 0, frame_w)
+        data[:, [1, 3]] = np.clip((data[:, [1, 3]] - pad_y) / gain, 0, frame_h)
+        return data
+
+    def predict(self, frames, conf=0.25, iou=0.7):
+        started = time.perf_counter()
+        blob, geometry = self.preprocess(frames)
+        preprocessed = time.perf_counter()
+        outputs = self._run(blob)
+        inferred = time.perf_counter()
+        detections = [self.decode(outputs[i], geometry[i], conf, iou) for i in range(len(frames))]
+        finished = time.perf_counter()
+
+        self.last_timings = {
+            'preprocess': (preprocessed - started) * 1000,
+            'inference': (inferred - preprocessed) * 1000,
+            'postprocess': (finished - inferred) * 1000
+        }
+        return detections
+
+
+class OnnxBackend(ExportedYoloBackend):
+    name = 'onnx'
+
+    def __init__(self, model_path, imgsz=640, threads=None, precision='fp32'):
+        import onnxruntime as ort
+
+        super().__init__(imgsz)
+        if model_path.endswith('.onnx'):
+            onnx_path = model_path
+        elif precision == 'int8':
+            onnx_path = quantized_path(model_path, imgsz)
+            if not os.path.exists(onnx_path):
+                raise FileNotFoundError(f"No INT8 model at {onnx_path} - run quantize_model.py first")
+        else:
+            onnx_path = export_cached(model_path, 'onnx', imgsz)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        self.model_path = onnx_path
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if 'names' in metadata:
+            self.names = ast.literal_eval(metadata['names'])
+        if 'imgsz' in metadata:
+            self.imgsz = ast.literal_eval(metadata['imgsz'])[0]
+
+    def _run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(ExportedYoloBackend):
+    name = 'openvino'
+
+    def __init__(self, model_path, imgsz=640, threads=None):
+        from openvino.runtime import Core
+        import yaml
+
+        super().__init__(imgsz)
+        model_dir = model_path if os.path.isdir(model_path) else export_cached(model_path, 'openvino', imgsz)
+        xml_path = glob.glob(os.path.join(model_dir, '*.xml'))[0]
+
+        core = Core()
+        if threads:
+            core.set_property('CPU', {'INFERENCE_NUM_THREADS': threads})
+        self.compiled = core.compile_model(core.read_model(xml_path), 'CPU')
+        self.output = self.compiled.output(0)
+        self.model_path = model_dir
+        # IR exported with a static batch (older cached exports): batches are run in slices of that size
+        batch_dim = self.compiled.input(0).get_partial_shape()[0]
+        self.batch_size = batch_dim.get_length() if batch_dim.is_static else None
+
+        metadata_path = os.path.join(model_dir, 'metadata.yaml')
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as metadata_file:
+                metadata = yaml.safe_load(metadata_file)
+            self.names = metadata.get('names', {})
+            self.imgsz = metadata.get('imgsz', [imgsz])[0]
+
+    def _run(self, blob):
+        if self.batch_size is None or len(blob) == self.batch_size:
+            return self.compiled(blob)[self.output]
+        return np.concatenate([self.compiled(blob[start:start + self.batch_size])[self.output]
+                               for start in range(0, len(blob), self.batch_size)])
+
+
+def create_backend(model_path, backend='torch', imgsz=640, threads=None, precision='fp32'):
+    """
+    Build the inference backend selected by name (torch, onnx, openvino)
+    precision='int8' loads the quantised ONNX model (ONNX Runtime only)
+    """
+    if precision == 'int8' and backend != 'onnx':
+        raise ValueError("INT8 models run on the onnx backend")
+    if backend == 'torch':
+        return TorchBackend(model_path, imgsz, threads)
+    if backend == 'onnx':
+        return OnnxBackend(model_path, imgsz, threads, precision)
+    if backend == 'openvino':
+        return OpenVinoBackend(model_path, imgsz, threads)
+    raise ValueError(f"Unknown inference backend '{backend}', expected one of {', '.join(BACKENDS)}")
+
+
+def match_detections(reference, candidate, iou_threshold=0.9, conf_tolerance=0.05):
+    """
+    Compare two (N, 6) detection arrays of the same frame
+    Returns (matched, missing, extra, max_conf_diff)
+    """
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0, len(reference), len(candidate), 0.0
+
+    iou = box_iou(reference[:, :4], candidate[:, :4])
+    same_class = reference[:, None, 5] == candidate[None, :, 5]
+    iou = np.where(same_class, iou, 0)
+
+    matched, max_conf_diff, used = 0, 0.0, set()
+    for ref_index in np.argsort(-reference[:, 4]):
+        cand_index = int(np.argmax(iou[ref_index]))
+        if cand_index in used or iou[ref_index, cand_index] < iou_threshold:
+            continue
+        conf_diff = abs(float(reference[ref_index, 4] - candidate[cand_index, 4]))
+        if conf_diff > conf_tolerance:
+            continue
+        used.add(cand_index)
+        matched += 1
+        max_conf_diff = max(max_conf_diff, conf_diff)
+    return matched, len(reference) - matched, len(candidate) - matched, max_conf_diff
+
+
+def list_images(paths):
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in ('*.jpg', '*.jpeg', '*.png'):
+                images.extend(glob.glob(os.path.join(path, pattern)))
+        else:
+            images.append(path)
+    return sorted(images)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inference backends for accuracy and latency")
+    parser.add_argument('--model', default='best_01.pt')
+    parser.add_argument('--images', nargs='+', default=['snapshots', 'public/incident-snapshots'])
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx'], choices=BACKENDS)
+    parser.add_argument('--threads', type=int, default=None, help="Intra-op threads per backend")
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--iou-match', type=float, default=0.9, help="Box IoU needed to count as the same detection")
+    parser.add_argument('--conf-tolerance', type=float, default=0.05)
+    parser.add_argument('--warmup', type=int, default=3)
+    args = parser.parse_args()
+
+    image_paths = list_images(args.images)
+    frames = [frame for frame in (cv2.imread(path) for path in image_paths) if frame is not None]
+    if not frames:
+        print("❌ No images found")
+        return
+    print(f"🖼️ {len(frames)} images | model {args.model}")
+
+    results = {}
+    for name in args.backends:
+        load_started = time.perf_counter()
+        backend = create_backend(args.model, name, threads=args.threads)
+        load_time = time.perf_counter() - load_started
+
+        for frame in frames[:args.warmup]:
+            backend.predict([frame], conf=args.conf)
+
+        latencies, detections = [], []
+        for frame in frames:
+            started = time.perf_counter()
+            detections.append(backend.predict([frame], conf=args.conf)[0])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        results[name] = detections
+        print(f"⏱️ {name:9s} load {load_time:6.2f}s | mean {np.mean(latencies):7.1f}ms | "
+              f"p95 {np.percentile(latencies, 95):7.1f}ms | {1000 / np.mean(latencies):6.1f} FPS")
+
+    reference_name = args.backends[0]
+    for name in args.backends[1:]:
+        matched = missing = extra = 0
+        max_conf_diff = 0.0
+        for reference, candidate in zip(results[reference_name], results[name]):
+            m, mi, ex, diff = match_detections(reference, candidate, args.iou_match, args.conf_tolerance)
+            matched, missing, extra = matched + m, missing + mi, extra + ex
+            max_conf_diff = max(max_conf_diff, diff)
+        status = "✅ MATCH" if missing == 0 and extra == 0 else "❌ MISMATCH"
+        print(f"{status} {name} vs {reference_name}: matched {matched}, missing {missing}, extra {extra}, "
+              f"max conf diff {max_conf_diff:.4f}")
+
+
+if __name__ == "__main__":
+    main()
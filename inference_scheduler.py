@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Priority-Aware Inference Scheduler
+Shares one global analysis budget, in analysed frames per second, between all
+cameras of the detection server instead of letting every camera take what it
+asks for until the host is overloaded and all of them degrade together.
+
+Every allocation round:
+1. Each camera's guaranteed minimum rate is granted in priority order. When the
+   minimums do not fit the budget, the lowest-priority cameras are shed (0 fps).
+2. Leftover capacity goes first to cameras with recent fire/smoke evidence,
+   then to cameras with recent motion, then to the rest; within a tier it is
+   split in proportion to priority, never above what a camera asks for.
+
+The budget is fixed (INFERENCE_BUDGET_FPS) or derived from the measured cost
+per analysed frame and a target utilisation of the inference loop.
+"""
+
+import time
+
+EVIDENCE_NONE, EVIDENCE_MOTION, EVIDENCE_FIRE = range(3)
+EVIDENCE_NAMES = ('none', 'motion', 'fire')
+
+
+class CameraShare:
+    __slots__ = ('camera_id', 'priority', 'min_fps', 'demand_fps', 'allocated_fps', 'evidence', 'shed',
+                 'last_analysis_time', 'last_frame_time', 'schedule_lag', 'frames_analyzed', 'times_shed')
+
+    def __init__(self, camera_id, priority, min_fps):
+        self.camera_id = camera_id
+        self.priority = priority
+        self.min_fps = min_fps
+        self.demand_fps = min_fps
+        self.allocated_fps = min_fps
+        self.evidence = EVIDENCE_NONE
+        self.shed = False
+        self.last_analysis_time = 0.0
+        self.last_frame_time = 0.0    # Decode time of the last analysed frame
+        self.schedule_lag = 0.0       # EMA of seconds between a frame being wanted and being analysed
+        self.frames_analyzed = 0
+        self.times_shed = 0
+
+
+class InferenceScheduler:
+    def __init__(self, budget_fps=None, utilisation=0.8, reallocate_interval=0.5):
+        """
+        Args:
+            budget_fps: Fixed analysed frames per second for all cameras together (None = measure)
+            utilisation: Share of the inference loop's measured capacity handed out when budget_fps is None
+            reallocate_interval: Seconds between allocation rounds
+        """
+        self.budget_fps = budget_fps
+        self.utilisation = utilisation
+        self.reallocate_interval = reallocate_interval
+        self.cameras = {}  # camera_id -> CameraShare
+        self.last_allocation_time = 0.0
+        self.avg_frame_time = 0.0  # EMA of wall seconds per analysed frame (batched)
+
+    def add_camera(self, camera_id, priority=1.0, min_fps=0.2):
+        """
+        Args:
+            priority: Relative importance (> 0); higher priorities are shed last and get more leftover
+            min_fps: Guaranteed analysed frames per second while the budget allows it
+        """
+        if priority <= 0:
+            raise ValueError(f"priority must be positive, got {priority}")
+        if min_fps < 0:
+            raise ValueError(f"minFps must not be negative, got {min_fps}")
+        self.cameras[camera_id] = CameraShare(camera_id, float(priority), float(min_fps))
+        self.last_allocation_time = 0.0
+
+    def remove_camera(self, camera_id):
+        self.cameras.pop(camera_id, None)
+        self.last_allocation_time = 0.0
+
+    def capacity_fps(self):
+        """
+        Analysed frames per second available to all cameras (None until the first batch is measured)
+        """
+        if self.budget_fps:
+            return self.budget_fps
+        if self.avg_frame_time <= 0:
+            return None
+        return self.utilisation / self.avg_frame_time
+
+    def _fill(self, shares, remaining):
+        # Split remaining between shares in proportion to priority, capped by each share's demand
+        active = [share for share in shares if share.allocated_fps < share.demand_fps]
+        while active and remaining > 1e-6:
+            total_priority = sum(share.priority for share in active)
+            given = 0.0
+            for share in list(active):
+                extra = min(remaining * share.priority / total_priority, share.demand_fps - share.allocated_fps)
+                share.allocated_fps += extra
+                given += extra
+                if share.demand_fps - share.allocated_fps <= 1e-6:
+                    active.remove(share)
+            remaining -= given
+            if given <= 1e-6:
+                break
+        return remaining
+
+    def allocate(self, demands, now=None):
+        """
+        Recompute every camera's rate (at most once per reallocate_interval)
+        Args:
+            demands: {camera_id: (wanted_fps, evidence)} with evidence one of EVIDENCE_*
+        """
+        now = now if now is not None else time.time()
+        if now - self.last_allocation_time < self.reallocate_interval:
+            return
+        self.last_allocation_time = now
+
+        shares = [share for share in self.cameras.values() if share.camera_id in demands]
+        for share in shares:
+            share.demand_fps, share.evidence = demands[share.camera_id]
+
+        capacity = self.capacity_fps()
+        if capacity is None:
+            # Nothing measured yet: let every camera run at its own rate
+            for share in shares:
+                share.allocated_fps, share.shed = share.demand_fps, False
+            return
+
+        remaining = capacity
+        for share in sorted(shares, key=lambda s: (-s.priority, -s.evidence)):
+            floor = min(share.min_fps, share.demand_fps)
+            shed = floor > remaining
+            if shed and not share.shed:
+                share.times_shed += 1
+                print(f"⚖️ Overloaded: shedding camera {share.camera_id} (priority {share.priority:g})")
+            share.shed = shed
+            share.allocated_fps = 0.0 if shed else floor
+            if not shed:
+                remaining -= floor
+
+        for evidence in (EVIDENCE_FIRE, EVIDENCE_MOTION, EVIDENCE_NONE):
+            tier = [share for share in shares if share.evidence == evidence and not share.shed]
+            remaining = self._fill(tier, remaining)
+
+    def due(self, camera_id, now=None):
+        """
+        Seconds the camera is overdue (>= 0), or None if it is not due yet
+        """
+        share = self.cameras.get(camera_id)
+        if share is None or share.allocated_fps <= 0:
+            return None
+        now = now if now is not None else time.time()
+        overdue = now - (share.last_analysis_time + 1.0 / share.allocated_fps)
+        return overdue if overdue >= 0 else None
+
+    def order(self, camera_ids, now=None):
+        """
+        Due cameras, most urgent first: evidence, then priority, then how overdue they are
+        """
+        now = now if now is not None else time.time()
+        due = []
+        for camera_id in camera_ids:
+            overdue = self.due(camera_id, now)
+            if overdue is not None:
+                share = self.cameras[camera_id]
+                due.append((-share.evidence, -share.priority, -overdue, camera_id))
+        return [item[-1] for item in sorted(due, key=lambda item: item[:3])]
+
+    def record(self, camera_id, frame_time, now=None):
+        """
+        Record one analysed frame of a camera
+        Args:
+            frame_time: time.time() when the frame was decoded
+        """
+        share = self.cameras.get(camera_id)
+        if share is None:
+            return
+        now = now if now is not None else time.time()
+        if share.last_analysis_time and share.demand_fps > 0:
+            # How much later than the camera's own wanted rate this frame was analysed
+            lag = max(0.0, now - (share.last_analysis_time + 1.0 / share.demand_fps))
+            share.schedule_lag = lag if share.frames_analyzed == 1 else 0.8 * share.schedule_lag + 0.2 * lag
+        share.last_analysis_time = now
+        share.last_frame_time = frame_time
+        share.frames_analyzed += 1
+
+    def record_batch(self, frames, seconds):
+        """
+        Record the wall time of one batch, which sets the measured capacity
+        """
+        if not frames:
+            return
+        per_frame = seconds / frames
+        if self.avg_frame_time == 0:
+            self.avg_frame_time = per_frame
+        else:
+            self.avg_frame_time = 0.9 * self.avg_frame_time + 0.1 * per_frame
+
+    def camera_stats(self, camera_id, now=None):
+        share = self.cameras.get(camera_id)
+        if share is None:
+            return None
+        now = now if now is not None else time.time()
+        return {
+            'priority': share.priority,
+            'minFps': share.min_fps,
+            'wantedFps': round(share.demand_fps, 2),
+            'allocatedFps': round(share.allocated_fps, 2),
+            'evidence': EVIDENCE_NAMES[share.evidence],
+            'shed': share.shed,
+            'timesShed': share.times_shed,
+            # Age of the newest frame this camera has had analysed: how far behind reality its alerts are
+            'lastFrameAgeS': round(now - share.last_frame_time, 2) if share.last_frame_time else None,
+            'scheduleLagMs': round(share.schedule_lag * 1000, 1)
+        }
+
+    def stats(self):
+        capacity = self.capacity_fps()
+        shares = list(self.cameras.values())
+        wanted = sum(share.demand_fps for share in shares)
+        return {
+            'budgetFps': round(capacity, 2) if capacity is not None else None,
+            'budgetSource': 'fixed' if self.budget_fps else 'measured',
+            'avgFrameMs': round(self.avg_frame_time * 1000, 1),
+            'wantedFps': round(wanted, 2),
+            'allocatedFps': round(sum(share.allocated_fps for share in shares), 2),
+            'overloaded': capacity is not None and wanted > capacity,
+            'shedCameras': [share.camera_id for share in shares if share.shed]
+        }
@@ -19,6 +19,13 @@ export interface Camera {
   status: 'online' | 'offline';
   addedAt?: string;
   streamType?: 'mobile_camdroid' | 'ip_camera' | 'webcam';
+  // Region of interest for AI detection: polygons [[x, y], ...] or rectangles [x1, y1, x2, y2],
+  // in pixels or as fractions of the frame
+  roi?: Array<number[] | number[][]>;
+  // AI analysis scheduling: higher priority is shed last under load (default 1),
+  // minAnalysisFps is the guaranteed analysed frames per second
+  priority?: number;
+  minAnalysisFps?: number;
   networkAccess?: {
     localIP: string; // Internal IP (192.168.1.100)
     externalURL?: string; // DDNS URL (yourname.duckdns.org)
@@ -77,6 +84,12 @@ export interface Incident {
       fire: number;
       smoke: number;
     };
+    trackId?: string;
+    lastSeen?: string;
+    maxConfidence?: number;
+    updateCount?: number;
+    clipPath?: string; // Pre/post-event MP4 written by the detector
+    clipUrl?: string;
   };
   aiDetectionData?: {
     modelVersion: string;
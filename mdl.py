@@ -1,25 +1,87 @@
-import requests
-import base64
 import json
 import time
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import cv2
-from ultralytics import YOLO
 import urllib3
+from frame_grabber import LatestFrameGrabber
+from shm_transport import ShmCaptureManager
+from frame_sampler import AdaptiveSampler
+from motion_gate import MotionGate
+from color_gate import ColorFlickerGate
+from temporal_filter import confirmation_from_env
+from fire_tracker import IoUTracker
+from detection_postprocess import FireSmokeFilter
+from inference_backends import create_backend
+from tiled_inference import TiledInference, validate_regions
+from roi_masks import RoiMask
+from model_cascade import CascadeBackend
+from clip_recorder import ClipRecorder
+from preview_server import PreviewHub, start_preview_server
+from thread_budget import apply_thread_budget, budget_from_env, describe
+from incident_notifier import IncidentNotifier
+from detector_metrics import ALERTS, FRAMES_ANALYSED, FRAMES_SKIPPED, STAGE_SECONDS, start_metrics_server
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+def create_inference(model_path, backend_name, threads=None, precision='fp32'):
+    """
+    Build the detector's inference stack without the rest of the detector (notifier, preview, clips)
+    The cascade (CASCADE=1) and tiling (TILED_INFERENCE=1) are configured through the environment
+    Returns (backend, tiler); tiler is None when tiling is off
+    """
+    backend = create_backend(model_path, backend_name, threads=threads, precision=precision)
+    
+    # Optional cascade: a cheap screening pass decides which frames the full model sees
+    if os.getenv('CASCADE', '0') == '1':
+        screen_imgsz = int(os.getenv('CASCADE_SCREEN_IMGSZ', 320))
+        screen = create_backend(os.getenv('CASCADE_SCREEN_MODEL', model_path), backend_name,
+                                imgsz=screen_imgsz, threads=threads)
+        backend = CascadeBackend(screen, backend,
+                                 screen_threshold=float(os.getenv('CASCADE_SCREEN_THRESHOLD', 0.15)),
+                                 escalate=os.getenv('CASCADE_ESCALATE', 'frame'),
+                                 audit_fraction=float(os.getenv('CASCADE_AUDIT', 0.0)))
+    
+    # Optional tiling for high-resolution cameras, optionally only over per-camera regions
+    tiler = None
+    if os.getenv('TILED_INFERENCE', '0') == '1':
+        tiler = TiledInference(backend,
+                               tile_size=int(os.getenv('TILE_SIZE', 640)),
+                               overlap=float(os.getenv('TILE_OVERLAP', 0.2)),
+                               min_frame_size=int(os.getenv('TILE_MIN_FRAME_SIZE', 1280)))
+    return backend, tiler
+
 class FireSmokeDetector:
-    def __init__(self, model_path='best_01.pt', confidence_threshold=0.5, api_base_url='http://localhost:3000'):
+    def __init__(self, model_path='best_01.pt', confidence_threshold=0.5, api_base_url='http://localhost:3000',
+                 backend=None, precision=None):
         """
         Initialize the Fire/Smoke Detector
         Args:
             model_path: Path to the YOLO model file
             confidence_threshold: Minimum confidence for detections
             api_base_url: Base URL for the Next.js API
+            backend: Inference runtime - torch, onnx or openvino (INFERENCE_BACKEND env, default torch)
+            precision: fp32 or int8 (INFERENCE_PRECISION env); int8 loads the model built by quantize_model.py
         """
-        self.model = YOLO(model_path)
+        self.backend_name = backend or os.getenv('INFERENCE_BACKEND', 'torch')
+        self.precision = precision or os.getenv('INFERENCE_PRECISION', 'fp32')
+        # Explicit thread budget / core pinning (INFERENCE_THREADS, CPU_AFFINITY, THREAD_BUDGET=auto)
+        budget = budget_from_env()
+        self.thread_budget = apply_thread_budget(**budget)
+        if budget['threads'] or budget['cores']:
+            print(f"🧮 Thread budget: {describe(self.thread_budget)}")
+        # Backend, optional cascade and optional tiler
+        self.backend, self.tiler = create_inference(model_path, self.backend_name, threads=budget['threads'],
+                                                    precision=self.precision)
+        self.fire_smoke_filter = FireSmokeFilter(self.backend.names)  # Precomputed fire/smoke class-id mask
+        self.tile_regions = {camera_id: validate_regions(regions)  # camera_id -> [[x1, y1, x2, y2], ...]
+                             for camera_id, regions in json.loads(os.getenv('TILE_REGIONS', '{}')).items()}
+        
+        # Per-camera regions of interest: inference runs on the ROI crop only
+        self.roi_masks = {}  # camera_id -> RoiMask
+        for camera_id, shapes in json.loads(os.getenv('ROI_MASKS', '{}')).items():
+            self.set_roi(camera_id, shapes)
         self.confidence_threshold = confidence_threshold
         self.api_base_url = api_base_url
         self.last_detection_time = {}  # Track last detection per camera to avoid spam
@@ -34,177 +96,280 @@ class FireSmokeDetector:
         self.confidence_threshold = float(os.getenv('CONFIDENCE_THRESHOLD', 0.1))
         self.alert_threshold = float(os.getenv('ALERT_THRESHOLD', 0.2))
         self.model_path = os.getenv('MODEL_PATH', 'fire_smoke_yolov8.pt')
+        self.analysis_fps = float(os.getenv('ANALYSIS_FPS', 2.0))  # Analysed frames per second per camera
         
-    def send_incident_to_api(self, image_path, label, confidence):
-        try:
-            with open(image_path, 'rb') as img_file:
-                files = {'snapshot': img_file}
-                data = {'label': label, 'confidence': confidence}
-                response = requests.post(self.api_url, files=files, data=data)
-            print(f"[API] Incident sent: {label} ({confidence:.2f}) | Status: {response.status_code}")
-        except Exception as e:
-            print(f"[API] Error sending incident: {e}")
-    
-    def monitor_camera(self, stream_url, camera_id, camera_name, location):
-        print(f"🎥 Starting monitoring for camera: {camera_name} ({location})")
-        print(f"🔗 Stream URL: {stream_url}")
+        # Skip inference on static scenes and reuse the camera's previous result
+        self.motion_gating = os.getenv('MOTION_GATING', '1') == '1'
+        self.motion_gates = {}  # camera_id -> MotionGate
+        self.last_results = {}  # camera_id -> (detection_found, highest_confidence)
         
-        # Try to open the video stream
-        print(f"🔌 Attempting to connect to stream...")
-        cap = cv2.VideoCapture(stream_url)
+        # Optional zero-ML colour/flicker pre-filter; frames without fire/smoke-like pixels skip the model
+        self.color_gating = os.getenv('COLOR_GATING', '0') == '1'
+        self.color_gate_crop = os.getenv('COLOR_GATE_CROP', '0') == '1'  # Infer only on the candidate area
+        self.color_gates = {}  # camera_id -> ColorFlickerGate
         
-        # Set additional properties for network streams
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        cap.set(cv2.CAP_PROP_FPS, 10)  # Limit FPS for network streams
+        # Alerts need fire/smoke in k of the last n analysed frames, not a single frame
+        self.temporal_filter = confirmation_from_env()
         
-        if not cap.isOpened():
-            print(f"❌ Error: Could not open stream for camera {camera_name}")
-            print(f"🔄 Trying alternative stream formats...")
-            
-            # Try different stream formats
-            alternative_urls = [
-                stream_url,
-                stream_url.replace('/video', ''),
-                f"{stream_url.replace('/video', '')}/video",
-                f"{stream_url.replace('/video', '')}/stream"
-            ]
-            
-            for alt_url in alternative_urls:
-                print(f"🔄 Trying: {alt_url}")
-                cap = cv2.VideoCapture(alt_url)
-                if cap.isOpened():
-                    print(f"✅ Connected to: {alt_url}")
-                    stream_url = alt_url
-                    break
-                cap.release()
-            
-            if not cap.isOpened():
-                print(f"❌ Failed to connect to any stream format")
-                return False
+        # One incident per tracked fire/smoke region; later frames only send small updates
+        self.trackers = {}  # camera_id -> IoUTracker
+        self.track_update_interval = float(os.getenv('TRACK_UPDATE_INTERVAL', 10))
+        self.track_heartbeat = float(os.getenv('TRACK_HEARTBEAT', 60))
         
-        print(f"✅ Successfully connected to stream: {stream_url}")
+        # Snapshots are encoded in memory and uploaded directly; a local archive copy is optional
+        self.save_local_snapshots = os.getenv('SAVE_LOCAL_SNAPSHOTS', '0') == '1'
+        self.jpeg_quality = int(os.getenv('SNAPSHOT_JPEG_QUALITY', 85))
+        self.archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot-archive')
         
-        frame_count = 0
-        detection_count = 0
-        last_log_time = time.time()
-        consecutive_failures = 0
+        # Optional pre/post-event clips from a per-camera ring of JPEG frames
+        self.clip_recorder = None
+        if os.getenv('CLIP_RECORDING', '0') == '1':
+            self.clip_recorder = ClipRecorder(
+                output_dir=os.getenv('CLIP_DIR', 'public/incident-clips'),
+                pre_seconds=float(os.getenv('CLIP_PRE_SECONDS', 10)),
+                post_seconds=float(os.getenv('CLIP_POST_SECONDS', 10)),
+                buffer_bytes=int(float(os.getenv('CLIP_BUFFER_MB', 8)) * 1024 * 1024),
+                fps=float(os.getenv('CLIP_FPS', 5))
+            )
         
-        try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    consecutive_failures += 1
-                    print(f"❌ Failed to read frame {frame_count + 1}, consecutive failures: {consecutive_failures}")
-                    if consecutive_failures > 10:
-                        print(f"❌ Too many consecutive failures, stopping...")
-                        break
-                    time.sleep(1)
-                    continue
-                
-                consecutive_failures = 0  # Reset failure counter
-                frame_count += 1
-                current_time = time.time()
-                
-                # Process frame for detection
-                try:
-                    results = self.model(frame)
-                    max_confidence = 0
-                    detected_objects = []
-                    fire_smoke_detected = False
-                    
-                    for r in results:
-                        for box in r.boxes:
-                            conf = float(box.conf)
-                            label = self.model.names[int(box.cls)]
-                            max_confidence = max(max_confidence, conf)
-                            detected_objects.append(f"{label}({conf:.2f})")
-                            
-                            # Check for fire/smoke with your working threshold
-                            if label.lower() in ['fire', 'smoke'] and conf >= 0.5:  # Use working threshold
-                                fire_smoke_detected = True
-                                snapshot_path = f"snapshots/alert_{camera_id}_{int(time.time())}.jpg"
-                                cv2.imwrite(snapshot_path, frame)
-                                print(f"🚨 [FIRE DETECTED!] {label} confidence: {conf:.3f} | Sending alert!")
-                                self.send_incident_to_api(snapshot_path, label, conf)
-                                detection_count += 1
-                    
-                    # Log every second
-                    if current_time - last_log_time >= 1.0:
-                        objects_str = ", ".join(detected_objects) if detected_objects else "none"
-                        status = "🔥 FIRE!" if fire_smoke_detected else "📹"
-                        print(f"{status} [FRAME {frame_count}] Max: {max_confidence:.3f} | Objects: {objects_str}")
-                        last_log_time = current_time
-                        
-                except Exception as detection_error:
-                    print(f"❌ Detection error on frame {frame_count}: {detection_error}")
-                
-                # Small delay
-                time.sleep(0.1)
-                
-        except KeyboardInterrupt:
-            print(f"\n🛑 Monitoring stopped for camera: {camera_name}")
-        except Exception as e:
-            print(f"❌ Error monitoring camera {camera_name}: {e}")
-            import traceback
-            traceback.print_exc()
-        finally:
-            cap.release()
-            cv2.destroyAllWindows()
-            print(f"📊 Monitoring complete - Processed {frame_count} frames, {detection_count} fire alerts sent")
+        # Annotated MJPEG preview (replaces cv2.imshow); frames are only kept while someone watches
+        self.preview = PreviewHub(self.backend.names, fps=float(os.getenv('PREVIEW_FPS', 5)),
+                                  max_fps=float(os.getenv('PREVIEW_MAX_FPS', 15)))
         
-        return True
-
+        # Incident reports are delivered off the detection thread and spooled while the API is down
+        self.notifier = IncidentNotifier(spool_path=os.getenv('INCIDENT_SPOOL_PATH', 'incident_spool.db'))
+        
+    def encode_snapshot(self, frame):
+        """
+        Encode a frame to JPEG bytes in memory
+        """
+        started = time.perf_counter()
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage='encode')
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+    
+    def archive_snapshot(self, jpeg_bytes, snapshot_path):
+        """
+        Write a local copy of an already-encoded snapshot off the detection thread
+        """
+        def write():
+            try:
+                with open(snapshot_path, 'wb') as snapshot_file:
+                    snapshot_file.write(jpeg_bytes)
+            except OSError as e:
+                print(f"❌ Error archiving snapshot {snapshot_path}: {e}")
         
+        self.archive_executor.submit(write)
+    
     def process_frame(self, frame, camera_id, camera_name, location):
         """
         Process a single frame for fire/smoke detection
         """
-        # Perform detection
-        results = self.model.predict(source=frame, conf=self.confidence_threshold, verbose=False)
-        detections = results[0].boxes
+        return self.process_batch([(frame, camera_id, camera_name, location)])[0]
+    
+    def process_batch(self, batch):
+        """
+        Run one shared predict call over frames from several cameras
+        Args:
+            batch: List of (frame, camera_id, camera_name, location) tuples
+        Returns:
+            List of (detection_found, highest_confidence) in batch order
+        """
+        outcomes = [None] * len(batch)
+        views = [None] * len(batch)
+        offsets = [None] * len(batch)  # Origin of a colour-gate candidate crop inside the view
+        gate_forced = set()
+        to_infer = []
+        for index, item in enumerate(batch):
+            frame, camera_id = item[0], item[1]
+            roi = self.roi_masks.get(camera_id)
+            views[index] = roi.crop(frame) if roi is not None else frame
+            if self.motion_gating and camera_id in self.last_results:
+                gate = self.motion_gates.setdefault(camera_id, MotionGate())
+                if not gate.should_infer(views[index]):
+                    FRAMES_SKIPPED.inc(camera=camera_id)
+                    outcomes[index] = self.last_results[camera_id]
+                    continue
+            
+            if self.color_gating:
+                color_gate = self.color_gates.get(camera_id)
+                if color_gate is None:
+                    color_gate = self.color_gates[camera_id] = ColorFlickerGate()
+                infer, regions, forced = color_gate.check(views[index])
+                if not infer:
+                    FRAMES_SKIPPED.inc(camera=camera_id)
+                    outcomes[index] = (False, 0.0)
+                    continue
+                if forced:
+                    gate_forced.add(index)
+                elif self.color_gate_crop and regions:
+                    x1, y1 = min(r[0] for r in regions), min(r[1] for r in regions)
+                    x2, y2 = max(r[2] for r in regions), max(r[3] for r in regions)
+                    views[index] = views[index][y1:y2, x1:x2]
+                    offsets[index] = (x1, y1)
+            to_infer.append(index)
         
-        detection_found = False
-        highest_confidence = 0
-        best_detection = None
+        if to_infer:
+            frames = [views[index] for index in to_infer]
+            if self.tiler is not None:
+                # Tile regions are in full-frame coordinates, so cropped frames are tiled as a whole
+                regions = [None if batch[index][1] in self.roi_masks or offsets[index] is not None
+                           else self.tile_regions.get(batch[index][1]) for index in to_infer]
+                results = self.tiler.predict(frames, conf=self.confidence_threshold, regions=regions)
+                timings = self.tiler.last_timings
+            else:
+                results = self.backend.predict(frames, conf=self.confidence_threshold)
+                timings = self.backend.last_timings
+            
+            # Backend timings cover the whole batch; attribute an equal share to each frame
+            frame_timings = {stage: timings.get(stage, 0.0) / len(frames)
+                             for stage in ('preprocess', 'inference', 'postprocess')}
+            for stage in ('preprocess', 'inference'):
+                for _ in frames:
+                    STAGE_SECONDS.observe(frame_timings[stage] / 1000, stage=stage)
+            backend_ms = sum(frame_timings.values())
+            
+            for index, result in zip(to_infer, results):
+                FRAMES_ANALYSED.inc(camera=batch[index][1])
+                if offsets[index] is not None and len(result):
+                    result = result.copy()
+                    result[:, [0, 2]] += offsets[index][0]
+                    result[:, [1, 3]] += offsets[index][1]
+                roi = self.roi_masks.get(batch[index][1])
+                if roi is not None:
+                    result = roi.to_frame(result)
+                outcome = self.evaluate_result(result, *batch[index], backend_ms=backend_ms,
+                                               backend_postprocess_ms=frame_timings['postprocess'])
+                # A miss needs a detection strong enough to count toward an alert, not low-confidence noise
+                if index in gate_forced and outcome[0] and outcome[1] >= self.temporal_filter.min_score:
+                    self.color_gates[batch[index][1]].record_miss()
+                self.last_results[batch[index][1]] = outcome
+                outcomes[index] = outcome
         
-        if detections is not None and len(detections) > 0:
-            for det in detections:
-                cls_id = int(det.cls[0])
-                conf = float(det.conf[0])
-                label = self.model.names[cls_id]
-                
-                # Check if detected object is fire or smoke
-                if label.lower() in ['fire', 'smoke'] and conf > highest_confidence:
-                    highest_confidence = conf
-                    best_detection = {
-                        'label': label,
-                        'confidence': conf,
-                        'bbox': det.xyxy[0].tolist(),
-                        'cls_id': cls_id
-                    }
-                    detection_found = True
+        return outcomes
+    
+    def set_roi(self, camera_id, shapes):
+        """
+        Restrict a camera's inference to ROI polygons/rectangles (None or [] removes the ROI)
+        """
+        if shapes:
+            self.roi_masks[camera_id] = RoiMask(shapes)
+        else:
+            self.roi_masks.pop(camera_id, None)
+    
+    def forget_camera(self, camera_id):
+        """
+        Drop all per-camera state when a camera stops being monitored
+        """
+        self.motion_gates.pop(camera_id, None)
+        self.last_results.pop(camera_id, None)
+        self.last_detection_time.pop(camera_id, None)
+        self.temporal_filter.remove(camera_id)
+        self.trackers.pop(camera_id, None)
+        self.tile_regions.pop(camera_id, None)
+        self.roi_masks.pop(camera_id, None)
+        self.color_gates.pop(camera_id, None)
+        if self.clip_recorder is not None:
+            self.clip_recorder.forget(camera_id)
+        self.preview.forget(camera_id)
+    
+    def gating_stats(self, camera_id):
+        """
+        Motion gate counters for one camera (empty if gating is off)
+        """
+        gate = self.motion_gates.get(camera_id)
+        return gate.stats() if gate is not None else {}
+    
+    def last_motion_time(self, camera_id):
+        """
+        time.time() of the camera's last scene change seen by the motion gate (0 if unknown)
+        """
+        gate = self.motion_gates.get(camera_id)
+        return gate.last_change_time if gate is not None else 0.0
+    
+    def record_frame(self, camera_id, frame, frame_time=None):
+        """
+        Feed a decoded frame to the camera's clip ring (CLIP_RECORDING=1) and to its preview viewers
+        """
+        if self.clip_recorder is not None:
+            self.clip_recorder.add_frame(camera_id, frame, frame_time)
+        self.preview.update_frame(camera_id, frame, frame_time)
+    
+    def clip_stats(self, camera_id):
+        """
+        Clip ring memory use for one camera (empty if clip recording is off)
+        """
+        return self.clip_recorder.stats(camera_id) if self.clip_recorder is not None else {}
+    
+    def color_gate_stats(self, camera_id):
+        """
+        Colour/flicker gate counters for one camera, including its estimated miss rate
+        """
+        gate = self.color_gates.get(camera_id)
+        return gate.stats() if gate is not None else {}
+    
+    def evaluate_result(self, result, frame, camera_id, camera_name, location, backend_ms=0.0,
+                        backend_postprocess_ms=0.0):
+        """
+        Check one camera's predict result and raise an alert if needed
+        Args:
+            backend_ms: This frame's share of the backend preprocess + inference + postprocess time
+            backend_postprocess_ms: This frame's share of the backend postprocess time
+        """
+        started = time.perf_counter()
+        detections = self.fire_smoke_filter.select(result)
+        filter_ms = (time.perf_counter() - started) * 1000
+        STAGE_SECONDS.observe((backend_postprocess_ms + filter_ms) / 1000, stage='postprocess')
+        detection_found = detections.found
+        highest_confidence = detections.best_confidence
+        confirmed = self.temporal_filter.update(camera_id, highest_confidence)
         
-        # If high-confidence detection found, process it
-        if detection_found and highest_confidence >= 0.8:  # High confidence threshold
+        tracker = self.trackers.get(camera_id)
+        if tracker is None:
+            tracker = self.trackers[camera_id] = IoUTracker(camera_id)
+        tracks = tracker.update(detections.data)
+        self.preview.update_detections(camera_id, detections.data, detection_found and confirmed)
+        
+        # Only alert once fire/smoke has persisted over several analysed frames
+        if detection_found and confirmed:
             current_time = time.time()
-            
-            # Check cooldown to avoid spam
-            if camera_id not in self.last_detection_time or \
-               (current_time - self.last_detection_time[camera_id]) > self.detection_cooldown:
+            # Strongest tracks first, so the per-camera cooldown never goes to a weak box
+            for track in sorted(tracks, key=lambda track: track.confidence, reverse=True):
+                if track.hits < self.temporal_filter.required:
+                    continue
+                
+                if track.incident_opened:
+                    # Ongoing event: cheap update of the existing incident, no image
+                    if track.update_due(current_time, self.track_update_interval, self.track_heartbeat):
+                        track.mark_reported(current_time)
+                        self.send_track_update(camera_id, camera_name, location, track)
+                    continue
                 
-                self.last_detection_time[camera_id] = current_time
-                self.handle_detection(frame, camera_id, camera_name, location, best_detection)
+                # A new incident needs a track that is itself alert-strength, not just any box on the camera
+                if track.confidence < self.temporal_filter.min_score:
+                    continue
+                
+                # Cooldown between new incidents on the same camera
+                if camera_id not in self.last_detection_time or \
+                   (current_time - self.last_detection_time[camera_id]) > self.detection_cooldown:
+                    
+                    self.last_detection_time[camera_id] = current_time
+                    track.mark_reported(current_time)
+                    detection = track.detection(self.backend.names)
+                    detection['processing_time_ms'] = backend_ms + filter_ms
+                    self.handle_detection(frame, camera_id, camera_name, location, detection)
         
         return detection_found, highest_confidence
     
     def handle_detection(self, frame, camera_id, camera_name, location, detection):
         """
-        Handle a fire/smoke detection by saving snapshot and notifying admin
+        Handle a fire/smoke detection by encoding a snapshot and notifying admin
         """
         try:
-            # Create snapshot filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            snapshot_filename = f"snapshots/detection_{camera_id}_{timestamp}.jpg"
+            # Draw on a copy: the frame may be a shared capture buffer still used elsewhere
+            frame = frame.copy()
             
             # Draw bounding box on frame
             x1, y1, x2, y2 = map(int, detection['bbox'])
@@ -213,119 +378,169 @@ class FireSmokeDetector:
             cv2.putText(frame, f"{detection['label']}: {detection['confidence']:.2f}", 
                        (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
             
-            # Save snapshot
-            cv2.imwrite(snapshot_filename, frame)
+            # Encode once in memory; the same bytes are uploaded and optionally archived
+            jpeg_bytes = self.encode_snapshot(frame)
+            ALERTS.inc(camera=camera_id, label=detection['label'])
             print(f"🔥 DETECTION ALERT: {detection['label']} detected with {detection['confidence']:.2f} confidence")
-            print(f"📸 Snapshot saved: {snapshot_filename}")
             
-            # Convert image to base64 for API
-            with open(snapshot_filename, 'rb') as img_file:
-                img_base64 = base64.b64encode(img_file.read()).decode('utf-8')
+            snapshot_filename = ''
+            if self.save_local_snapshots:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                snapshot_filename = f"snapshots/detection_{camera_id}_{timestamp}.jpg"
+                self.archive_snapshot(jpeg_bytes, snapshot_filename)
+                print(f"📸 Snapshot archived: {snapshot_filename}")
+            
+            # The clip is written in the background; its path is known now and goes out with the report
+            clip_path = self.clip_recorder.start_clip(camera_id) if self.clip_recorder is not None else None
             
             # Send incident report to admin
-            self.send_incident_report(camera_id, camera_name, location, detection, img_base64, snapshot_filename)
+            self.send_incident_report(camera_id, camera_name, location, detection, jpeg_bytes, snapshot_filename,
+                                      clip_path)
             
         except Exception as e:
             print(f"Error handling detection: {e}")
     
-    def send_incident_report(self, camera_id, camera_name, location, detection, image_base64, snapshot_path):
+    def send_incident_report(self, camera_id, camera_name, location, detection, jpeg_bytes, snapshot_path,
+                             clip_path=None):
         """
-        Send incident report to the Next.js backend
+        Queue an incident report for the Next.js backend
+        Delivery (multipart upload, retries, spooling) happens on the notifier thread
         """
-        try:
-            incident_data = {
-                'cameraId': camera_id,
-                'cameraName': camera_name,
-                'location': location,
-                'detectionType': detection['label'],
-                'confidence': detection['confidence'],
-                'timestamp': datetime.now().isoformat(),
-                'image': image_base64,
-                'snapshotPath': snapshot_path,
-                'bbox': detection['bbox'],
-                'severity': 'high' if detection['confidence'] > 0.9 else 'medium'
-            }
-            
-            # Send to incident creation API
-            response = requests.post(
-                f"{self.api_base_url}/api/incidents/create-from-detection",
-                json=incident_data,
-                headers={'Content-Type': 'application/json'},
-                timeout=10,
-                verify=False  # For development with self-signed certificates
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"✅ Incident reported successfully - ID: {result.get('incidentId')}")
-                print(f"📧 Admin notification sent")
-            else:
-                print(f"❌ Failed to report incident: {response.status_code} - {response.text}")
-                
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Network error sending incident report: {e}")
-        except Exception as e:
-            print(f"❌ Error sending incident report: {e}")
+        incident_data = {
+            'cameraId': camera_id,
+            'cameraName': camera_name,
+            'location': location,
+            'detectionType': detection['label'],
+            'confidence': detection['confidence'],
+            'timestamp': datetime.now().isoformat(),
+            'snapshotPath': snapshot_path,
+            'bbox': json.dumps(detection['bbox']),
+            'severity': 'high' if detection['confidence'] > 0.9 else 'medium',
+            'processingTime': round(detection.get('processing_time_ms', 0.0), 1),
+            'trackId': detection.get('track_id', ''),
+            'clipPath': clip_path or ''
+        }
+        
+        self.notifier.enqueue(
+            f"{self.api_base_url}/api/incidents/create-from-detection",
+            incident_data,
+            jpeg_bytes,
+            f"detection_{camera_id}.jpg"
+        )
+        print(f"📧 Incident report queued for admin")
+    
+    def send_track_update(self, camera_id, camera_name, location, track):
+        """
+        Queue a small update (no image) for the incident already opened for this track
+        The API matches it to the incident by trackId
+        """
+        update_data = {
+            'cameraId': camera_id,
+            'cameraName': camera_name,
+            'location': location,
+            'detectionType': self.backend.names[track.cls_id],
+            'confidence': track.confidence,
+            'timestamp': datetime.now().isoformat(),
+            'bbox': json.dumps(track.bbox.tolist()),
+            'severity': 'high' if track.max_confidence > 0.9 else 'medium',
+            'trackId': track.track_id
+        }
+        
+        self.notifier.enqueue(f"{self.api_base_url}/api/incidents/create-from-detection", update_data)
+        print(f"🔁 Incident update queued for track {track.track_id} ({track.confidence:.2f})")
+    
+    def close(self):
+        """
+        Flush background work (snapshot archive, event clips, pending incident reports)
+        """
+        self.archive_executor.shutdown(wait=True)
+        if self.clip_recorder is not None:
+            self.clip_recorder.close()
+        self.notifier.close()
     
     def monitor_camera(self, stream_url, camera_id, camera_name, location):
         """
         Monitor a single camera stream for fire/smoke detection
+        Frames are decoded on a separate thread; this loop always analyses the newest one
         """
         print(f"🎥 Starting monitoring for camera: {camera_name} ({location})")
         print(f"🔗 Stream URL: {stream_url}")
         
-        cap = cv2.VideoCapture(stream_url)
-        
-        # Set buffer size to reduce latency
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        
-        if not cap.isOpened():
-            print(f"❌ Error: Could not open stream for camera {camera_name}")
-            return False
+        # SHM_CAPTURE=1 decodes in a separate process so decoding does not compete for the GIL
+        capture = ShmCaptureManager(cameras_per_process=1) if os.getenv('SHM_CAPTURE') == '1' else None
+        self.preview.register(camera_id)
+        on_frame = lambda frame, frame_time: self.record_frame(camera_id, frame, frame_time)
+        grabber = (capture.open(camera_id, stream_url, name=camera_name) if capture is not None
+                   else LatestFrameGrabber(stream_url, name=camera_name, on_frame=on_frame, camera_id=camera_id))
+        sampler = AdaptiveSampler(target_fps=self.analysis_fps)
+        if not grabber.start():
+            # Keep the loaded model; the grabber reconnects with backoff in the background
+            print(f"⚠️ Could not open stream for camera {camera_name} yet, retrying in the background")
         
         frame_count = 0
         detection_count = 0
+        last_stats_time = time.time()
         
         try:
             while True:
-                ret, frame = cap.read()
-                if not ret:
-                    print(f"❌ Error: Could not read frame from camera {camera_name}")
-                    break
+                # Wait until the sampler says this camera is due, then take the newest frame
+                time.sleep(sampler.next_delay())
+                item = grabber.read(timeout=5.0)
+                if item is None:
+                    if not grabber.is_alive():
+                        print(f"❌ Error: Capture stopped for camera {camera_name}")
+                        break
+                    print(f"⏳ No new frame from camera {camera_name} in 5s")
+                    continue
                 
+                frame, _seq, frame_time = item
                 frame_count += 1
+                if capture is not None:
+                    # Decoded frames stay in the decoder process; clip ring and preview get the analysed ones
+                    self.record_frame(camera_id, frame, frame_time)
                 
-                # Process every 10th frame to reduce CPU load
-                if frame_count % 10 == 0:
-                    detected, confidence = self.process_frame(frame, camera_id, camera_name, location)
-                    if detected:
-                        detection_count += 1
-                
-                # Optional: Display frame (comment out for headless operation)
-                # cv2.imshow(f"Monitor: {camera_name}", frame)
+                started = time.time()
+                detected, confidence = self.process_frame(frame, camera_id, camera_name, location)
+                sampler.record(time.time() - started, confidence)
+                if detected:
+                    detection_count += 1
                 
-                # Check for quit command
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-                
-                # Small delay to prevent overwhelming the system
-                time.sleep(0.1)
+                # Report capture counters periodically
+                if time.time() - last_stats_time >= 60:
+                    stats = grabber.stats()
+                    gating = self.gating_stats(camera_id)
+                    print(f"📈 [{camera_name}] decoded={stats['framesDecoded']} dropped={stats['framesDropped']} "
+                          f"stale={stats['staleFrames']} analysed={frame_count} "
+                          f"fps={sampler.current_fps():.2f} inference={sampler.avg_inference_time * 1000:.0f}ms "
+                          f"skipped={gating.get('skipRatio', 0):.0%}")
+                    notifier_stats = self.notifier.stats()
+                    if isinstance(self.backend, CascadeBackend):
+                        cascade = self.backend.stats()
+                        print(f"🪜 Cascade escalated={cascade['escalationRate']:.1%} "
+                              f"screen={cascade['avgScreenMs']}ms misses={cascade['screenMisses']}")
+                    print(f"📨 Alerts delivered={notifier_stats['delivered']} spooled={notifier_stats['spooled']} "
+                          f"p95={notifier_stats['latencyP95Ms']}ms")
+                    last_stats_time = time.time()
                 
         except KeyboardInterrupt:
             print(f"\n🛑 Monitoring stopped for camera: {camera_name}")
         except Exception as e:
             print(f"❌ Error monitoring camera {camera_name}: {e}")
         finally:
-            cap.release()
-            cv2.destroyAllWindows()
-            print(f"📊 Monitoring complete - Processed {frame_count} frames, {detection_count} detections")
+            stats = grabber.stats()
+            grabber.stop()
+            if capture is not None:
+                capture.close()
+            print(f"📊 Monitoring complete - Analysed {frame_count} frames, {detection_count} detections")
+            print(f"📊 Capture stats - decoded {stats['framesDecoded']}, dropped {stats['framesDropped']}, "
+                  f"stale {stats['staleFrames']}")
         
         return True
 
 def main():
     """
     Main function to start camera monitoring
-    Usage: python mdl.py <camera_id> <stream_url> <camera_name> <location>
+    Usage: python mdl.py <camera_id> <stream_url> <camera_name> <location> [roi_json]
     """
     print("🚀 Fire/Smoke Detection AI Starting...")
     print(f"📋 Arguments received: {sys.argv}")
@@ -339,6 +554,7 @@ def main():
     stream_url = sys.argv[2]
     camera_name = sys.argv[3]
     location = sys.argv[4]
+    roi = json.loads(sys.argv[5]) if len(sys.argv) > 5 else None
     
     print(f"🎯 Camera ID: {camera_id}")
     print(f"🔗 Stream URL: {stream_url}")
@@ -346,14 +562,30 @@ def main():
     print(f"📍 Location: {location}")
     
     try:
+        # Optional Prometheus endpoint (one port per process, so off by default)
+        metrics_port = int(os.getenv('METRICS_PORT', 0))
+        if metrics_port:
+            start_metrics_server(os.getenv('METRICS_HOST', '127.0.0.1'), metrics_port)
+            print(f"📈 Metrics: http://{os.getenv('METRICS_HOST', '127.0.0.1')}:{metrics_port}/metrics")
+        
         # Initialize detector
         print("🔧 Initializing detector...")
         detector = FireSmokeDetector()
+        
+        # Optional annotated MJPEG preview of this camera (replaces the old cv2.imshow window)
+        preview_port = int(os.getenv('PREVIEW_PORT', 0))
+        if preview_port:
+            start_preview_server(detector.preview, os.getenv('PREVIEW_HOST', '127.0.0.1'), preview_port)
+            print(f"👀 Preview: http://{os.getenv('PREVIEW_HOST', '127.0.0.1')}:{preview_port}/preview/{camera_id}")
+        if roi:
+            detector.set_roi(camera_id, roi)
+            print(f"🔲 Region of interest: {roi}")
         print("✅ Detector initialized successfully")
         
         # Start monitoring
         print("▶️ Starting camera monitoring...")
         detector.monitor_camera(stream_url, camera_id, camera_name, location)
+        detector.close()
         
     except Exception as e:
         print(f"💥 Fatal error in main: {e}")
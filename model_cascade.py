@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Two-Stage Model Cascade
+A cheap screening pass (a smaller model, or the same weights at a lower input
+resolution) runs on every sampled frame. Only frames with a fire/smoke
+candidate above a low threshold are escalated to the full model, either whole
+or as a crop around the candidates. Most frames of most cameras show nothing,
+so the expensive model runs on a small fraction of them.
+
+An optional audit escalates a random share of frames the screen rejected, so
+screen misses (recall lost by the cascade) show up in the stats.
+"""
+
+import random
+import time
+
+import numpy as np
+
+from detection_postprocess import FireSmokeFilter
+from detector_metrics import METRICS
+
+_EMPTY = np.zeros((0, 6), dtype=np.float32)
+
+CASCADE_FRAMES = METRICS.counter(
+    'detector_cascade_frames_total', 'Frames by cascade outcome', ['outcome'])
+
+
+class CascadeBackend:
+    def __init__(self, screen, confirm, screen_threshold=0.15, escalate='frame', crop_margin=0.5,
+                 audit_fraction=0.0):
+        """
+        Args:
+            screen: Fast backend run on every frame
+            confirm: Full backend run on escalated frames/crops
+            screen_threshold: Fire/smoke confidence from the screen that escalates a frame
+            escalate: 'frame' sends the whole frame, 'crop' only the area around the candidates
+            crop_margin: Crop padding as a fraction of the candidate box size
+            audit_fraction: Share of screen-rejected frames escalated anyway to measure misses
+        """
+        if escalate not in ('frame', 'crop'):
+            raise ValueError(f"escalate must be 'frame' or 'crop', got '{escalate}'")
+        self.screen = screen
+        self.confirm = confirm
+        self.names = confirm.names
+        self.screen_filter = FireSmokeFilter(screen.names)
+        self.confirm_filter = FireSmokeFilter(confirm.names)
+        self.screen_threshold = screen_threshold
+        self.escalate = escalate
+        self.crop_margin = crop_margin
+        self.audit_fraction = audit_fraction
+        self.last_timings = {}
+
+        self.frames_screened = 0
+        self.frames_escalated = 0
+        self.frames_audited = 0
+        self.screen_misses = 0
+        self.screen_time = 0.0
+        self.confirm_time = 0.0
+
+    def _crop_box(self, candidates, frame_shape):
+        # Union of the candidate boxes, padded and grown to at least the confirm model's input size
+        height, width = frame_shape[:2]
+        x1, y1 = candidates[:, 0].min(), candidates[:, 1].min()
+        x2, y2 = candidates[:, 2].max(), candidates[:, 3].max()
+        pad_x = max((x2 - x1) * self.crop_margin, (getattr(self.confirm, 'imgsz', 640) - (x2 - x1)) / 2, 0)
+        pad_y = max((y2 - y1) * self.crop_margin, (getattr(self.confirm, 'imgsz', 640) - (y2 - y1)) / 2, 0)
+        return (int(max(x1 - pad_x, 0)), int(max(y1 - pad_y, 0)),
+                int(min(x2 + pad_x, width)), int(min(y2 + pad_y, height)))
+
+    def predict(self, frames, conf=0.25, iou=0.7):
+        """
+        Same contract as the backends' predict; frames the screen rejects (and that are not
+        audited) get no detections
+        """
+        started = time.perf_counter()
+        screened = self.screen.predict(frames, conf=min(conf, self.screen_threshold), iou=iou)
+        timings = dict(self.screen.last_timings)
+        screen_done = time.perf_counter()
+
+        escalated, audited, images, owners = [], [], [], []
+        for index, (frame, data) in enumerate(zip(frames, screened)):
+            candidates = self.screen_filter.select(data, min_confidence=self.screen_threshold)
+            if candidates.found:
+                escalated.append(index)
+            elif self.audit_fraction and random.random() < self.audit_fraction:
+                audited.append(index)
+            else:
+                continue
+
+            if candidates.found and self.escalate == 'crop':
+                x1, y1, x2, y2 = self._crop_box(candidates.data, frame.shape)
+                images.append(frame[y1:y2, x1:x2])
+                owners.append((index, x1, y1))
+            else:
+                images.append(frame)
+                owners.append((index, 0, 0))
+
+        results = [_EMPTY] * len(frames)
+        if images:
+            confirmed = self.confirm.predict(images, conf=conf, iou=iou)
+            for stage, value in self.confirm.last_timings.items():
+                timings[stage] = timings.get(stage, 0.0) + value
+            for (index, left, top), data in zip(owners, confirmed):
+                if left or top:
+                    data = data.copy()
+                    data[:, [0, 2]] += left
+                    data[:, [1, 3]] += top
+                results[index] = data
+
+            # A fire/smoke box on an audited frame is one the screen would have missed (and is kept)
+            for index in audited:
+                if self.confirm_filter.select(results[index], min_confidence=conf).found:
+                    self.screen_misses += 1
+
+        self.frames_screened += len(frames)
+        self.frames_escalated += len(escalated)
+        self.frames_audited += len(audited)
+        self.screen_time += screen_done - started
+        self.confirm_time += time.perf_counter() - screen_done
+        CASCADE_FRAMES.inc(len(frames), outcome='screened')
+        CASCADE_FRAMES.inc(len(escalated), outcome='escalated')
+        self.last_timings = timings
+        return results
+
+    def stats(self):
+        screened = max(self.frames_screened, 1)
+        return {
+            'framesScreened': self.frames_screened,
+            'framesEscalated': self.frames_escalated,
+            'escalationRate': round(self.frames_escalated / screened, 4),
+            'framesAudited': self.frames_audited,
+            'screenMisses': self.screen_misses,
+            'screenMissRate': round(self.screen_misses / self.frames_audited, 4) if self.frames_audited else None,
+            'avgScreenMs': round(self.screen_time * 1000 / screened, 2),
+            'avgConfirmMsPerFrame': round(self.confirm_time * 1000 / screened, 2)
+        }
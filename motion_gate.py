@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Motion/Change Gate
+Cheap pre-inference check that compares block means of a downscaled grayscale
+copy of each frame against the last analysed frame. When nothing changed beyond
+the threshold the detector skips model.predict and reuses its previous result.
+A forced inference every few seconds keeps slow-building smoke from being missed.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, grid_size=(32, 18), block_threshold=12.0, changed_fraction=0.01, force_interval=10.0):
+        """
+        Args:
+            grid_size: (columns, rows) of blocks the frame is reduced to
+            block_threshold: Mean gray-level change (0-255) for a block to count as changed
+            changed_fraction: Fraction of changed blocks needed to run inference
+            force_interval: Seconds after which inference runs even on a static scene
+        """
+        self.grid_size = grid_size
+        self.block_threshold = block_threshold
+        self.changed_fraction = changed_fraction
+        self.force_interval = force_interval
+
+        self.reference = None  # Block means of the last frame that went to inference
+        self.last_inference_time = 0.0
+        self.last_change_time = 0.0  # Last frame with real scene change (not a forced check)
+
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.forced_inferences = 0
+
+    def _block_means(self, frame):
+        # INTER_AREA averages every source pixel into its block, so one resize gives the block means
+        small = cv2.resize(frame, self.grid_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.float32)
+
+    def should_infer(self, frame, now=None):
+        """
+        Return True if the frame needs a full model pass
+        """
+        now = now if now is not None else time.time()
+        self.frames_checked += 1
+        blocks = self._block_means(frame)
+
+        if self.reference is None:
+            changed = True
+        else:
+            changed_blocks = np.count_nonzero(np.abs(blocks - self.reference) > self.block_threshold)
+            changed = changed_blocks > self.changed_fraction * blocks.size
+
+        if changed:
+            self.last_change_time = now
+        forced = not changed and now - self.last_inference_time >= self.force_interval
+        if changed or forced:
+            # Compare future frames with this one, so slow drift still adds up to a change
+            self.reference = blocks
+            self.last_inference_time = now
+            if forced:
+                self.forced_inferences += 1
+            return True
+
+        self.frames_skipped += 1
+        return False
+
+    def skip_ratio(self):
+        if self.frames_checked == 0:
+            return 0.0
+        return self.frames_skipped / self.frames_checked
+
+    def stats(self):
+        return {
+            'framesChecked': self.frames_checked,
+            'framesSkipped': self.frames_skipped,
+            'forcedInferences': self.forced_inferences,
+            'skipRatio': round(self.skip_ratio(), 3)
+        }
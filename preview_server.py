@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Annotated MJPEG Preview
+Replaces cv2.imshow/waitKey (which fail on headless servers and cost time on
+every frame) with an HTTP preview of what the detector sees:
+
+    GET /preview                 cameras with a preview and their viewer counts (JSON)
+    GET /preview/<cameraId>      multipart/x-mixed-replace MJPEG stream, ?fps=N per viewer
+    GET /preview/<cameraId>.jpg  single annotated frame
+
+Frames come from the detector's existing decode (no second connection to the
+camera). Nothing is copied, drawn or encoded while a camera has no viewers;
+with viewers, each new frame is rendered once and shared by all of them, and
+every viewer gets at most its own requested frame rate.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import cv2
+import numpy as np
+
+BOUNDARY = 'frame'
+
+
+class CameraPreview:
+    """
+    Latest frame and detections of one camera, plus the rendered JPEG of that frame
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.viewers = 0
+        self.frame = None
+        self.frame_time = 0.0
+        self.seq = 0
+        self.detections = np.zeros((0, 6), dtype=np.float32)
+        self.detection_time = 0.0
+        self.confirmed = False
+        self.rendered_seq = 0
+        self.rendered = None
+
+
+class PreviewHub:
+    def __init__(self, names=None, fps=5.0, max_fps=15.0, jpeg_quality=70, max_width=960, detection_ttl=2.0):
+        """
+        Args:
+            names: Model class names {class_id: name} for the box labels
+            fps: Default frame rate per viewer
+            max_fps: Highest frame rate a viewer may ask for; also caps how often frames are copied
+            jpeg_quality: Quality of the preview JPEGs
+            max_width: Preview frames are scaled down to this width
+            detection_ttl: Seconds boxes stay on screen after the analysis that produced them
+        """
+        self.names = names or {}
+        self.fps = fps
+        self.max_fps = max_fps
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+        self.max_width = max_width
+        self.detection_ttl = detection_ttl
+        self.cameras = {}  # camera_id -> CameraPreview
+        self.lock = threading.Lock()
+
+    def register(self, camera_id):
+        """
+        Make a monitored camera available for previews (only registered ids can be watched)
+        """
+        with self.lock:
+            self.cameras.setdefault(camera_id, CameraPreview())
+
+    def has_camera(self, camera_id):
+        return camera_id in self.cameras
+
+    def _preview(self, camera_id):
+        preview = self.cameras.get(camera_id)
+        if preview is None:
+            raise KeyError(f"No preview for camera {camera_id}")
+        return preview
+
+    def viewers(self, camera_id):
+        preview = self.cameras.get(camera_id)
+        return preview.viewers if preview is not None else 0
+
+    def update_frame(self, camera_id, frame, frame_time=None):
+        """
+        Offer a decoded frame; it is only kept (copied) while the camera has viewers
+        """
+        preview = self.cameras.get(camera_id)
+        if preview is None or preview.viewers <= 0:
+            return
+        frame_time = frame_time if frame_time is not None else time.time()
+        if frame_time - preview.frame_time < 1.0 / self.max_fps:
+            return
+        frame = frame.copy()  # The capture buffer may be reused (shared-memory rings)
+        with preview.condition:
+            preview.frame = frame
+            preview.frame_time = frame_time
+            preview.seq += 1
+            preview.condition.notify_all()
+
+    def update_detections(self, camera_id, detections, confirmed=False):
+        """
+        Record the boxes (N, 6) of the camera's latest analysed frame
+        """
+        preview = self.cameras.get(camera_id)
+        if preview is None:
+            return
+        with preview.condition:
+            preview.detections = detections
+            preview.detection_time = time.time()
+            preview.confirmed = confirmed
+
+    def _render(self, camera_id, preview):
+        # Called with preview.condition held; the JPEG is cached per frame and shared by all viewers
+        if preview.rendered_seq == preview.seq and preview.rendered is not None:
+            return preview.rendered
+        frame = preview.frame
+        scale = min(self.max_width / frame.shape[1], 1.0)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (self.max_width, int(frame.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+
+        fresh = time.time() - preview.detection_time <= self.detection_ttl
+        for x1, y1, x2, y2, conf, cls_id in (preview.detections if fresh else []):
+            label = self.names.get(int(cls_id), str(int(cls_id)))
+            color = (0, 0, 255) if label.lower() == 'fire' else (0, 255, 255) if label.lower() == 'smoke' \
+                else (200, 200, 200)
+            p1, p2 = (int(x1 * scale), int(y1 * scale)), (int(x2 * scale), int(y2 * scale))
+            cv2.rectangle(frame, p1, p2, color, 2)
+            cv2.putText(frame, f"{label}: {conf:.2f}", (p1[0], max(p1[1] - 6, 12)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+        status = 'ALERT' if fresh and preview.confirmed else 'detected' if fresh and len(preview.detections) \
+            else 'clear'
+        text = f"{camera_id} | {time.strftime('%H:%M:%S', time.localtime(preview.frame_time))} | {status}"
+        cv2.putText(frame, text, (8, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 1)
+
+        ok, encoded = cv2.imencode('.jpg', frame, self.encode_params)
+        preview.rendered = encoded.tobytes() if ok else None
+        preview.rendered_seq = preview.seq
+        return preview.rendered
+
+    def stream(self, camera_id, write, fps=None, running=lambda: True, idle_timeout=5.0, deadline=None):
+        """
+        Send annotated JPEGs to one viewer until write() fails, running() is False, the deadline
+        (a time.time() value) passes or the camera is removed
+        Args:
+            write: Callable(jpeg_bytes) sending one frame to the viewer
+            fps: Frame rate for this viewer (default self.fps, capped at max_fps)
+        Raises KeyError for cameras that are not registered
+        """
+        interval = 1.0 / min(fps or self.fps, self.max_fps)
+        preview = self._preview(camera_id)
+        with preview.condition:
+            preview.viewers += 1
+        print(f"👀 Preview viewer connected to camera {camera_id} ({preview.viewers} watching)")
+        last_seq = 0
+        removed = lambda: self.cameras.get(camera_id) is not preview
+        try:
+            while running() and not removed():
+                now = time.time()
+                if deadline is not None and now >= deadline:
+                    break
+                next_time = now + interval
+                timeout = idle_timeout if deadline is None else min(idle_timeout, deadline - now)
+                with preview.condition:
+                    if not preview.condition.wait_for(lambda: preview.seq > last_seq or removed(), timeout=timeout):
+                        if preview.rendered is None:
+                            continue  # No frame yet (stream down); keep the connection open
+                    if removed():
+                        break
+                    last_seq = preview.seq
+                    jpeg = self._render(camera_id, preview) if preview.frame is not None else None
+                if jpeg is not None:
+                    write(jpeg)
+                time.sleep(max(next_time - time.time(), 0))
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Viewer went away
+        finally:
+            with preview.condition:
+                preview.viewers -= 1
+                if preview.viewers == 0:
+                    preview.frame = preview.rendered = None  # Free the copies until someone watches again
+            print(f"👋 Preview viewer left camera {camera_id}")
+
+    def snapshot(self, camera_id, timeout=5.0):
+        """
+        One annotated JPEG, or None if the camera delivers no frame within timeout seconds
+        """
+        result = []
+        self.stream(camera_id, result.append, fps=self.max_fps, running=lambda: not result,
+                    deadline=time.time() + timeout)
+        return result[0] if result else None
+
+    def forget(self, camera_id):
+        with self.lock:
+            preview = self.cameras.pop(camera_id, None)
+        if preview is not None:
+            with preview.condition:
+                preview.condition.notify_all()  # Viewers of a removed camera end their streams
+
+    def stats(self):
+        with self.lock:
+            return {camera_id: {'viewers': preview.viewers} for camera_id, preview in self.cameras.items()}
+
+
+def handle_preview_request(handler, hub):
+    """
+    Serve a /preview request on any BaseHTTPRequestHandler; returns False if the path is not a preview path
+    """
+    url = urlparse(handler.path)
+    if url.path == '/preview':
+        body = json.dumps({'success': True, 'previews': hub.stats()}).encode('utf-8')
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+        return True
+    if not url.path.startswith('/preview/'):
+        return False
+
+    camera_id = unquote(url.path[len('/preview/'):])
+    snapshot = camera_id.endswith('.jpg') and not hub.has_camera(camera_id)
+    if snapshot:
+        camera_id = camera_id[:-4]
+    if not hub.has_camera(camera_id):
+        body = json.dumps({'success': False, 'error': 'Camera not monitored'}).encode('utf-8')
+        handler.send_response(404)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+        return True
+
+    if snapshot:
+        jpeg = hub.snapshot(camera_id)
+        if jpeg is None:
+            handler.send_response(503)
+            handler.end_headers()
+            return True
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'image/jpeg')
+        handler.send_header('Content-Length', str(len(jpeg)))
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.end_headers()
+        handler.wfile.write(jpeg)
+        return True
+
+    try:
+        fps = float(parse_qs(url.query).get('fps', [0])[0]) or None
+    except ValueError:
+        fps = None
+    handler.send_response(200)
+    handler.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+    handler.send_header('Cache-Control', 'no-cache')
+    handler.send_header('Connection', 'close')
+    handler.end_headers()
+
+    def write(jpeg):
+        handler.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n"
+                            .encode('ascii') + jpeg + b"\r\n")
+        handler.wfile.flush()
+
+    hub.stream(camera_id, write, fps=fps)
+    return True
+
+
+class PreviewRequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if not handle_preview_request(self, self.server.preview_hub):
+            self.send_response(404)
+            self.end_headers()
+
+
+def start_preview_server(hub, host='127.0.0.1', port=8090):
+    """
+    Serve the hub's previews on http://host:port/preview/<cameraId> from a daemon thread
+    """
+    httpd = ThreadingHTTPServer((host, port), PreviewRequestHandler)
+    httpd.daemon_threads = True
+    httpd.preview_hub = hub
+    threading.Thread(target=httpd.serve_forever, name="preview", daemon=True).start()
+    return httpd
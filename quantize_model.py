@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+INT8 Model Quantisation
+Builds a post-training INT8 version of the fire/smoke model for dense camera
+deployments and checks what it costs in accuracy. Calibration uses our own
+frames (by default the JPEGs in snapshots/ and public/incident-snapshots/).
+
+The FP32 ONNX export is used as the reference: the report shows how many of its
+fire/smoke detections the INT8 model still finds (box recall and alert-frame
+recall) and the latency of both on the same images, so each site can decide if
+the speedup is worth it. Recall here is agreement with the FP32 model, not
+accuracy against labelled ground truth. The accuracy check runs on images the
+calibration never saw: --eval, or by default a held-out part (--eval-split) of
+the calibration folders.
+
+Usage:
+    python quantize_model.py --model best_01.pt --calib snapshots public/incident-snapshots
+    INFERENCE_BACKEND=onnx INFERENCE_PRECISION=int8 python mdl.py ...
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+from detection_postprocess import FireSmokeFilter, box_iou
+from inference_backends import OnnxBackend, export_cached, letterbox, list_images, quantized_path
+
+
+class FrameCalibrationReader:
+    """
+    Feeds letterboxed calibration frames to the ONNX Runtime quantiser one at a time
+    """
+    def __init__(self, image_paths, input_name, imgsz):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self.index = 0
+
+    def get_next(self):
+        while self.index < len(self.image_paths):
+            frame = cv2.imread(self.image_paths[self.index])
+            self.index += 1
+            if frame is None:
+                continue
+            image, _, _ = letterbox(frame, self.imgsz)
+            blob = cv2.dnn.blobFromImage(image, scalefactor=1 / 255.0, swapRB=True)
+            return {self.input_name: blob}
+        return None
+
+    def rewind(self):
+        self.index = 0
+
+
+def head_nodes(model):
+    """
+    Nodes of the final Detect module; box decoding is kept in FP32 to protect localisation
+    """
+    def module_index(name):
+        parts = name.split('/')
+        if len(parts) > 1 and parts[1].startswith('model.'):
+            suffix = parts[1][len('model.'):]
+            return int(suffix) if suffix.isdigit() else -1
+        return -1
+
+    last = max((module_index(node.name) for node in model.graph.node), default=-1)
+    if last < 0:
+        return []
+    return [node.name for node in model.graph.node if module_index(node.name) == last]
+
+
+def quantize(model_path, calibration_images, imgsz=640, keep_head_fp32=True):
+    """
+    Export (if needed) and statically quantise the model to INT8
+    Returns (fp32_onnx_path, int8_onnx_path)
+    """
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    fp32_path = export_cached(model_path, 'onnx', imgsz)
+    int8_path = quantized_path(model_path, imgsz)
+    fp32_model = onnx.load(fp32_path)
+    input_name = fp32_model.graph.input[0].name
+
+    class Reader(FrameCalibrationReader, CalibrationDataReader):
+        pass
+
+    print(f"🧪 Calibrating on {len(calibration_images)} frames...")
+    quantize_static(
+        fp32_path,
+        int8_path,
+        Reader(calibration_images, input_name, imgsz),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        nodes_to_exclude=head_nodes(fp32_model) if keep_head_fp32 else []
+    )
+
+    # Keep the ultralytics metadata (class names, imgsz) the backends read
+    int8_model = onnx.load(int8_path)
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, int8_path)
+
+    print(f"✅ INT8 model written: {int8_path}")
+    return fp32_path, int8_path
+
+
+def run_backend(backend, frames, conf):
+    detections, latencies = [], []
+    for frame in frames[:3]:
+        backend.predict([frame], conf=conf)  # Warm-up
+    for frame in frames:
+        started = time.perf_counter()
+        detections.append(backend.predict([frame], conf=conf)[0])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return detections, latencies
+
+
+def compare(fp32_path, int8_path, frames, conf=0.25, alert_threshold=0.8, iou_threshold=0.5, threads=None):
+    """
+    Fire/smoke recall of the INT8 model against FP32 detections, plus latency of both
+    """
+    fp32 = OnnxBackend(fp32_path, threads=threads)
+    int8 = OnnxBackend(int8_path, threads=threads)
+    fire_smoke = FireSmokeFilter(fp32.names)
+
+    fp32_detections, fp32_latencies = run_backend(fp32, frames, conf)
+    int8_detections, int8_latencies = run_backend(int8, frames, conf)
+
+    reference_boxes = found_boxes = 0
+    alert_frames = alert_frames_kept = 0
+    for reference, candidate in zip(fp32_detections, int8_detections):
+        reference = fire_smoke.select(reference).data
+        candidate = fire_smoke.select(candidate).data
+        reference_boxes += len(reference)
+        if len(reference) and len(candidate):
+            iou = box_iou(reference[:, :4], candidate[:, :4])
+            iou = np.where(reference[:, None, 5] == candidate[None, :, 5], iou, 0)
+            found_boxes += int(np.count_nonzero(iou.max(axis=1) >= iou_threshold))
+
+        # Frame-level: would the INT8 model still raise the same alert?
+        if len(reference) and reference[:, 4].max() >= alert_threshold:
+            alert_frames += 1
+            if len(candidate) and candidate[:, 4].max() >= alert_threshold:
+                alert_frames_kept += 1
+
+    fp32_mean, int8_mean = float(np.mean(fp32_latencies)), float(np.mean(int8_latencies))
+    return {
+        'frames': len(frames),
+        'reference': 'fp32',  # Recall is measured against FP32 detections, not labels
+        'referenceFireSmokeBoxes': reference_boxes,
+        'boxRecall': found_boxes / reference_boxes if reference_boxes else None,
+        'alertFrames': alert_frames,
+        'alertFrameRecall': alert_frames_kept / alert_frames if alert_frames else None,
+        'fp32LatencyMs': {'mean': fp32_mean, 'p95': float(np.percentile(fp32_latencies, 95))},
+        'int8LatencyMs': {'mean': int8_mean, 'p95': float(np.percentile(int8_latencies, 95))},
+        'speedup': fp32_mean / int8_mean if int8_mean else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantise the fire/smoke model to INT8 and check its accuracy")
+    parser.add_argument('--model', default='best_01.pt')
+    parser.add_argument('--calib', nargs='+', default=['snapshots', 'public/incident-snapshots'],
+                        help="Image files or folders used for calibration")
+    parser.add_argument('--eval', nargs='+', default=None,
+                        help="Image files or folders for the accuracy check (default: held out from --calib)")
+    parser.add_argument('--eval-split', type=float, default=0.2,
+                        help="Share of the calibration images held out for the accuracy check when --eval is not given")
+    parser.add_argument('--max-calib', type=int, default=300)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--quantize-head', action='store_true', help="Also quantise the Detect head")
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--alert-threshold', type=float, default=0.8)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--report', default=None, help="Write the comparison as JSON to this file")
+    args = parser.parse_args()
+
+    calibration_images = list_images(args.calib)
+    random.Random(0).shuffle(calibration_images)
+    if args.eval:
+        eval_images = list_images(args.eval)
+        held_out = {os.path.realpath(path) for path in eval_images}
+        overlap = [path for path in calibration_images if os.path.realpath(path) in held_out]
+        if overlap:
+            # Calibrating on the evaluation frames would overstate INT8 recall
+            print(f"⚠️ {len(overlap)} evaluation image(s) are also in the calibration set; "
+                  f"leaving them out of calibration")
+            calibration_images = [path for path in calibration_images if os.path.realpath(path) not in held_out]
+    else:
+        split = int(round(len(calibration_images) * args.eval_split))
+        eval_images, calibration_images = calibration_images[:split], calibration_images[split:]
+    if not calibration_images:
+        print("❌ No calibration images found")
+        return
+    if not eval_images:
+        print("❌ No evaluation images - pass --eval or raise --eval-split")
+        return
+    calibration_images = calibration_images[:args.max_calib]
+    print(f"🖼️ {len(calibration_images)} calibration images | {len(eval_images)} held-out evaluation images")
+
+    fp32_path, int8_path = quantize(args.model, calibration_images, args.imgsz,
+                                    keep_head_fp32=not args.quantize_head)
+
+    frames = [frame for frame in (cv2.imread(path) for path in eval_images) if frame is not None]
+    report = compare(fp32_path, int8_path, frames, args.conf, args.alert_threshold, threads=args.threads)
+
+    print("\n📊 INT8 vs FP32 (recall = agreement with FP32 detections, not labelled ground truth)")
+    print(f"   Frames evaluated:        {report['frames']}")
+    if report['boxRecall'] is not None:
+        print(f"   Fire/smoke box recall:   {report['boxRecall']:.1%} of {report['referenceFireSmokeBoxes']}")
+    else:
+        print("   Fire/smoke box recall:   n/a (FP32 found no fire/smoke)")
+    if report['alertFrameRecall'] is not None:
+        print(f"   Alert frames kept:       {report['alertFrameRecall']:.1%} of {report['alertFrames']}")
+    print(f"   FP32 latency:            {report['fp32LatencyMs']['mean']:.1f}ms (p95 {report['fp32LatencyMs']['p95']:.1f}ms)")
+    print(f"   INT8 latency:            {report['int8LatencyMs']['mean']:.1f}ms (p95 {report['int8LatencyMs']['p95']:.1f}ms)")
+    if report['speedup']:
+        print(f"   Speedup:                 {report['speedup']:.2f}x")
+
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"📝 Report written: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
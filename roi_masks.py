@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Per-Camera Region-of-Interest Masks
+Many cameras see sky, ceilings or a timestamp overlay we never care about. A
+camera's ROI is a list of polygons and/or rectangles; the detector crops each
+frame to the bounding box of the ROI before inference (smaller input), maps the
+boxes back to full-frame coordinates and drops detections whose centre falls
+outside the mask (fewer false alerts).
+
+Shapes are [[x, y], [x, y], ...] polygons or [x1, y1, x2, y2] rectangles, in
+pixels or as fractions (0-1) of the frame size.
+"""
+
+import cv2
+import numpy as np
+
+
+def shape_to_polygon(shape, frame_shape):
+    """
+    Convert one ROI shape to an (N, 2) int32 pixel polygon
+    """
+    height, width = frame_shape[:2]
+    points = np.asarray(shape, dtype=np.float32)
+    if points.ndim == 1:
+        if len(points) != 4:
+            raise ValueError(f"Rectangle ROI needs [x1, y1, x2, y2], got {shape}")
+        x1, y1, x2, y2 = points
+        points = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32)
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+        raise ValueError(f"Polygon ROI needs at least 3 [x, y] points, got {shape}")
+    if points.max() <= 1.0:
+        points = points * np.array([width, height], dtype=np.float32)
+    points[:, 0] = np.clip(points[:, 0], 0, width)
+    points[:, 1] = np.clip(points[:, 1], 0, height)
+    return np.round(points).astype(np.int32)
+
+
+class RoiMask:
+    def __init__(self, shapes):
+        """
+        Args:
+            shapes: List of polygons and/or rectangles (see module docstring)
+        """
+        if not shapes:
+            raise ValueError("ROI needs at least one shape")
+        for shape in shapes:
+            shape_to_polygon(shape, (1, 1))  # Reject malformed shapes before the first frame
+        self.shapes = shapes
+        self.frame_shape = None
+        self.bbox = None  # (x1, y1, x2, y2) crop of the ROI in frame pixels
+        self.mask = None  # uint8 mask of the crop, 1 inside the ROI
+
+    def _prepare(self, frame_shape):
+        # Rebuilt only when the stream resolution changes
+        if self.frame_shape == frame_shape[:2]:
+            return
+        polygons = [shape_to_polygon(shape, frame_shape) for shape in self.shapes]
+        points = np.concatenate(polygons)
+        x1, y1 = points.min(axis=0)
+        x2, y2 = points.max(axis=0)
+        x2, y2 = max(x2, x1 + 1), max(y2, y1 + 1)
+
+        mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+        cv2.fillPoly(mask, [polygon - np.array([x1, y1], dtype=np.int32) for polygon in polygons], 1)
+        self.frame_shape = frame_shape[:2]
+        self.bbox = (int(x1), int(y1), int(x2), int(y2))
+        self.mask = mask
+
+    def crop(self, frame):
+        """
+        View of the frame cropped to the ROI bounding box (no copy)
+        """
+        self._prepare(frame.shape)
+        x1, y1, x2, y2 = self.bbox
+        return frame[y1:y2, x1:x2]
+
+    def to_frame(self, data):
+        """
+        Map (N, 6) detections on the crop back to frame coordinates, keeping those centred inside the ROI
+        """
+        if not len(data):
+            return data
+        x1, y1 = self.bbox[:2]
+        mask_h, mask_w = self.mask.shape
+        centre_x = np.clip(((data[:, 0] + data[:, 2]) / 2).astype(np.intp), 0, mask_w - 1)
+        centre_y = np.clip(((data[:, 1] + data[:, 3]) / 2).astype(np.intp), 0, mask_h - 1)
+        data = data[self.mask[centre_y, centre_x] > 0].copy()
+        data[:, [0, 2]] += x1
+        data[:, [1, 3]] += y1
+        return data
+
+    def coverage(self):
+        """
+        Fraction of the frame area that goes to inference (after the first crop)
+        """
+        if self.frame_shape is None:
+            return None
+        x1, y1, x2, y2 = self.bbox
+        return (x2 - x1) * (y2 - y1) / float(self.frame_shape[0] * self.frame_shape[1])
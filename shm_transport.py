@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Shared-Memory Frame Transport
+Moves stream decoding out of the inference process. Decoder processes (one
+per group of cameras, a capture thread per camera inside) write decoded frames
+into per-camera ring buffers in multiprocessing.shared_memory, and the
+inference process reads the newest frame as a zero-copy NumPy view. The
+handoff uses sequence numbers in the shared header instead of queues of
+arrays, so nothing is pickled and decode and inference scale on separate cores.
+
+Ring layout (one SharedMemory block per camera):
+    header      int64[8]            write seq, decoded, read failures, reconnects, connected
+    slot meta   int64[slots, 4]     seq, height, width, held-by-reader
+    slot time   float64[slots]      time.time() of the decode
+    frames      uint8[slots, max_height * max_width * 3]
+
+The reader marks the slot it is working on as held and the writer never
+overwrites a held slot, so a view stays valid until the next read(). The
+hold/publish handshake runs under a multiprocessing.Lock shared by a decoder
+process and its readers (plain stores to shared memory give no ordering
+guarantee between processes); the frame copy itself runs outside the lock.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+from detector_metrics import FRAMES_DECODED
+from frame_grabber import stream_connector
+from thread_budget import apply_thread_budget
+
+WRITE_SEQ, DECODED, READ_FAILURES, RECONNECTS, CONNECTED = range(5)
+SEQ, HEIGHT, WIDTH, HELD = range(4)
+
+
+def _attach_block(name):
+    """
+    Attach to a block owned by another process without registering it with the resource tracker,
+    which would otherwise unlink it (or warn about a leak) when this process exits
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    # Older Pythons always register; skip it for this attach (the caller is single-threaded here)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class FrameRing:
+    def __init__(self, name=None, slots=3, max_width=1920, max_height=1080, create=False, lock=None):
+        """
+        Args:
+            name: Shared memory name to attach to (ignored when create=True)
+            slots: Frames kept in the ring; must be at least 2 (one may be held by the reader)
+            max_width, max_height: Largest frame stored; bigger frames are scaled down to fit
+            create: Allocate a new block instead of attaching
+            lock: multiprocessing.Lock shared with the other side of the ring (a thread lock if both
+                sides live in this process)
+        """
+        if slots < 2:
+            raise ValueError("A frame ring needs at least 2 slots")
+        self.slots = slots
+        self.max_width = max_width
+        self.max_height = max_height
+        self.frame_bytes = max_width * max_height * 3
+
+        meta_offset = 64
+        time_offset = meta_offset + slots * 4 * 8
+        frames_offset = (time_offset + slots * 8 + 63) // 64 * 64
+        size = frames_offset + slots * self.frame_bytes
+
+        self.owner = create
+        self.lock = lock if lock is not None else threading.Lock()
+        if create:
+            self.block = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.block = _attach_block(name)
+        self.name = self.block.name
+        buffer = self.block.buf
+        self.header = np.ndarray((8,), dtype=np.int64, buffer=buffer, offset=0)
+        self.meta = np.ndarray((slots, 4), dtype=np.int64, buffer=buffer, offset=meta_offset)
+        self.times = np.ndarray((slots,), dtype=np.float64, buffer=buffer, offset=time_offset)
+        self.frames = np.ndarray((slots, self.frame_bytes), dtype=np.uint8, buffer=buffer, offset=frames_offset)
+        if create:
+            self.header[:] = 0
+            self.meta[:] = 0
+        self.next_slot = 0
+
+    def spec(self):
+        """
+        Arguments needed to attach to this ring from another process
+        """
+        return self.name, self.slots, self.max_width, self.max_height
+
+    def _slot_view(self, slot, height, width):
+        # The first height*width*3 bytes of the slot, so the view is C-contiguous
+        return self.frames[slot, :height * width * 3].reshape(height, width, 3)
+
+    def write(self, frame):
+        """
+        Writer side: store a decoded BGR frame and publish it with the next sequence number
+        """
+        height, width = frame.shape[:2]
+        if width > self.max_width or height > self.max_height:
+            scale = min(self.max_width / width, self.max_height / height)
+            width, height = max(int(width * scale), 1), max(int(height * scale), 1)
+
+        for _ in range(self.slots):
+            slot = self.next_slot
+            self.next_slot = (self.next_slot + 1) % self.slots
+            with self.lock:
+                if self.meta[slot, HELD]:
+                    continue
+                self.meta[slot, SEQ] = 0  # Being written: readers skip the slot until it is published
+
+            view = self._slot_view(slot, height, width)
+            if frame.shape[:2] == (height, width):
+                np.copyto(view, frame)
+            else:
+                cv2.resize(frame, (width, height), dst=view, interpolation=cv2.INTER_AREA)
+            with self.lock:
+                seq = int(self.header[WRITE_SEQ]) + 1
+                self.meta[slot, HEIGHT] = height
+                self.meta[slot, WIDTH] = width
+                self.times[slot] = time.time()
+                self.meta[slot, SEQ] = seq
+                self.header[WRITE_SEQ] = seq
+            self.header[DECODED] += 1
+            return seq
+        return 0
+
+    def acquire_latest(self, after_seq=0):
+        """
+        Reader side: hold the newest slot if its sequence number is above after_seq
+        Returns (view, seq, frame_time, slot) or None
+        """
+        with self.lock:
+            seq = int(self.header[WRITE_SEQ])
+            if seq <= after_seq:
+                return None
+            slot = next((index for index in range(self.slots) if self.meta[index, SEQ] == seq), None)
+            if slot is None:
+                return None  # The newest slot is being rewritten; the next publish is close
+            self.meta[slot, HELD] = 1
+            height, width = int(self.meta[slot, HEIGHT]), int(self.meta[slot, WIDTH])
+            frame_time = float(self.times[slot])
+        return self._slot_view(slot, height, width), seq, frame_time, slot
+
+    def release(self, slot):
+        with self.lock:
+            self.meta[slot, HELD] = 0
+
+    def close(self):
+        # Views into the block must be dropped before the mapping can be closed
+        self.header = self.meta = self.times = self.frames = None
+        try:
+            self.block.close()
+        except BufferError:
+            pass  # A caller still holds a frame view; the mapping goes away with it
+        if self.owner:
+            self.block.unlink()
+
+
+def _decode_camera(ring, camera_id, stream_url, running, capture_options=None, max_failures=10):
+    """
+    Capture thread inside a decoder process: decode frames into the camera's ring
+    Dropped streams are reconnected in place with backoff (see stream_connection)
+    """
+    connector = stream_connector(stream_url, str(camera_id), capture_options)
+    cap, frame = connector.connect()
+    if cap is not None:
+        ring.header[CONNECTED] = 1
+        ring.write(frame)
+    consecutive_failures = 0
+    try:
+        while running.is_set():
+            if cap is None:
+                cap, frame = connector.reconnect(running.is_set)
+                if cap is None:
+                    break
+                ring.header[RECONNECTS] += 1
+                ring.header[CONNECTED] = 1
+                ring.write(frame)
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                ring.header[CONNECTED] = 0
+                ring.header[READ_FAILURES] += 1
+                consecutive_failures += 1
+                if consecutive_failures > max_failures:
+                    cap.release()
+                    cap = None
+                    consecutive_failures = 0
+                    continue
+                time.sleep(1)
+                continue
+            consecutive_failures = 0
+            ring.header[CONNECTED] = 1
+            ring.write(frame)
+    finally:
+        if cap is not None:
+            cap.release()
+        ring.close()
+
+
+def decoder_process(commands, stop_event, cores=None, handoff_lock=None):
+    """
+    Entry point of one decoder process; cameras are added and removed through the command queue
+    Args:
+        cores: Optional cores to pin the process to, away from the inference process
+        handoff_lock: Lock guarding the slot handshake of this process's rings (shared with the reader)
+    """
+    apply_thread_budget(cores=cores, cv2_threads=1)  # Parallelism comes from the capture threads and processes
+    workers = {}  # camera_id -> (thread, running Event)
+    while not stop_event.is_set():
+        try:
+            command = commands.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        action, camera_id = command[0], command[1]
+        if action == 'add':
+            stream_url, ring_spec, capture_options = command[2], command[3], command[4]
+            name, slots, max_width, max_height = ring_spec
+            ring = FrameRing(name, slots, max_width, max_height, lock=handoff_lock)
+            running = threading.Event()
+            running.set()
+            thread = threading.Thread(target=_decode_camera, args=(ring, camera_id, stream_url, running, capture_options),
+                                      name=f"decoder-{camera_id}", daemon=True)
+            thread.start()
+            workers[camera_id] = (thread, running)
+        elif action == 'remove' and camera_id in workers:
+            thread, running = workers.pop(camera_id)
+            running.clear()
+            thread.join(timeout=5)
+
+    for thread, running in workers.values():
+        running.clear()
+    for thread, _running in workers.values():
+        thread.join(timeout=5)
+
+
+class ShmFrameSource:
+    """
+    Inference-side reader of one camera's ring, with the same interface as LatestFrameGrabber
+    """
+    def __init__(self, manager, camera_id, stream_url, name=None, stale_after=1.0, capture_options=None):
+        self.manager = manager
+        self.camera_id = camera_id
+        self.stream_url = stream_url
+        self.capture_options = capture_options
+        self.name = name or str(camera_id)
+        self.stale_after = stale_after
+        self.ring = None
+        self.worker = None
+        self.consumed_seq = 0
+        self.held_slot = None
+        self.decoded_reported = 0  # Decoder-process count already added to this process's metrics
+
+        self.frames_dropped = 0
+        self.stale_frames = 0
+
+    def start(self, connect_timeout=10.0):
+        """
+        Hand the camera to a decoder process; returns True once the stream opened
+        (otherwise the decoder keeps reconnecting in the background)
+        """
+        self.ring, self.worker = self.manager.attach(self)
+        deadline = time.time() + connect_timeout
+        while time.time() < deadline and not self.ring.header[CONNECTED]:
+            time.sleep(0.05)
+        return bool(self.ring.header[CONNECTED])
+
+    def stop(self):
+        if self.ring is None:
+            return
+        self.manager.detach(self)
+        if self.held_slot is not None:
+            self.ring.release(self.held_slot)
+            self.held_slot = None
+        self.ring.close()
+        self.ring = None
+
+    def is_alive(self):
+        return self.ring is not None and self.worker['process'].is_alive()
+
+    def read(self, timeout=1.0):
+        """
+        Newest frame not handed out yet as a zero-copy view, valid until the next read()
+        Returns (frame, seq, frame_time) or None on timeout
+        """
+        if self.ring is None:
+            return None
+        deadline = time.time() + timeout
+        while True:
+            item = self.ring.acquire_latest(self.consumed_seq)
+            if item is not None:
+                break
+            if time.time() >= deadline:
+                return None
+            time.sleep(0.005)
+
+        view, seq, frame_time, slot = item
+        # The decoder process has its own metrics registry; export its count from here
+        decoded = int(self.ring.header[DECODED])
+        if decoded > self.decoded_reported:
+            FRAMES_DECODED.inc(decoded - self.decoded_reported, camera=self.camera_id)
+            self.decoded_reported = decoded
+        if self.held_slot is not None and self.held_slot != slot:
+            self.ring.release(self.held_slot)
+        self.held_slot = slot
+        if self.consumed_seq:
+            self.frames_dropped += seq - self.consumed_seq - 1
+        self.consumed_seq = seq
+        if time.time() - frame_time > self.stale_after:
+            self.stale_frames += 1
+        return view, seq, frame_time
+
+    def stats(self):
+        header = self.ring.header if self.ring is not None else np.zeros(8, dtype=np.int64)
+        return {
+            'connected': bool(header[CONNECTED]),
+            'framesDecoded': int(header[DECODED]),
+            'framesDropped': self.frames_dropped,
+            'staleFrames': self.stale_frames,
+            'readFailures': int(header[READ_FAILURES]),
+            'reconnects': int(header[RECONNECTS]),
+            'transport': 'shm'
+        }
+
+
+class ShmCaptureManager:
+    def __init__(self, cameras_per_process=8, slots=3, max_width=1920, max_height=1080, cores=None):
+        """
+        Args:
+            cameras_per_process: Cameras decoded by one decoder process before another is started
+            slots, max_width, max_height: Ring geometry for every camera (see FrameRing)
+            cores: Optional cores the decoder processes are pinned to
+        """
+        self.cameras_per_process = cameras_per_process
+        self.cores = cores
+        self.slots = slots
+        self.max_width = max_width
+        self.max_height = max_height
+        self.context = multiprocessing.get_context('spawn')
+        self.workers = []  # {'process', 'commands', 'stop', 'handoff_lock', 'cameras'}
+        self.lock = threading.Lock()
+
+    def open(self, camera_id, stream_url, name=None, capture_options=None):
+        """
+        Frame source for a camera, decoded in one of the decoder processes once started
+        """
+        return ShmFrameSource(self, camera_id, stream_url, name, capture_options=capture_options)
+
+    def _worker_with_room(self):
+        for worker in self.workers:
+            if len(worker['cameras']) < self.cameras_per_process and worker['process'].is_alive():
+                return worker
+        commands = self.context.Queue()
+        stop = self.context.Event()
+        handoff_lock = self.context.Lock()  # Locks can only be shared when the process is started
+        process = self.context.Process(target=decoder_process, args=(commands, stop, self.cores, handoff_lock),
+                                       name=f"decoder-{len(self.workers)}", daemon=True)
+        process.start()
+        worker = {'process': process, 'commands': commands, 'stop': stop, 'handoff_lock': handoff_lock,
+                  'cameras': set()}
+        self.workers.append(worker)
+        print(f"🧵 Decoder process {process.pid} started")
+        return worker
+
+    def attach(self, source):
+        with self.lock:
+            worker = self._worker_with_room()
+            ring = FrameRing(slots=self.slots, max_width=self.max_width, max_height=self.max_height, create=True,
+                             lock=worker['handoff_lock'])
+            worker['cameras'].add(source.camera_id)
+            worker['commands'].put(('add', source.camera_id, source.stream_url, ring.spec(),
+                                       source.capture_options))
+        return ring, worker
+
+    def detach(self, source):
+        with self.lock:
+            worker = source.worker
+            worker['cameras'].discard(source.camera_id)
+            worker['commands'].put(('remove', source.camera_id))
+
+    def close(self):
+        with self.lock:
+            for worker in self.workers:
+                worker['stop'].set()
+            for worker in self.workers:
+                worker['process'].join(timeout=10)
+                if worker['process'].is_alive():
+                    worker['process'].terminate()
+            self.workers = []
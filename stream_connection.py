@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Stream Connection Manager
+Opening a camera used to try alternative URL forms one after another, each
+with a long blocking open timeout, and a dropped stream was either reopened in
+a tight loop or ended monitoring altogether. The connector:
+
+- probes candidate URLs (as given, bare, /video, /stream) concurrently with a
+  short open timeout and keeps the first one that delivers a frame
+- caches the URL that worked per configured stream URL (optionally in a JSON
+  file, STREAM_URL_CACHE, so a restarted process connects on the first try)
+- reconnects dropped streams in place with jittered exponential backoff, so the
+  caller (and its loaded model) keeps running through network glitches
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def candidate_urls(stream_url):
+    """
+    URL forms worth trying for a camera; only HTTP streams (IP Webcam style) get alternatives
+    """
+    stream_url = str(stream_url)
+    if not stream_url.startswith(('http://', 'https://')):
+        return [stream_url]
+    base = stream_url.rstrip('/')
+    for suffix in ('/video', '/stream'):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    urls = []
+    for url in (stream_url, base, f"{base}/video", f"{base}/stream"):
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
+def _release_late_probe(future):
+    # A probe that succeeded after the winner was picked still owns an open capture
+    if not future.cancelled() and future.exception() is None and future.result() is not None:
+        future.result()[1].release()
+
+
+class Backoff:
+    def __init__(self, initial=1.0, maximum=60.0, multiplier=2.0, jitter=0.5):
+        """
+        Args:
+            initial: First retry delay in seconds
+            maximum: Upper bound of the delay
+            multiplier: Growth per failed attempt
+            jitter: Fraction of the delay drawn at random, so cameras behind one switch do not retry in lockstep
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.attempts = 0
+
+    def next_delay(self):
+        delay = min(self.initial * self.multiplier ** self.attempts, self.maximum)
+        self.attempts += 1
+        return delay * (1 - self.jitter * random.random())
+
+    def reset(self):
+        self.attempts = 0
+
+
+class UrlCache:
+    """
+    Working URL per configured stream URL, optionally persisted to a JSON file
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.urls = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as cache_file:
+                    self.urls = json.load(cache_file)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable stream URL cache {path}: {e}")
+
+    def get(self, stream_url):
+        with self.lock:
+            return self.urls.get(str(stream_url))
+
+    def set(self, stream_url, working_url):
+        with self.lock:
+            if self.urls.get(str(stream_url)) == working_url:
+                return
+            self.urls[str(stream_url)] = working_url
+            if not self.path:
+                return
+            try:
+                with open(self.path, 'w') as cache_file:
+                    json.dump(self.urls, cache_file, indent=2)
+            except OSError as e:
+                print(f"⚠️ Could not write stream URL cache {self.path}: {e}")
+
+    def forget(self, stream_url):
+        with self.lock:
+            self.urls.pop(str(stream_url), None)
+
+
+URL_CACHE = UrlCache(os.getenv('STREAM_URL_CACHE'))
+
+
+class StreamConnector:
+    def __init__(self, stream_url, open_capture, name=None, cache=URL_CACHE, probe_timeout=5.0, backoff=None):
+        """
+        Args:
+            stream_url: Configured camera URL
+            open_capture: Callable (url, timeout) -> capture with the cv2.VideoCapture interface
+            name: Label used in log lines
+            cache: UrlCache shared by all connectors (None disables caching)
+            probe_timeout: Seconds one open + first read may take
+            backoff: Backoff used between failed reconnects
+        """
+        self.stream_url = stream_url
+        self.open_capture = open_capture
+        self.name = name or str(stream_url)
+        self.cache = cache
+        self.probe_timeout = probe_timeout
+        self.backoff = backoff or Backoff(
+            initial=float(os.getenv('RECONNECT_INITIAL_DELAY', 1.0)),
+            maximum=float(os.getenv('RECONNECT_MAX_DELAY', 60.0))
+        )
+        self.active_url = None
+        self.attempts = 0
+        self.failed_attempts = 0
+
+    def _probe(self, url, settled):
+        """
+        Open url and read one frame; returns (url, cap, frame) or None
+        """
+        cap = self.open_capture(url, self.probe_timeout)
+        ret, frame = cap.read() if cap.isOpened() else (False, None)
+        if not ret or settled.is_set():
+            # Failed, or another candidate already won while this open was blocking
+            cap.release()
+            return None
+        return url, cap, frame
+
+    def _probe_all(self, urls):
+        settled = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix=f"probe-{self.name}")
+        pending = {executor.submit(self._probe, url, settled) for url in urls}
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = wait(pending, timeout=self.probe_timeout * 2, return_when=FIRST_COMPLETED)
+                if not done:
+                    break  # Opens that ignore their timeout are abandoned
+                for future in done:
+                    result = future.result()
+                    if result is not None and winner is None:
+                        winner = result
+                        settled.set()
+                    elif result is not None:
+                        result[1].release()
+        finally:
+            settled.set()
+            for future in pending:
+                future.add_done_callback(_release_late_probe)
+            executor.shutdown(wait=False)
+        return winner
+
+    def connect(self):
+        """
+        Open the stream, trying the cached URL first and then all candidates concurrently
+        Returns (cap, first_frame) or (None, None)
+        """
+        self.attempts += 1
+        cached = self.cache.get(self.stream_url) if self.cache is not None else None
+        winner = self._probe_all([cached]) if cached else None
+        if winner is None:
+            winner = self._probe_all(candidate_urls(self.stream_url))
+        if winner is None:
+            self.failed_attempts += 1
+            self.active_url = None
+            return None, None
+
+        url, cap, frame = winner
+        if url != self.active_url:
+            print(f"✅ Camera {self.name} connected via {url}")
+        self.active_url = url
+        if self.cache is not None:
+            self.cache.set(self.stream_url, url)
+        self.backoff.reset()
+        return cap, frame
+
+    def reconnect(self, running):
+        """
+        Retry connect() with jittered exponential backoff until it succeeds or running() is False
+        Returns (cap, first_frame) or (None, None) when stopped
+        """
+        while running():
+            cap, frame = self.connect()
+            if cap is not None:
+                return cap, frame
+            delay = self.backoff.next_delay()
+            print(f"🔄 Camera {self.name} unreachable, retrying in {delay:.1f}s")
+            retry_at = time.time() + delay
+            while running() and time.time() < retry_at:
+                time.sleep(0.2)
+        return None, None
+
+    def stats(self):
+        return {
+            'activeUrl': self.active_url,
+            'connectAttempts': self.attempts,
+            'failedConnects': self.failed_attempts
+        }
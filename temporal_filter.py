@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Temporal Alert Confirmation
+Per-camera multi-frame confirmation of fire/smoke scores. An alert is only
+confirmed once at least k of the last n analysed frames scored above a minimum
+and the exponential moving average of the scores is high enough, so a single
+flickering light or reflection does not produce a snapshot and an incident.
+Every hit still has to clear the old single-frame alert bar (0.8 by default), so
+confirmation only adds requirements on top of it.
+
+The state of every camera lives in a few preallocated numpy arrays (one ring
+row per camera) so keeping it for hundreds of cameras costs a few KB.
+"""
+
+import os
+
+import numpy as np
+
+
+class TemporalConfirmation:
+    def __init__(self, window=5, required=3, min_score=0.8, ema_alpha=0.4, ema_threshold=0.6, capacity=64):
+        """
+        Args:
+            window: Number of recent analysed frames kept per camera (n)
+            required: Frames in the window that must score at least min_score (k)
+            min_score: Fire/smoke confidence for a frame to count as a hit
+            ema_alpha: Weight of the newest score in the moving average
+            ema_threshold: Moving average needed to confirm (0 disables the EMA check)
+            capacity: Initial number of camera rows; grows by doubling
+        """
+        self.window = window
+        self.required = min(required, window)
+        self.min_score = min_score
+        self.ema_alpha = ema_alpha
+        self.ema_threshold = ema_threshold
+
+        self.scores = np.zeros((capacity, window), dtype=np.float32)  # Ring of recent scores per camera
+        self.positions = np.zeros(capacity, dtype=np.int32)  # Next write index in each ring
+        self.ema = np.zeros(capacity, dtype=np.float32)
+        self.rows = {}  # camera_id -> row index
+        self.free_rows = []
+
+    def _row(self, camera_id):
+        row = self.rows.get(camera_id)
+        if row is not None:
+            return row
+
+        if self.free_rows:
+            row = self.free_rows.pop()
+        else:
+            row = len(self.rows)
+            if row >= len(self.scores):
+                grow = len(self.scores)
+                self.scores = np.concatenate([self.scores, np.zeros((grow, self.window), dtype=np.float32)])
+                self.positions = np.concatenate([self.positions, np.zeros(grow, dtype=np.int32)])
+                self.ema = np.concatenate([self.ema, np.zeros(grow, dtype=np.float32)])
+        self.rows[camera_id] = row
+        return row
+
+    def update(self, camera_id, score):
+        """
+        Record one analysed frame's best fire/smoke score (0 when nothing was found)
+        Returns:
+            True when the evidence over the window confirms an alert
+        """
+        row = self._row(camera_id)
+        self.scores[row, self.positions[row]] = score
+        self.positions[row] = (self.positions[row] + 1) % self.window
+        self.ema[row] += self.ema_alpha * (score - self.ema[row])
+
+        hits = int(np.count_nonzero(self.scores[row] >= self.min_score))
+        return bool(hits >= self.required and self.ema[row] >= self.ema_threshold)
+
+    def reset(self, camera_id):
+        """
+        Clear a camera's evidence (e.g. after its stream reconnected)
+        """
+        row = self.rows.get(camera_id)
+        if row is not None:
+            self.scores[row] = 0
+            self.positions[row] = 0
+            self.ema[row] = 0
+
+    def remove(self, camera_id):
+        """
+        Release a camera's row for reuse
+        """
+        self.reset(camera_id)
+        row = self.rows.pop(camera_id, None)
+        if row is not None:
+            self.free_rows.append(row)
+
+    def state(self, camera_id):
+        row = self.rows.get(camera_id)
+        if row is None:
+            return {'hits': 0, 'window': self.window, 'required': self.required, 'ema': 0.0}
+        return {
+            'hits': int(np.count_nonzero(self.scores[row] >= self.min_score)),
+            'window': self.window,
+            'required': self.required,
+            'ema': round(float(self.ema[row]), 3)
+        }
+
+
+def confirmation_from_env():
+    """
+    TemporalConfirmation with the CONFIRM_* settings of the detector
+    """
+    return TemporalConfirmation(
+        window=int(os.getenv('CONFIRM_WINDOW', 5)),
+        required=int(os.getenv('CONFIRM_FRAMES', 3)),
+        min_score=float(os.getenv('CONFIRM_MIN_SCORE', 0.8)),
+        ema_threshold=float(os.getenv('CONFIRM_EMA_THRESHOLD', 0.6))
+    )
@@ -0,0 +1,64 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from batch_analyze import merge_video, plan_chunks
+
+
+def write_video(path, frames=50, fps=10.0):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV build cannot write MJPG video")
+    for index in range(frames):
+        writer.write(np.full((48, 64, 3), index, dtype=np.uint8))
+    writer.release()
+
+
+def write_chunk(run_dir, vid, index, records):
+    os.makedirs(run_dir / vid, exist_ok=True)
+    with open(run_dir / vid / f"chunk_{index:05d}.jsonl", 'w') as chunk_file:
+        for record in records:
+            chunk_file.write(json.dumps(record) + '\n')
+
+
+def test_chunks_start_on_sampled_frames_and_cover_the_video(tmp_path):
+    video = tmp_path / 'cam.avi'
+    write_video(video)
+    chunks, info = plan_chunks([str(video)], chunk_seconds=2, sample_fps=5)
+
+    assert [(chunk['start'], chunk['end']) for chunk in chunks] == [(0, 20), (20, 40), (40, None)]
+    assert all(chunk['step'] == 2 and chunk['start'] % chunk['step'] == 0 for chunk in chunks)
+    assert info[chunks[0]['id']]['chunks'] == 3
+
+
+def test_unreadable_videos_are_skipped(tmp_path):
+    broken = tmp_path / 'broken.mp4'
+    broken.write_bytes(b'not a video')
+    assert plan_chunks([str(broken)], chunk_seconds=2, sample_fps=5) == ([], {})
+
+
+def test_confirmation_runs_across_chunk_boundaries(tmp_path, monkeypatch):
+    monkeypatch.setenv('CONFIRM_WINDOW', '3')
+    monkeypatch.setenv('CONFIRM_FRAMES', '3')
+    monkeypatch.setenv('CONFIRM_EMA_THRESHOLD', '0')
+    hit = [[0, 0, 10, 10, 0.9, 0]]
+    write_chunk(tmp_path, 'cam-1', 0, [{'f': 0, 't': 0.0}, {'f': 5, 't': 0.5, 'd': hit},
+                                       {'f': 10, 't': 1.0, 'd': hit, 'c': 1}])  # Stale per-chunk flag
+    write_chunk(tmp_path, 'cam-1', 1, [{'f': 15, 't': 1.5, 'd': hit}, {'f': 20, 't': 2.0},
+                                       {'f': 90, 't': 9.0, 'd': [[0, 0, 10, 10, 0.95, 1]]}])
+    info = {'path': '/footage/cam.mp4', 'fps': 10.0, 'chunks': 2}
+
+    summary = merge_video(str(tmp_path), 'cam-1', info)
+
+    with open(tmp_path / summary['results']) as merged:
+        records = [json.loads(line) for line in merged]
+    assert [record['f'] for record in records] == [0, 5, 10, 15, 20, 90]
+    assert [record['f'] for record in records if 'c' in record] == [15]
+    assert summary['framesAnalysed'] == 6
+    assert summary['segments'] == [
+        {'start': 0.5, 'end': 1.5, 'maxConfidence': 0.9, 'frames': 3, 'confirmed': True},
+        {'start': 9.0, 'end': 9.0, 'maxConfidence': 0.95, 'frames': 1, 'confirmed': False},
+    ]
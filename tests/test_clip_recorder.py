@@ -0,0 +1,59 @@
+import os
+
+import cv2
+import numpy as np
+
+from clip_recorder import ClipBuffer, ClipRecorder
+
+
+def noisy_frame(seed, height=120, width=160):
+    return np.random.default_rng(seed).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def test_buffer_keeps_the_clip_frame_rate():
+    buffer = ClipBuffer(fps=4.0)
+    stored = [buffer.add(noisy_frame(0), frame_time=100 + index * 0.125) for index in range(10)]
+    assert sum(entry is not None for entry in stored) == 5
+
+
+def test_buffer_evicts_oldest_frames_over_the_byte_budget():
+    buffer = ClipBuffer(max_bytes=60 * 1024, fps=10.0)
+    for index in range(20):
+        buffer.add(noisy_frame(index), frame_time=float(index))
+    stats = buffer.stats()
+    assert stats['memoryBytes'] <= 60 * 1024 and stats['framesEvicted'] > 0
+    assert buffer.frames[-1][0] == 19.0
+
+
+def test_buffer_scales_wide_frames_down():
+    buffer = ClipBuffer(max_width=80)
+    _time, jpeg = buffer.add(noisy_frame(0), frame_time=1.0)
+    assert cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR).shape[:2] == (60, 80)
+
+
+def test_clip_covers_pre_and_post_event_frames(tmp_path):
+    recorder = ClipRecorder(output_dir=str(tmp_path), pre_seconds=2.0, post_seconds=2.0, fps=4.0)
+    start = 1000.0
+    for index in range(20):  # 5 seconds before the alert
+        recorder.add_frame('cam', noisy_frame(index), start + index * 0.25)
+    alert_time = start + 5.0
+    path = recorder.start_clip('cam', event_time=alert_time)
+    assert recorder.start_clip('cam', event_time=alert_time + 1.0) == path  # Extends the same clip
+    assert recorder.stats('cam')['recording']
+
+    for index in range(20):
+        recorder.add_frame('cam', noisy_frame(index), alert_time + index * 0.25)
+    recorder.close()
+
+    assert os.path.exists(path) and recorder.clips_written == 1
+    capture = cv2.VideoCapture(path)
+    frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    # 2s before the alert and 3s after it (extended by the second alert) at 4 fps
+    assert frames == 8 + 13
+
+
+def test_no_clip_without_buffered_frames(tmp_path):
+    recorder = ClipRecorder(output_dir=str(tmp_path))
+    assert recorder.start_clip('unknown') is None
+    recorder.close()
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import mdl
+from color_gate import ColorFlickerGate
+
+
+def dark_frame():
+    return np.full((360, 640, 3), 20, dtype=np.uint8)
+
+
+def flame_frame(bright):
+    frame = dark_frame()
+    # Orange BGR patch whose brightness flickers between frames
+    frame[100:200, 300:400] = (0, 140, 255) if bright else (0, 90, 170)
+    return frame
+
+
+def test_static_dark_scene_is_skipped_until_forced_check():
+    gate = ColorFlickerGate(force_interval=10.0)
+    assert gate.check(dark_frame(), now=1.0) == (False, [], False)
+    assert gate.check(dark_frame(), now=10.0) == (True, [], True)
+    assert gate.stats()['forcedChecks'] == 1
+
+
+def test_flickering_flame_colour_is_a_candidate_region():
+    gate = ColorFlickerGate()
+    results = [gate.check(flame_frame(index % 2 == 0), now=float(index)) for index in range(6)]
+    infer, regions, forced = results[-1]
+    assert infer and not forced and regions
+    x1, y1, x2, y2 = regions[0]
+    assert x1 <= 300 and y1 <= 100 and x2 >= 400 and y2 >= 200
+    assert gate.stats()['fireCandidates'] >= 1
+
+
+class FixedScoreBackend:
+    names = {0: 'fire'}
+    last_timings = {}
+    score = 0.0
+
+    def predict(self, frames, conf=0.25, iou=0.7):
+        return [np.array([[0, 0, 10, 10, self.score, 0]], dtype=np.float32) for _ in frames]
+
+
+@pytest.mark.parametrize('score, misses', [(0.6, 0), (0.9, 1)])
+def test_live_miss_count_uses_the_confirmation_min_score(tmp_path, monkeypatch, score, misses):
+    backend = FixedScoreBackend()
+    backend.score = score
+    monkeypatch.setenv('INCIDENT_SPOOL_PATH', str(tmp_path / 'spool.db'))
+    monkeypatch.setenv('COLOR_GATING', '1')
+    monkeypatch.setenv('MOTION_GATING', '0')
+    monkeypatch.setattr(mdl, 'create_backend', lambda *args, **kwargs: backend)
+    detector = mdl.FireSmokeDetector(api_base_url='http://127.0.0.1:9')
+    try:
+        # The first dark frame has no candidates, so it is a forced check
+        detector.process_batch([(dark_frame(), 'cam', 'Camera', 'Lab')])
+        assert detector.color_gate_stats('cam')['misses'] == misses
+    finally:
+        detector.close()
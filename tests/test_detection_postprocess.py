@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from detection_postprocess import FireSmokeFilter, box_iou, boxes_to_array, non_max_suppression
+
+NAMES = {0: 'Fire', 1: 'person', 2: 'smoke'}
+
+
+def rows(*values):
+    return np.array(values, dtype=np.float32).reshape(-1, 6)
+
+
+def test_filter_keeps_fire_and_smoke_and_finds_best():
+    data = rows([0, 0, 10, 10, 0.4, 0], [0, 0, 10, 10, 0.99, 1], [5, 5, 20, 20, 0.7, 2], [0, 0, 1, 1, 0.9, 7])
+    detections = FireSmokeFilter(NAMES).select(data)
+    assert len(detections) == 2  # person and the unknown class 7 are dropped
+    assert detections.best_label == 'smoke'
+    assert detections.best_confidence == pytest.approx(0.7)
+    assert detections.best()['bbox'] == [5, 5, 20, 20]
+
+
+def test_filter_min_confidence_and_empty_input():
+    fire_smoke = FireSmokeFilter(NAMES)
+    assert not fire_smoke.select(rows([0, 0, 10, 10, 0.4, 0]), min_confidence=0.5).found
+    empty = fire_smoke.select(None)
+    assert not empty.found and empty.best() is None and empty.best_confidence == 0.0
+
+
+def test_boxes_to_array_accepts_objects_with_data():
+    class Boxes:
+        data = [[1, 2, 3, 4, 0.5, 0, 99]]
+
+    assert boxes_to_array(Boxes()).tolist() == [[1, 2, 3, 4, 0.5, 0]]
+
+
+def test_nms_suppresses_overlaps_within_a_class_only():
+    data = rows([0, 0, 10, 10, 0.6, 0], [1, 1, 10, 10, 0.9, 0], [0, 0, 10, 10, 0.8, 2], [50, 50, 60, 60, 0.5, 0])
+    kept = non_max_suppression(data, iou_threshold=0.5)
+    assert kept[:, 4].tolist() == pytest.approx([0.9, 0.8, 0.5])
+    assert kept[:, 5].tolist() == [0, 2, 0]
+
+
+def test_nms_max_detections_and_empty():
+    data = rows(*[[i * 20, 0, i * 20 + 10, 10, 0.5, 0] for i in range(5)])
+    assert len(non_max_suppression(data, max_detections=3)) == 3
+    assert non_max_suppression(rows()).shape == (0, 6)
+
+
+def test_box_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    assert box_iou(a, b)[0] == pytest.approx([1.0, 1 / 3, 0.0], abs=1e-6)
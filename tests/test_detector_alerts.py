@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import mdl
+
+
+class FakeBackend:
+    names = {0: 'fire', 1: 'smoke'}
+    last_timings = {}
+
+    def predict(self, frames, conf=0.25, iou=0.7):
+        return [np.zeros((0, 6), dtype=np.float32) for _ in frames]
+
+
+@pytest.fixture
+def detector(tmp_path, monkeypatch):
+    monkeypatch.setenv('INCIDENT_SPOOL_PATH', str(tmp_path / 'spool.db'))
+    monkeypatch.setenv('CONFIRM_EMA_THRESHOLD', '0')
+    monkeypatch.setattr(mdl, 'create_backend', lambda *args, **kwargs: FakeBackend())
+    detector = mdl.FireSmokeDetector(api_base_url='http://127.0.0.1:9')
+    alerts = []
+    detector.handle_detection = lambda frame, camera_id, name, location, detection: alerts.append(detection)
+    detector.alerts = alerts
+    yield detector
+    detector.close()
+
+
+def run_frames(detector, data, frames=3):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    for _ in range(frames):
+        detector.evaluate_result(np.array(data, dtype=np.float32), frame, 'cam', 'Camera', 'Lab')
+
+
+def test_weak_track_never_opens_an_incident(detector):
+    # The strong box confirms the camera; the weak one must not get an incident of its own
+    run_frames(detector, [[0, 0, 50, 50, 0.5, 0], [300, 300, 400, 400, 0.9, 1]])
+    assert len(detector.alerts) == 1
+    assert detector.alerts[0]['confidence'] == pytest.approx(0.9)
+
+
+def test_strongest_track_gets_the_incident_under_cooldown(detector):
+    run_frames(detector, [[0, 0, 50, 50, 0.85, 0], [300, 300, 400, 400, 0.95, 1]])
+    assert [alert['confidence'] for alert in detector.alerts] == [pytest.approx(0.95)]
+
+
+def test_no_incident_before_confirmation(detector):
+    run_frames(detector, [[0, 0, 50, 50, 0.9, 0]], frames=2)
+    assert detector.alerts == []
@@ -0,0 +1,33 @@
+import urllib.request
+
+from detector_metrics import MetricsRegistry, start_metrics_server
+
+
+def test_counter_and_histogram_render_in_prometheus_format():
+    registry = MetricsRegistry()
+    frames = registry.counter('frames_total', 'Frames', ['camera'])
+    stage = registry.histogram('stage_seconds', 'Stage time', ['stage'], buckets=(0.01, 0.1))
+    frames.inc(camera='a')
+    frames.inc(2, camera='a')
+    frames.inc(camera='b "x"')
+    stage.observe(0.005, stage='inference')
+    stage.observe(0.05, stage='inference')
+
+    text = registry.render()
+    assert '# TYPE frames_total counter' in text
+    assert 'frames_total{camera="a"} 3' in text
+    assert 'frames_total{camera="b \\"x\\""} 1' in text
+    assert 'stage_seconds_bucket{stage="inference",le="0.01"} 1' in text
+    assert 'stage_seconds_bucket{stage="inference",le="0.1"} 2' in text
+    assert 'stage_seconds_bucket{stage="inference",le="+Inf"} 2' in text
+    assert 'stage_seconds_count{stage="inference"} 2' in text
+
+
+def test_metrics_endpoint_serves_the_shared_registry():
+    httpd = start_metrics_server(port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{httpd.server_address[1]}/metrics", timeout=5) as response:
+            assert response.status == 200
+            assert b'detector_stage_seconds' in response.read()
+    finally:
+        httpd.shutdown()
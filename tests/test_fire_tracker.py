@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from fire_tracker import IoUTracker
+
+
+def rows(*values):
+    return np.array(values, dtype=np.float32).reshape(-1, 6)
+
+
+def test_overlapping_boxes_continue_the_same_track():
+    tracker = IoUTracker('cam')
+    first = tracker.update(rows([0, 0, 100, 100, 0.6, 0]), now=0.0)
+    second = tracker.update(rows([10, 10, 110, 110, 0.9, 2]), now=1.0)
+    assert second[0] is first[0]
+    track = second[0]
+    assert track.hits == 2 and track.confidence == pytest.approx(0.9)
+    assert track.cls_id == 2  # Label follows the most confident detection
+
+
+def test_centroid_fallback_when_the_shape_changes():
+    tracker = IoUTracker('cam', iou_threshold=0.3, centroid_threshold=0.5)
+    first = tracker.update(rows([0, 0, 100, 100, 0.8, 0]), now=0.0)
+    # Tall narrow flame around the same centre: low IoU, close centre
+    second = tracker.update(rows([45, 10, 55, 90, 0.8, 0]), now=1.0)
+    assert second[0] is first[0]
+
+
+def test_separate_regions_get_separate_unique_ids():
+    tracker = IoUTracker('cam')
+    tracks = tracker.update(rows([0, 0, 10, 10, 0.8, 0], [500, 500, 510, 510, 0.8, 0]), now=0.0)
+    assert len({track.track_id for track in tracks}) == 2
+    assert all(track.track_id.startswith('cam-') for track in tracks)
+    assert IoUTracker('cam').update(rows([0, 0, 10, 10, 0.8, 0]), now=0.0)[0].track_id not in \
+        {track.track_id for track in tracks}
+
+
+def test_tracks_expire_after_max_age():
+    tracker = IoUTracker('cam', max_age=30.0)
+    first = tracker.update(rows([0, 0, 100, 100, 0.8, 0]), now=0.0)
+    assert tracker.update(rows(), now=10.0) == []
+    later = tracker.update(rows([0, 0, 100, 100, 0.8, 0]), now=45.0)
+    assert later[0] is not first[0]
+
+
+def test_update_due_on_growth_confidence_or_heartbeat():
+    tracker = IoUTracker('cam')
+    track = tracker.update(rows([0, 0, 100, 100, 0.8, 0]), now=0.0)[0]
+    track.mark_reported(0.0)
+    assert not track.update_due(5.0)  # Within the interval
+
+    tracker.update(rows([0, 0, 100, 100, 0.81, 0]), now=11.0)
+    assert not track.update_due(11.0)  # Nothing changed enough
+    tracker.update(rows([0, 0, 120, 120, 0.81, 0]), now=12.0)
+    assert track.update_due(12.0)  # Region grew by more than 20%
+    assert track.update_due(60.0)  # Heartbeat
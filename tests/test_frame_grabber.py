@@ -0,0 +1,68 @@
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from frame_grabber import LatestFrameGrabber
+
+
+def frame(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+def test_reader_gets_only_the_newest_frame_and_counts_drops():
+    grabber = LatestFrameGrabber('rtsp://camera/stream', name='cam')
+    grabber._publish(frame(1))
+    grabber._publish(frame(2))
+    grabber._publish(frame(3))
+
+    latest, seq, _ = grabber.read(timeout=0)
+    assert latest[0, 0, 0] == 3 and seq == 3
+    assert grabber.frames_dropped == 2
+    assert grabber.read(timeout=0.05) is None  # Nothing newer than what was handed out
+
+    grabber._publish(frame(4))
+    assert grabber.read(timeout=0)[1] == 4
+    assert grabber.frames_dropped == 2
+
+
+def test_old_frames_count_as_stale_and_callback_errors_are_contained():
+    calls = []
+
+    def on_frame(image, frame_time):
+        calls.append(frame_time)
+        raise RuntimeError("preview down")
+
+    grabber = LatestFrameGrabber('rtsp://camera/stream', name='cam', stale_after=0.05, on_frame=on_frame)
+    grabber._publish(frame(1))
+    time.sleep(0.1)
+    assert grabber.read(timeout=0) is not None
+    assert grabber.stats()['staleFrames'] == 1
+    assert len(calls) == 1
+
+
+def test_grabber_decodes_on_its_thread_and_reconnects_at_end_of_stream(tmp_path, monkeypatch):
+    monkeypatch.setenv('CAPTURE_BACKEND', 'opencv')
+    video = tmp_path / 'cam.avi'
+    writer = cv2.VideoWriter(str(video), cv2.VideoWriter_fourcc(*'MJPG'), 10.0, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV build cannot write MJPG video")
+    for index in range(20):
+        writer.write(np.full((48, 64, 3), index * 10, dtype=np.uint8))
+    writer.release()
+
+    grabber = LatestFrameGrabber(str(video), name='file', max_failures=0)
+    try:
+        assert grabber.start()
+        result = grabber.read(timeout=2)
+        assert result is not None and result[0].shape == (48, 64, 3)
+        deadline = time.time() + 5
+        while grabber.reconnects == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        # End of file reads like a dropped stream: every frame was decoded, then the capture reopened
+        assert grabber.frames_decoded >= 20
+        assert grabber.reconnects >= 1
+    finally:
+        grabber.stop()
+    assert not grabber.is_alive()
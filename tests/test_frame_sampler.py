@@ -0,0 +1,34 @@
+import pytest
+
+from frame_sampler import AdaptiveSampler
+
+
+def test_first_frame_is_due_and_rate_spaces_the_next():
+    sampler = AdaptiveSampler(target_fps=2.0)
+    now = sampler.started_time
+    assert sampler.due(now)
+
+    sampler.record(0.01, now=now)
+    assert not sampler.due(now + 0.4)
+    assert sampler.next_delay(now + 0.4) == pytest.approx(0.1)
+    assert sampler.due(now + 0.5)
+
+
+def test_hit_boosts_then_quiet_camera_goes_idle():
+    sampler = AdaptiveSampler(target_fps=2.0, idle_fps=0.5, boost_fps=5.0, boost_duration=10.0, idle_after=60.0)
+    start = sampler.started_time
+    assert sampler.current_fps(start + 1) == 2.0
+
+    sampler.record(0.01, confidence=0.9, now=start + 1)
+    assert sampler.current_fps(start + 5) == 5.0
+    assert sampler.boosts == 1
+
+    assert sampler.current_fps(start + 20) == 2.0
+    assert sampler.current_fps(start + 62) == 0.5
+
+
+def test_rate_is_capped_by_cpu_share():
+    sampler = AdaptiveSampler(target_fps=10.0, max_cpu_share=0.5)
+    sampler.record(0.25, now=sampler.started_time)
+    # 0.25s per frame at 50% of a core allows 2 frames per second
+    assert sampler.current_fps(sampler.started_time) == pytest.approx(2.0)
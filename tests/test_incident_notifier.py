@@ -0,0 +1,142 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from incident_notifier import IncidentNotifier
+
+
+class Sink:
+    """
+    Local stand-in for the incident API: answers `status` and records the 'n' field of each report
+    """
+    def __init__(self):
+        self.status = 200
+        self.delay = 0.0
+        self.received = []
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+                time.sleep(sink.delay)
+                status = sink.status
+                if status == 200:
+                    sink.received.append(int(parse_qs(body)['n'][0]))
+                payload = b'{"success": true}'
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/incidents"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def sink():
+    sink = Sink()
+    yield sink
+    sink.httpd.shutdown()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def make_notifier(tmp_path, **kwargs):
+    kwargs.setdefault('timeout', (1, 2))
+    kwargs.setdefault('backoff_base', 0.05)
+    kwargs.setdefault('backoff_max', 0.1)
+    return IncidentNotifier(spool_path=str(tmp_path / 'spool.db'), **kwargs)
+
+
+def test_reports_are_delivered_in_order(tmp_path, sink):
+    notifier = make_notifier(tmp_path)
+    for n in range(5):
+        notifier.enqueue(sink.url, {'n': n})
+    assert wait_until(lambda: notifier.delivered == 5)
+    notifier.close()
+    assert sink.received == [0, 1, 2, 3, 4]
+    stats = notifier.stats()
+    assert stats['enqueued'] == 5 and stats['spooled'] == 0 and stats['latencyP95Ms'] >= 0
+
+
+def test_outage_spools_and_replays_in_order(tmp_path, sink):
+    sink.status = 503
+    notifier = make_notifier(tmp_path)
+    for n in range(4):
+        notifier.enqueue(sink.url, {'n': n})
+    assert wait_until(lambda: notifier.spool_size() == 4)
+    assert notifier.failed_attempts >= 1
+
+    sink.status = 200
+    assert wait_until(lambda: notifier.delivered == 4)
+    notifier.close()
+    assert sink.received == [0, 1, 2, 3]
+
+
+def test_client_errors_are_dropped_not_retried(tmp_path, sink):
+    sink.status = 400
+    notifier = make_notifier(tmp_path)
+    notifier.enqueue(sink.url, {'n': 1})
+    assert wait_until(lambda: notifier.dropped == 1)
+    notifier.close()
+    assert notifier.spool_size() == 0
+
+
+def test_full_queue_is_spooled_by_the_worker_not_the_caller(tmp_path, sink, monkeypatch):
+    spooling_threads = []
+    spool_append = IncidentNotifier._spool_append
+
+    def recording_spool_append(self, item):
+        spooling_threads.append(threading.current_thread().name)
+        spool_append(self, item)
+
+    monkeypatch.setattr(IncidentNotifier, '_spool_append', recording_spool_append)
+    sink.status = 503
+    notifier = make_notifier(tmp_path, queue_size=1)
+    for n in range(10):
+        notifier.enqueue(sink.url, {'n': n})
+    assert notifier.stats()['enqueued'] == 10
+    assert wait_until(lambda: notifier.spool_size() == 10)
+    notifier.close()
+    assert set(spooling_threads) == {'incident-notifier'}
+
+
+def test_spool_survives_restart(tmp_path, sink):
+    sink.status = 503
+    notifier = make_notifier(tmp_path)
+    notifier.enqueue(sink.url, {'n': 7})
+    assert wait_until(lambda: notifier.spool_size() == 1)
+    notifier.close()
+
+    sink.status = 200
+    restarted = make_notifier(tmp_path)
+    assert wait_until(lambda: restarted.delivered == 1)
+    restarted.close()
+    assert sink.received == [7]
+
+
+def test_close_waits_for_the_request_in_flight(tmp_path, sink):
+    sink.delay = 0.5
+    notifier = make_notifier(tmp_path)
+    notifier.enqueue(sink.url, {'n': 1})
+    notifier.enqueue(sink.url, {'n': 2})
+    time.sleep(0.1)  # First POST is in flight
+    notifier.close(timeout=0.0)
+    assert not notifier.thread.is_alive()
+    # The in-flight report was delivered; the one still queued was spooled for the next start
+    assert sink.received == [1]
+    assert notifier.spool_size() == 1
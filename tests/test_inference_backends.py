@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from inference_backends import (ExportedYoloBackend, create_backend, exported_path, letterbox,
+                                match_detections, quantized_path)
+
+
+class FixedHeadBackend(ExportedYoloBackend):
+    """Returns the same raw (4 + classes, anchors) head output for every image"""
+    def __init__(self, head, imgsz=640):
+        super().__init__(imgsz)
+        self.head = head
+        self.blobs = []
+
+    def _run(self, blob):
+        self.blobs.append(blob)
+        return np.repeat(self.head[None], len(blob), axis=0)
+
+
+def head(anchors):
+    """anchors: [(cx, cy, w, h, class_scores...)] in letterboxed pixels"""
+    return np.array(anchors, dtype=np.float32).T
+
+
+def test_letterbox_pads_the_short_side_evenly():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    image, gain, (pad_x, pad_y) = letterbox(frame, 640)
+    assert image.shape == (640, 640, 3)
+    assert gain == 1.0
+    assert (pad_x, pad_y) == (0, 80)
+    assert (image[:80] == 114).all() and (image[-80:] == 114).all()
+
+    image, gain, pad = letterbox(np.zeros((720, 1280, 3), dtype=np.uint8), 640)
+    assert image.shape == (640, 640, 3)
+    assert gain == 0.5
+    assert pad == (0, 140)
+
+
+def test_exported_backend_cannot_be_instantiated_without_run():
+    with pytest.raises(TypeError):
+        ExportedYoloBackend()
+
+
+def test_decode_maps_boxes_back_to_frame_pixels_and_applies_nms():
+    backend = FixedHeadBackend(head([
+        (320, 320, 100, 100, 0.1, 0.9),   # smoke, kept
+        (322, 320, 100, 100, 0.1, 0.8),   # duplicate of it, suppressed
+        (100, 200, 40, 40, 0.2, 0.1),     # below conf
+    ]))
+    frames = [np.zeros((480, 640, 3), dtype=np.uint8)] * 2
+    detections = backend.predict(frames, conf=0.25)
+
+    assert backend.blobs[0].shape == (2, 3, 640, 640)
+    assert len(detections) == 2
+    for data in detections:
+        assert data.shape == (1, 6)
+        np.testing.assert_allclose(data[0, :4], [270, 190, 370, 290])
+        assert data[0, 4] == pytest.approx(0.9)
+        assert data[0, 5] == 1
+    assert set(backend.last_timings) == {'preprocess', 'inference', 'postprocess'}
+
+
+def test_decode_clips_to_the_frame_and_handles_no_detections():
+    backend = FixedHeadBackend(head([(10, 90, 60, 60, 0.95, 0.0)]))
+    data = backend.predict([np.zeros((480, 640, 3), dtype=np.uint8)], conf=0.25)[0]
+    np.testing.assert_allclose(data[0, :4], [0, 0, 40, 40])
+
+    assert backend.predict([np.zeros((480, 640, 3), dtype=np.uint8)], conf=0.99)[0].shape == (0, 6)
+
+
+def test_match_detections_counts_matches_misses_and_extras():
+    reference = np.array([[0, 0, 100, 100, 0.9, 0],
+                          [200, 200, 300, 300, 0.8, 1]], dtype=np.float32)
+    candidate = np.array([[1, 0, 100, 100, 0.88, 0],
+                          [200, 200, 300, 300, 0.8, 0],   # wrong class
+                          [400, 400, 450, 450, 0.5, 1]], dtype=np.float32)
+    matched, missing, extra, max_conf_diff = match_detections(reference, candidate)
+    assert (matched, missing, extra) == (1, 1, 2)
+    assert max_conf_diff == pytest.approx(0.02, abs=1e-6)
+
+    assert match_detections(reference, np.zeros((0, 6), dtype=np.float32)) == (0, 2, 0, 0.0)
+
+
+def test_export_paths_are_keyed_by_weights_and_input_size(tmp_path):
+    weights = tmp_path / 'best.pt'
+    weights.write_bytes(b'weights v1')
+    onnx_640 = exported_path(str(weights), 'onnx', 640)
+    assert onnx_640.endswith('-640.onnx')
+    assert exported_path(str(weights), 'onnx', 960) != onnx_640
+    assert exported_path(str(weights), 'openvino', 640).endswith('-640_openvino_model')
+    assert quantized_path(str(weights), 640) == onnx_640[:-len('.onnx')] + '-int8.onnx'
+
+    weights.write_bytes(b'weights v2')
+    assert exported_path(str(weights), 'onnx', 640) != onnx_640
+
+
+def test_create_backend_rejects_unknown_names_and_int8_outside_onnx():
+    with pytest.raises(ValueError):
+        create_backend('best.pt', 'tensorrt')
+    with pytest.raises(ValueError):
+        create_backend('best.pt', 'openvino', precision='int8')
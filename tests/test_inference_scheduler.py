@@ -0,0 +1,60 @@
+import pytest
+
+from inference_scheduler import EVIDENCE_FIRE, EVIDENCE_MOTION, EVIDENCE_NONE, InferenceScheduler
+
+
+def allocated(scheduler):
+    return {camera_id: share.allocated_fps for camera_id, share in scheduler.cameras.items()}
+
+
+def test_everyone_gets_their_rate_within_budget():
+    scheduler = InferenceScheduler(budget_fps=10.0)
+    scheduler.add_camera('a', min_fps=0.5)
+    scheduler.add_camera('b', min_fps=0.5)
+    scheduler.allocate({'a': (2.0, EVIDENCE_NONE), 'b': (3.0, EVIDENCE_NONE)}, now=1.0)
+    assert allocated(scheduler) == pytest.approx({'a': 2.0, 'b': 3.0})
+    assert not scheduler.stats()['overloaded']
+
+
+def test_leftover_goes_to_evidence_first_then_by_priority():
+    scheduler = InferenceScheduler(budget_fps=6.0)
+    scheduler.add_camera('fire', min_fps=1.0)
+    scheduler.add_camera('motion', min_fps=1.0)
+    scheduler.add_camera('quiet', priority=3.0, min_fps=1.0)
+    scheduler.allocate({'fire': (5.0, EVIDENCE_FIRE), 'motion': (5.0, EVIDENCE_MOTION),
+                        'quiet': (5.0, EVIDENCE_NONE)}, now=1.0)
+    # Minimums take 3 fps; the fire camera gets all 3 fps left over
+    assert allocated(scheduler) == pytest.approx({'fire': 4.0, 'motion': 1.0, 'quiet': 1.0})
+
+
+def test_overload_sheds_lowest_priority_first():
+    scheduler = InferenceScheduler(budget_fps=1.5)
+    scheduler.add_camera('kitchen', priority=3.0, min_fps=1.0)
+    scheduler.add_camera('car_park', priority=0.5, min_fps=1.0)
+    scheduler.allocate({'kitchen': (2.0, EVIDENCE_NONE), 'car_park': (2.0, EVIDENCE_NONE)}, now=1.0)
+    assert scheduler.cameras['car_park'].shed and scheduler.cameras['car_park'].allocated_fps == 0.0
+    assert scheduler.cameras['kitchen'].allocated_fps == pytest.approx(1.5)
+    assert scheduler.stats()['shedCameras'] == ['car_park']
+    assert scheduler.due('car_park', now=100.0) is None
+
+
+def test_measured_budget_follows_batch_cost():
+    scheduler = InferenceScheduler(utilisation=0.8)
+    assert scheduler.capacity_fps() is None
+    scheduler.record_batch(frames=4, seconds=0.4)
+    assert scheduler.capacity_fps() == pytest.approx(8.0)
+
+
+def test_order_prefers_evidence_then_priority_then_overdue():
+    scheduler = InferenceScheduler(budget_fps=100.0)
+    for camera_id, priority in (('a', 1.0), ('b', 2.0), ('c', 1.0)):
+        scheduler.add_camera(camera_id, priority=priority, min_fps=1.0)
+    scheduler.allocate({'a': (1.0, EVIDENCE_NONE), 'b': (1.0, EVIDENCE_NONE), 'c': (1.0, EVIDENCE_FIRE)}, now=1.0)
+    scheduler.record('a', frame_time=0.0, now=5.0)
+    assert scheduler.order(['a', 'b', 'c'], now=5.5) == ['c', 'b']  # 'a' was just analysed
+
+
+@pytest.mark.parametrize('settings', [{'priority': 0}, {'min_fps': -1}])
+def test_invalid_settings_are_rejected(settings):
+    with pytest.raises(ValueError):
+        InferenceScheduler().add_camera('cam', **settings)
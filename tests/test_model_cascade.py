@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from model_cascade import CascadeBackend
+
+NAMES = {0: 'fire', 1: 'smoke'}
+
+
+class ScriptedBackend:
+    """
+    Returns one box per frame whose confidence is the frame's top-left pixel / 100, in image coordinates
+    """
+    names = NAMES
+    imgsz = 64
+
+    def __init__(self, box=(10, 10, 20, 20)):
+        self.box = box
+        self.seen = []
+        self.last_timings = {}
+
+    def predict(self, frames, conf=0.25, iou=0.7):
+        self.seen.append([frame.shape[:2] for frame in frames])
+        self.last_timings = {'inference': 1.0}
+        results = []
+        for frame in frames:
+            score = frame[0, 0, 0] / 100.0
+            results.append(np.array([[*self.box, score, 0]], dtype=np.float32) if score >= conf
+                           else np.zeros((0, 6), dtype=np.float32))
+        return results
+
+
+def frame(score, size=200):
+    image = np.zeros((size, size, 3), dtype=np.uint8)
+    image[0, 0] = int(score * 100)
+    return image
+
+
+def test_only_screened_candidates_reach_the_full_model():
+    screen, confirm = ScriptedBackend(), ScriptedBackend()
+    cascade = CascadeBackend(screen, confirm, screen_threshold=0.15)
+    results = cascade.predict([frame(0.05), frame(0.5), frame(0.9)], conf=0.25)
+    assert len(confirm.seen[0]) == 2
+    assert len(results[0]) == 0 and len(results[1]) == 1 and len(results[2]) == 1
+    stats = cascade.stats()
+    assert stats['framesScreened'] == 3 and stats['framesEscalated'] == 2
+    assert cascade.last_timings['inference'] == 2.0
+
+
+def test_crop_escalation_maps_boxes_back_to_the_frame():
+    screen = ScriptedBackend(box=(150, 150, 160, 160))
+    confirm = ScriptedBackend(box=(0, 0, 5, 5))
+    cascade = CascadeBackend(screen, confirm, escalate='crop')
+    big = np.zeros((400, 400, 3), dtype=np.uint8)
+    big[0, 0] = 90
+    # The crop starts at the padded candidate box; the confirm model sees the crop's corner pixel
+    x1, y1, _x2, _y2 = cascade._crop_box(np.array([[150, 150, 160, 160]], dtype=np.float32), big.shape)
+    big[y1, x1] = 90
+    result = cascade.predict([big], conf=0.25)[0]
+    assert result[0, :4].tolist() == [x1, y1, x1 + 5, y1 + 5]
+
+
+def test_audit_counts_screen_misses():
+    screen = ScriptedBackend()
+    confirm = ScriptedBackend()
+    cascade = CascadeBackend(screen, confirm, screen_threshold=0.95, audit_fraction=1.0)
+    cascade.predict([frame(0.5)], conf=0.25)
+    assert cascade.stats()['screenMisses'] == 1
+
+
+def test_unknown_escalation_mode_is_rejected():
+    with pytest.raises(ValueError):
+        CascadeBackend(ScriptedBackend(), ScriptedBackend(), escalate='tiles')
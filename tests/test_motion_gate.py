@@ -0,0 +1,33 @@
+import numpy as np
+
+from motion_gate import MotionGate
+
+
+def frame(value=0):
+    return np.full((180, 320, 3), value, dtype=np.uint8)
+
+
+def test_static_scene_is_skipped_until_forced_check():
+    gate = MotionGate(force_interval=10.0)
+    assert gate.should_infer(frame(), now=0.0)
+    assert not gate.should_infer(frame(), now=1.0)
+    assert not gate.should_infer(frame(), now=9.0)
+    assert gate.should_infer(frame(), now=10.0)
+    assert gate.forced_inferences == 1
+    assert gate.last_change_time == 0.0  # Forced checks are not scene changes
+
+
+def test_change_runs_inference_and_updates_last_change_time():
+    gate = MotionGate()
+    gate.should_infer(frame(), now=0.0)
+    changed = frame()
+    changed[:90, :160] = 200
+    assert gate.should_infer(changed, now=1.0)
+    assert gate.last_change_time == 1.0
+
+
+def test_small_noise_stays_below_threshold():
+    gate = MotionGate(block_threshold=12.0)
+    gate.should_infer(frame(100), now=0.0)
+    assert not gate.should_infer(frame(105), now=1.0)
+    assert gate.stats()['framesSkipped'] == 1
@@ -0,0 +1,83 @@
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from preview_server import PreviewHub, start_preview_server
+
+
+def frame():
+    return np.full((120, 160, 3), 80, dtype=np.uint8)
+
+
+def feed(hub, camera_id, stop, interval=0.02):
+    while not stop.is_set():
+        hub.update_frame(camera_id, frame())
+        time.sleep(interval)
+
+
+@pytest.fixture
+def hub():
+    hub = PreviewHub({0: 'fire'}, max_fps=50.0)
+    hub.register('cam')
+    stop = threading.Event()
+    threading.Thread(target=feed, args=(hub, 'cam', stop), daemon=True).start()
+    yield hub
+    stop.set()
+
+
+def test_frames_are_not_kept_without_viewers():
+    hub = PreviewHub()
+    hub.register('cam')
+    hub.update_frame('cam', frame())
+    assert hub.cameras['cam'].frame is None
+    hub.update_frame('other', frame())  # Unregistered cameras are ignored
+    assert not hub.has_camera('other')
+
+
+def test_snapshot_is_an_annotated_jpeg(hub):
+    hub.update_detections('cam', np.array([[10, 10, 50, 50, 0.9, 0]], dtype=np.float32), confirmed=True)
+    jpeg = hub.snapshot('cam', timeout=2.0)
+    assert jpeg is not None and jpeg[:2] == b'\xff\xd8'
+    assert hub.viewers('cam') == 0 and hub.cameras['cam'].frame is None
+
+
+def test_snapshot_of_a_silent_camera_times_out():
+    hub = PreviewHub()
+    hub.register('cam')
+    started = time.time()
+    assert hub.snapshot('cam', timeout=0.3) is None
+    assert time.time() - started < 2.0
+
+
+def test_unknown_camera_raises():
+    with pytest.raises(KeyError):
+        PreviewHub().snapshot('missing', timeout=0.1)
+
+
+def test_forget_ends_open_streams(hub):
+    written = []
+    viewer = threading.Thread(target=hub.stream, args=('cam', written.append), daemon=True)
+    viewer.start()
+    time.sleep(0.3)
+    hub.forget('cam')
+    viewer.join(2.0)
+    assert not viewer.is_alive() and written
+
+
+def test_http_endpoints(hub):
+    httpd = start_preview_server(hub, port=0)
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/preview/cam.jpg", timeout=5) as response:
+            assert response.status == 200 and response.headers['Content-Type'] == 'image/jpeg'
+        with urllib.request.urlopen(f"{base}/preview", timeout=5) as response:
+            assert b'"cam"' in response.read()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{base}/preview/missing.jpg", timeout=5)
+        assert error.value.code == 404
+    finally:
+        httpd.shutdown()
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from roi_masks import RoiMask, shape_to_polygon
+
+
+def test_rectangles_and_fractions_become_pixel_polygons():
+    assert shape_to_polygon([0.5, 0.0, 1.0, 0.5], (100, 200)).tolist() == [[100, 0], [200, 0], [200, 50], [100, 50]]
+    assert shape_to_polygon([[10, 10], [500, 10], [10, 500]], (100, 200)).tolist() == [[10, 10], [200, 10], [10, 100]]
+
+
+@pytest.mark.parametrize('shapes', [[], [[0, 0, 1]], [[[0, 0], [1, 1]]], [5]])
+def test_malformed_shapes_are_rejected_up_front(shapes):
+    with pytest.raises(ValueError):
+        RoiMask(shapes)
+
+
+def test_crop_is_the_roi_bounding_box():
+    roi = RoiMask([[100, 50, 300, 250]])
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    crop = roi.crop(frame)
+    assert crop.shape[:2] == (200, 200)
+    assert np.shares_memory(crop, frame)
+    assert roi.coverage() == pytest.approx(200 * 200 / (480 * 640))
+
+
+def test_detections_map_back_and_outside_centres_are_dropped():
+    # Triangle ROI: only the lower-left half of its 200x200 bounding box is inside
+    roi = RoiMask([[[100, 100], [100, 300], [300, 300]]])
+    roi.crop(np.zeros((480, 640, 3), dtype=np.uint8))
+    data = np.array([[10, 150, 30, 170, 0.9, 0],   # Centre (20, 160) in crop: inside
+                     [150, 10, 170, 30, 0.9, 1]],  # Centre (160, 20) in crop: outside
+                    dtype=np.float32)
+    kept = roi.to_frame(data)
+    assert kept.tolist() == [[110, 250, 130, 270, pytest.approx(0.9), 0]]
+
+
+def test_mask_is_rebuilt_when_the_resolution_changes():
+    roi = RoiMask([[0.0, 0.0, 0.5, 0.5]])
+    assert roi.crop(np.zeros((100, 200, 3), dtype=np.uint8)).shape[:2] == (50, 100)
+    assert roi.crop(np.zeros((400, 800, 3), dtype=np.uint8)).shape[:2] == (200, 400)
@@ -0,0 +1,92 @@
+import multiprocessing
+import time
+
+import numpy as np
+
+from shm_transport import FrameRing
+
+
+def make_ring(**kwargs):
+    kwargs.setdefault('slots', 3)
+    kwargs.setdefault('max_width', 64)
+    kwargs.setdefault('max_height', 48)
+    return FrameRing(create=True, **kwargs)
+
+
+def solid(value, height=48, width=64):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def test_reader_gets_the_newest_frame_once():
+    ring = make_ring()
+    try:
+        assert ring.acquire_latest() is None
+        ring.write(solid(1))
+        seq = ring.write(solid(2))
+        view, got_seq, frame_time, slot = ring.acquire_latest()
+        assert got_seq == seq and int(view[0, 0, 0]) == 2 and frame_time > 0
+        ring.release(slot)
+        del view
+        assert ring.acquire_latest(after_seq=seq) is None
+    finally:
+        ring.close()
+
+
+def test_oversized_frames_are_scaled_to_fit():
+    ring = make_ring()
+    try:
+        ring.write(solid(9, height=96, width=128))
+        view, _seq, _time, slot = ring.acquire_latest()
+        assert view.shape == (48, 64, 3)
+        ring.release(slot)
+        del view
+    finally:
+        ring.close()
+
+
+def test_writer_never_overwrites_the_held_slot():
+    ring = make_ring(slots=2)
+    try:
+        ring.write(solid(5))
+        view, _seq, _time, slot = ring.acquire_latest()
+        for value in range(10, 20):
+            assert ring.write(solid(value))
+        assert int(view.min()) == int(view.max()) == 5
+        ring.release(slot)
+        del view
+    finally:
+        ring.close()
+
+
+def _write_frames(spec, lock, count):
+    name, slots, max_width, max_height = spec
+    ring = FrameRing(name, slots, max_width, max_height, lock=lock)
+    for seq in range(1, count + 1):
+        ring.write(solid(seq % 256))
+    ring.close()
+
+
+def test_cross_process_handshake_has_no_torn_frames():
+    context = multiprocessing.get_context('spawn')
+    lock = context.Lock()
+    ring = make_ring(lock=lock)
+    try:
+        writer = context.Process(target=_write_frames, args=(ring.spec(), lock, 3000))
+        writer.start()
+        frames = torn = 0
+        last_seq = 0
+        deadline = time.time() + 30
+        while (writer.is_alive() or last_seq < 3000) and time.time() < deadline:
+            held = ring.acquire_latest(last_seq)
+            if held is None:
+                continue
+            view, last_seq, _time, slot = held
+            frames += 1
+            torn += int(view.min()) != int(view.max()) or int(view[0, 0, 0]) != last_seq % 256
+            ring.release(slot)
+            del view
+        writer.join(10)
+        assert writer.exitcode == 0
+        assert frames > 0 and torn == 0
+    finally:
+        ring.close()
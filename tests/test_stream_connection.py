@@ -0,0 +1,85 @@
+import threading
+
+import numpy as np
+
+from stream_connection import Backoff, StreamConnector, UrlCache, candidate_urls
+
+
+class FakeCapture:
+    def __init__(self, works):
+        self.works = works
+        self.released = False
+
+    def isOpened(self):
+        return self.works
+
+    def read(self):
+        return (True, np.zeros((2, 2, 3), dtype=np.uint8)) if self.works else (False, None)
+
+    def release(self):
+        self.released = True
+
+
+class FakeCameras:
+    """
+    open_capture stand-in: only the URLs in `working` deliver frames
+    """
+    def __init__(self, working):
+        self.working = set(working)
+        self.opened = []
+        self.lock = threading.Lock()
+
+    def __call__(self, url, timeout):
+        capture = FakeCapture(url in self.working)
+        with self.lock:
+            self.opened.append((url, capture))
+        return capture
+
+
+def test_candidate_urls_for_http_and_rtsp():
+    assert candidate_urls('http://10.0.0.5:8080/video') == [
+        'http://10.0.0.5:8080/video', 'http://10.0.0.5:8080', 'http://10.0.0.5:8080/stream']
+    assert candidate_urls('rtsp://cam/live') == ['rtsp://cam/live']
+
+
+def test_connect_finds_the_working_url_and_caches_it():
+    cameras = FakeCameras({'http://cam/stream'})
+    cache = UrlCache()
+    connector = StreamConnector('http://cam', cameras, cache=cache, backoff=Backoff(initial=0.01))
+    capture, frame = connector.connect()
+    assert capture is not None and frame is not None
+    assert connector.active_url == 'http://cam/stream' and cache.get('http://cam') == 'http://cam/stream'
+    assert all(capture.released for url, capture in cameras.opened if url != 'http://cam/stream')
+
+    cameras.opened.clear()
+    connector.connect()
+    assert [url for url, _capture in cameras.opened] == ['http://cam/stream']  # Cached URL tried alone
+
+
+def test_reconnect_backs_off_and_stops_when_asked():
+    cameras = FakeCameras(set())
+    connector = StreamConnector('rtsp://cam/live', cameras, cache=None, backoff=Backoff(initial=0.01, maximum=0.02))
+    calls = []
+
+    def running():
+        calls.append(1)
+        return len(calls) < 20
+
+    assert connector.reconnect(running) == (None, None)
+    assert connector.failed_attempts >= 2
+    assert connector.stats()['activeUrl'] is None
+
+
+def test_backoff_grows_to_the_maximum_with_jitter():
+    backoff = Backoff(initial=1.0, maximum=8.0, multiplier=2.0, jitter=0.5)
+    delays = [backoff.next_delay() for _ in range(6)]
+    for delay, nominal in zip(delays, (1, 2, 4, 8, 8, 8)):
+        assert nominal * 0.5 <= delay <= nominal
+    backoff.reset()
+    assert backoff.next_delay() <= 1.0
+
+
+def test_url_cache_persists_to_file(tmp_path):
+    path = str(tmp_path / 'urls.json')
+    UrlCache(path).set('http://cam', 'http://cam/video')
+    assert UrlCache(path).get('http://cam') == 'http://cam/video'
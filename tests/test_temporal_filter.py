@@ -0,0 +1,52 @@
+from temporal_filter import TemporalConfirmation, confirmation_from_env
+
+
+def test_needs_k_of_n_hits():
+    confirmation = TemporalConfirmation(window=5, required=3, min_score=0.8, ema_threshold=0)
+    results = [confirmation.update('cam', score) for score in (0.9, 0.0, 0.9, 0.0, 0.9)]
+    assert results == [False, False, False, False, True]
+
+
+def test_single_spike_never_confirms():
+    confirmation = TemporalConfirmation(window=5, required=3)
+    assert not any(confirmation.update('cam', score) for score in (0.0, 0.99, 0.0, 0.0, 0.0, 0.0))
+
+
+def test_hits_below_min_score_do_not_count():
+    confirmation = TemporalConfirmation(window=3, required=3, min_score=0.8, ema_threshold=0)
+    assert not any(confirmation.update('cam', 0.79) for _ in range(10))
+
+
+def test_ema_threshold_is_required_too():
+    confirmation = TemporalConfirmation(window=5, required=1, min_score=0.8, ema_alpha=0.1, ema_threshold=0.6)
+    assert not confirmation.update('cam', 0.9)  # One hit, but the average is still low
+    assert confirmation.state('cam')['hits'] == 1
+
+
+def test_cameras_are_independent_and_rows_are_reused():
+    confirmation = TemporalConfirmation(window=2, required=2, ema_threshold=0, capacity=1)
+    confirmation.update('a', 0.9)
+    confirmation.update('b', 0.0)  # Grows past the initial capacity
+    assert confirmation.update('a', 0.9)
+    assert not confirmation.update('b', 0.9)
+
+    row = confirmation.rows['a']
+    confirmation.remove('a')
+    assert confirmation.state('a')['hits'] == 0
+    confirmation.update('c', 0.9)
+    assert confirmation.rows['c'] == row
+    assert confirmation.state('c')['hits'] == 1
+
+
+def test_reset_clears_evidence():
+    confirmation = TemporalConfirmation(window=2, required=2, ema_threshold=0)
+    confirmation.update('cam', 0.9)
+    confirmation.reset('cam')
+    assert not confirmation.update('cam', 0.9)
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv('CONFIRM_WINDOW', '7')
+    monkeypatch.setenv('CONFIRM_MIN_SCORE', '0.6')
+    confirmation = confirmation_from_env()
+    assert confirmation.window == 7 and confirmation.min_score == 0.6
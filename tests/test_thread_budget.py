@@ -0,0 +1,34 @@
+import pytest
+
+from thread_budget import budget_from_env, parse_cores, split_cores
+
+
+def test_parse_cores_ranges_and_lists():
+    assert parse_cores('0-3,8, 10-11') == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cores('2,2,1') == [1, 2]
+    with pytest.raises(ValueError):
+        parse_cores(' , ')
+
+
+def test_split_cores_into_contiguous_groups():
+    assert split_cores(3, cores=range(8)) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    assert split_cores(4, cores=[0, 1]) == [[0], [1], [0], [1]]
+    with pytest.raises(ValueError):
+        split_cores(0, cores=[0])
+
+
+def test_budget_from_env(monkeypatch):
+    for name in ('THREAD_BUDGET', 'INFERENCE_THREADS', 'OPENCV_THREADS'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('CPU_AFFINITY', '4-7')
+    assert budget_from_env() == {'threads': 4, 'cores': [4, 5, 6, 7], 'cv2_threads': 4}
+
+    monkeypatch.setenv('INFERENCE_THREADS', '2')
+    monkeypatch.setenv('OPENCV_THREADS', '1')
+    assert budget_from_env() == {'threads': 2, 'cores': [4, 5, 6, 7], 'cv2_threads': 1}
+
+
+def test_no_budget_configured(monkeypatch):
+    for name in ('THREAD_BUDGET', 'CPU_AFFINITY', 'INFERENCE_THREADS', 'OPENCV_THREADS'):
+        monkeypatch.delenv(name, raising=False)
+    assert budget_from_env() == {'threads': None, 'cores': None, 'cv2_threads': None}
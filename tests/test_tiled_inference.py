@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from detection_server import DetectionServer
+from tiled_inference import TiledInference, make_tiles, region_to_pixels, tile_offsets, validate_regions
+
+
+class BrightBoxBackend:
+    """
+    Finds the bounding box of non-zero pixels in each image, in that image's coordinates
+    """
+    names = {0: 'fire'}
+    last_timings = {}
+
+    def __init__(self):
+        self.images = 0
+
+    def predict(self, frames, conf=0.25, iou=0.7):
+        self.images += len(frames)
+        results = []
+        for frame in frames:
+            ys, xs = np.nonzero(frame.max(axis=2))
+            if len(xs):
+                results.append(np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1, 0.9, 0]], dtype=np.float32))
+            else:
+                results.append(np.zeros((0, 6), dtype=np.float32))
+        return results
+
+
+def test_tile_offsets_cover_the_length():
+    starts = tile_offsets(1920, 640, 0.2)
+    assert starts[0] == 0 and starts[-1] == 1920 - 640
+    assert all(b - a <= 640 for a, b in zip(starts, starts[1:]))
+    assert tile_offsets(500, 640, 0.2) == [0]
+
+
+def test_regions_in_fractions_and_pixels():
+    assert region_to_pixels([0.5, 0.5, 1.0, 1.0], (1000, 2000)) == (1000, 500, 2000, 1000)
+    assert region_to_pixels([100, 50, 5000, 300], (1000, 2000)) == (100, 50, 2000, 300)
+    tiles = make_tiles((2160, 3840), 640, 0.2, regions=[[0, 0, 640, 640]])
+    assert tiles == [(0, 0, 640, 640)]
+
+
+def test_tiled_predict_maps_boxes_back_and_merges_overlaps():
+    frame = np.zeros((2160, 3840, 3), dtype=np.uint8)
+    frame[600:640, 1100:1150] = 255  # Inside the overlap of four tiles
+    backend = BrightBoxBackend()
+    tiler = TiledInference(backend, tile_size=640, overlap=0.2, min_frame_size=1280)
+
+    result = tiler.predict([frame])[0]
+    assert result[:, :4].tolist() == [[1100, 600, 1150, 640]]
+    assert tiler.last_tile_count == backend.images > 1
+
+
+def test_small_frames_are_not_tiled_and_regions_limit_the_tiles():
+    backend = BrightBoxBackend()
+    tiler = TiledInference(backend, min_frame_size=1280)
+    assert tiler.plan(np.zeros((720, 1280 - 1, 3), dtype=np.uint8)) == [(0, 0, 1279, 720)]
+    assert len(tiler.plan(np.zeros((2160, 3840, 3), dtype=np.uint8), regions=[[0, 0, 0.1, 0.1]])) == 1
+
+
+@pytest.mark.parametrize('regions', [
+    [], 'x', [[0, 0, 1]], [[1, 1, 0, 0]], [['a', 0, 1, 1]], [[-1, 0, 1, 1]], [[0, 0, float('nan'), 1]]
+])
+def test_validate_regions_rejects_malformed_input(regions):
+    with pytest.raises(ValueError):
+        validate_regions(regions)
+
+
+class StubDetector:
+    def __init__(self):
+        self.tile_regions = {}
+        self.rois = {}
+
+    def set_roi(self, camera_id, shapes):
+        self.rois[camera_id] = shapes
+
+
+@pytest.mark.parametrize('settings', [
+    {'tile_regions': [[0, 0, 1]]},
+    {'roi': [[[0, 0], [1, 1]]]},
+    {'tile_regions': [[0, 0, 100, 100]], 'priority': -1},
+])
+def test_rejected_camera_leaves_no_state(settings):
+    detector = StubDetector()
+    server = DetectionServer(detector)
+    with pytest.raises(ValueError):
+        server.add_camera('cam', 'rtsp://example/stream', 'Camera', 'Lab', **settings)
+    assert detector.tile_regions == {} and detector.rois == {}
+    assert server.cameras == {} and server.scheduler.cameras == {}
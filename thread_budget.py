@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+CPU Thread Budget and Core Pinning
+torch, OpenCV and ONNX Runtime each size their thread pools to every core of
+the machine. With several detector workers on one host (mdl.py processes, or a
+detection server plus its decoder processes) that means N x cores threads
+fighting over the same cores, and context switching eats the gain. A thread
+budget gives each worker an explicit thread count and, optionally, its own
+cores:
+
+    INFERENCE_THREADS=4           torch / ONNX Runtime / OpenVINO threads
+    OPENCV_THREADS=1              cv2.setNumThreads (default: same as INFERENCE_THREADS)
+    CPU_AFFINITY=0-3              pin the worker to these cores (os.sched_setaffinity)
+    THREAD_BUDGET=auto            split the cores between DETECTOR_WORKERS workers;
+                                  this one is DETECTOR_WORKER_INDEX (0-based)
+
+Aggregate FPS of different splits (workers x threads) on this machine:
+    python thread_budget.py --model best_01.pt --images snapshots --splits 1x8 2x4 4x2 8x1
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import cv2
+
+# Pools of the BLAS/OpenMP libraries torch and numpy load; only read when the library initialises
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+
+def available_cores():
+    """
+    Cores this process may run on (respects an affinity set by the parent, taskset or a container)
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_cores(spec):
+    """
+    '0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]
+    """
+    cores = []
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cores.extend(range(int(first), int(last) + 1))
+        else:
+            cores.append(int(part))
+    if not cores:
+        raise ValueError(f"No cores in CPU affinity '{spec}'")
+    return sorted(set(cores))
+
+
+def split_cores(workers, cores=None):
+    """
+    Split cores into contiguous groups, one per worker; with more workers than cores they share
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    if workers < 1:
+        raise ValueError(f"Need at least one worker, got {workers}")
+    if workers >= len(cores):
+        return [[cores[index % len(cores)]] for index in range(workers)]
+    size, extra = divmod(len(cores), workers)
+    groups, start = [], 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        groups.append(cores[start:end])
+        start = end
+    return groups
+
+
+def budget_from_env():
+    """
+    Thread budget requested through the environment (see module docstring)
+    Returns {'threads', 'cores', 'cv2_threads'}; values are None when not configured
+    """
+    cores = None
+    if os.getenv('THREAD_BUDGET') == 'auto':
+        workers = int(os.getenv('DETECTOR_WORKERS', 1))
+        index = int(os.getenv('DETECTOR_WORKER_INDEX', 0))
+        cores = split_cores(workers)[index % workers]
+    elif os.getenv('CPU_AFFINITY'):
+        cores = parse_cores(os.getenv('CPU_AFFINITY'))
+
+    threads = int(os.getenv('INFERENCE_THREADS', 0)) or (len(cores) if cores else None)
+    cv2_threads = os.getenv('OPENCV_THREADS')
+    return {
+        'threads': threads,
+        'cores': cores,
+        'cv2_threads': int(cv2_threads) if cv2_threads else threads
+    }
+
+
+def apply_thread_budget(threads=None, cores=None, cv2_threads=None):
+    """
+    Pin this process and size the OpenCV / torch thread pools; call before the backend is created
+    (ONNX Runtime and OpenVINO take the thread count through create_backend)
+    Returns a description of what was applied
+    """
+    applied = {'threads': threads, 'cores': None, 'cv2Threads': None}
+    if cores:
+        if hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, cores)
+                applied['cores'] = sorted(os.sched_getaffinity(0))
+            except OSError as e:
+                print(f"⚠️ Could not pin to cores {cores}: {e}")
+        else:
+            print("⚠️ CPU affinity is not supported on this platform, ignoring it")
+
+    if threads:
+        for name in THREAD_ENV_VARS:
+            os.environ.setdefault(name, str(threads))
+        try:
+            import torch
+            torch.set_num_threads(threads)
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass  # Only allowed before the first parallel torch call
+        except ImportError:
+            pass
+
+    if cv2_threads is not None:
+        cv2.setNumThreads(cv2_threads)
+        applied['cv2Threads'] = cv2_threads
+    return applied
+
+
+def describe(applied):
+    parts = [f"threads={applied['threads'] or 'default'}"]
+    if applied['cores']:
+        parts.append(f"cores={','.join(str(core) for core in applied['cores'])}")
+    if applied['cv2Threads'] is not None:
+        parts.append(f"opencv={applied['cv2Threads']}")
+    return ' '.join(parts)
+
+
+def _benchmark_worker(model_path, backend_name, image_paths, threads, cores, seconds, start_event, results):
+    from inference_backends import create_backend
+
+    apply_thread_budget(threads=threads, cores=cores, cv2_threads=1)
+    backend = create_backend(model_path, backend_name, threads=threads)
+    frames = [frame for frame in (cv2.imread(path) for path in image_paths) if frame is not None]
+    backend.predict(frames[:1])  # Warm-up outside the measured window
+
+    start_event.wait()
+    started = time.perf_counter()
+    processed = 0
+    while time.perf_counter() - started < seconds:
+        backend.predict([frames[processed % len(frames)]])
+        processed += 1
+    results.put(processed / (time.perf_counter() - started))
+
+
+def benchmark_split(model_path, backend_name, image_paths, workers, threads, seconds=20.0, pin=True):
+    """
+    Run `workers` detector processes with `threads` threads each (pinned to their own cores) at the
+    same time and return per-worker and aggregate FPS
+    """
+    context = multiprocessing.get_context('spawn')
+    core_groups = split_cores(workers) if pin else [None] * workers
+    start_event = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=_benchmark_worker,
+                                 args=(model_path, backend_name, image_paths, threads, cores, seconds,
+                                       start_event, results))
+                 for cores in core_groups]
+    for process in processes:
+        process.start()
+    time.sleep(1.0)
+    start_event.set()
+    fps = [results.get(timeout=seconds + 600) for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        'workers': workers,
+        'threads': threads,
+        'pinned': pin,
+        'aggregateFps': round(sum(fps), 2),
+        'workerFps': [round(value, 2) for value in sorted(fps)]
+    }
+
+
+def main():
+    from inference_backends import BACKENDS, list_images
+
+    parser = argparse.ArgumentParser(description="Aggregate detector FPS for different worker x thread splits")
+    parser.add_argument('--model', default='best_01.pt')
+    parser.add_argument('--backend', default=os.getenv('INFERENCE_BACKEND', 'torch'), choices=BACKENDS)
+    parser.add_argument('--images', nargs='+', default=['snapshots'])
+    parser.add_argument('--splits', nargs='+', default=None,
+                        help="WORKERSxTHREADS, e.g. 1x8 2x4 4x2 (default: derived from the core count)")
+    parser.add_argument('--seconds', type=float, default=20.0, help="Measured time per split")
+    parser.add_argument('--no-pin', action='store_true', help="Do not pin workers to cores")
+    parser.add_argument('--output', default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    image_paths = list_images(args.images)
+    if not image_paths:
+        print("❌ No images found")
+        return
+
+    cores = len(available_cores())
+    if args.splits:
+        splits = [tuple(int(value) for value in split.lower().split('x')) for split in args.splits]
+    else:
+        splits = [(workers, max(cores // workers, 1)) for workers in (1, 2, 4, 8) if workers <= cores]
+    print(f"🧮 {cores} cores | {args.backend} | {len(image_paths)} images | {args.seconds:g}s per split")
+
+    results = []
+    for workers, threads in splits:
+        result = benchmark_split(args.model, args.backend, image_paths, workers, threads, args.seconds,
+                                 pin=not args.no_pin)
+        results.append(result)
+        print(f"⚙️ {workers:>2} workers x {threads:>2} threads | aggregate {result['aggregateFps']:7.1f} FPS | "
+              f"per worker {result['workerFps']}")
+
+    best = max(results, key=lambda result: result['aggregateFps'])
+    print(f"🏆 Best split: {best['workers']} workers x {best['threads']} threads "
+          f"({best['aggregateFps']} FPS)")
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'cores': cores, 'backend': args.backend, 'model': args.model, 'results': results},
+                      output_file, indent=2)
+        print(f"📝 Results written: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Tiled (Sliced) Inference
+High-resolution frames are downscaled to the model input size as a whole, so a
+small, distant smoke plume on a 4K camera can shrink to a few pixels. Tiled
+inference cuts large frames into overlapping model-sized tiles at native
+resolution, runs all tiles of the batch through the backend in shared predict
+calls and merges the boxes with cross-tile NMS.
+
+Tiles can be restricted to regions of interest per camera, so CPU cost grows
+with the monitored area instead of the sensor resolution. Regions are given as
+[x1, y1, x2, y2], either in pixels or as fractions (0-1) of the frame.
+"""
+
+import time
+
+import numpy as np
+
+from detection_postprocess import non_max_suppression
+
+_EMPTY = np.zeros((0, 6), dtype=np.float32)
+
+
+def validate_regions(regions):
+    """
+    Check a camera's tile regions before they are used: a non-empty list of [x1, y1, x2, y2]
+    with x2 > x1 and y2 > y1 and no negative values
+    Returns the regions as float lists; raises ValueError for anything else
+    """
+    if not isinstance(regions, (list, tuple)) or not regions:
+        raise ValueError(f"Tile regions need a non-empty list of [x1, y1, x2, y2], got {regions!r}")
+    parsed = []
+    for region in regions:
+        if not isinstance(region, (list, tuple)) or len(region) != 4:
+            raise ValueError(f"Tile region needs [x1, y1, x2, y2], got {region!r}")
+        try:
+            x1, y1, x2, y2 = (float(value) for value in region)
+        except (TypeError, ValueError):
+            raise ValueError(f"Tile region values must be numbers, got {region!r}")
+        if not np.isfinite([x1, y1, x2, y2]).all() or min(x1, y1) < 0 or x2 <= x1 or y2 <= y1:
+            raise ValueError(f"Tile region needs 0 <= x1 < x2 and 0 <= y1 < y2, got {region!r}")
+        parsed.append([x1, y1, x2, y2])
+    return parsed
+
+
+def region_to_pixels(region, frame_shape):
+    """
+    Clip an [x1, y1, x2, y2] region (pixels or 0-1 fractions) to integer frame pixels
+    """
+    height, width = frame_shape[:2]
+    x1, y1, x2, y2 = (float(value) for value in region)
+    if max(x1, y1, x2, y2) <= 1.0:
+        x1, x2 = x1 * width, x2 * width
+        y1, y2 = y1 * height, y2 * height
+    x1, x2 = int(np.clip(min(x1, x2), 0, width)), int(np.clip(max(x1, x2), 0, width))
+    y1, y2 = int(np.clip(min(y1, y2), 0, height)), int(np.clip(max(y1, y2), 0, height))
+    return x1, y1, x2, y2
+
+
+def tile_offsets(length, tile, overlap):
+    """
+    Start positions of overlapping tiles covering [0, length); the last tile is aligned to the end
+    """
+    if length <= tile:
+        return [0]
+    stride = max(int(tile * (1 - overlap)), 1)
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+
+def make_tiles(frame_shape, tile_size=640, overlap=0.2, regions=None):
+    """
+    Tile rectangles (x1, y1, x2, y2) covering the given regions (default: the whole frame)
+    """
+    if not regions:
+        regions = [(0, 0, frame_shape[1], frame_shape[0])]
+
+    tiles = []
+    for region in regions:
+        x1, y1, x2, y2 = region_to_pixels(region, frame_shape)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        for top in tile_offsets(y2 - y1, tile_size, overlap):
+            for left in tile_offsets(x2 - x1, tile_size, overlap):
+                tiles.append((x1 + left, y1 + top,
+                              min(x1 + left + tile_size, x2), min(y1 + top + tile_size, y2)))
+    return tiles
+
+
+class TiledInference:
+    def __init__(self, backend, tile_size=640, overlap=0.2, min_frame_size=1280, full_frame=True,
+                 max_batch=16, merge_iou=0.5):
+        """
+        Args:
+            backend: Inference backend from inference_backends.create_backend
+            tile_size: Tile edge in frame pixels (normally the model input size)
+            overlap: Fraction of a tile shared with its neighbour
+            min_frame_size: Frames whose longer side is smaller than this are not tiled
+            full_frame: Also run the downscaled full frame (catches large fires cut by tile edges);
+                not used when a camera has regions
+            max_batch: Maximum images per backend predict call
+            merge_iou: IoU above which boxes from different tiles are merged by NMS
+        """
+        self.backend = backend
+        self.names = backend.names
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.min_frame_size = min_frame_size
+        self.full_frame = full_frame
+        self.max_batch = max_batch
+        self.merge_iou = merge_iou
+        self.last_timings = {}
+        self.last_tile_count = 0
+
+    def plan(self, frame, regions=None):
+        """
+        Image rectangles to run for one frame
+        """
+        height, width = frame.shape[:2]
+        if regions:
+            return make_tiles(frame.shape, self.tile_size, self.overlap, regions)
+        if max(height, width) < self.min_frame_size:
+            return [(0, 0, width, height)]
+        tiles = make_tiles(frame.shape, self.tile_size, self.overlap)
+        if self.full_frame:
+            tiles.append((0, 0, width, height))
+        return tiles
+
+    def predict(self, frames, conf=0.25, iou=0.7, regions=None):
+        """
+        Same contract as the backends' predict: one (N, 6) array per frame in frame coordinates
+        Args:
+            regions: Optional list with, per frame, a list of regions to tile (None = whole frame)
+        """
+        regions = regions or [None] * len(frames)
+        crops, owners = [], []
+        for index, (frame, frame_regions) in enumerate(zip(frames, regions)):
+            for x1, y1, x2, y2 in self.plan(frame, frame_regions):
+                crops.append(frame[y1:y2, x1:x2])
+                owners.append((index, x1, y1))
+
+        timings = {'preprocess': 0.0, 'inference': 0.0, 'postprocess': 0.0}
+        outputs = []
+        for first in range(0, len(crops), self.max_batch):
+            outputs.extend(self.backend.predict(crops[first:first + self.max_batch], conf=conf, iou=iou))
+            for stage in timings:
+                timings[stage] += self.backend.last_timings.get(stage, 0.0)
+
+        started = time.perf_counter()
+        per_frame = [[] for _ in frames]
+        for (index, left, top), data in zip(owners, outputs):
+            if len(data):
+                data = data.copy()
+                data[:, [0, 2]] += left
+                data[:, [1, 3]] += top
+                per_frame[index].append(data)
+
+        # Boxes seen by several overlapping tiles (or by the full-frame pass) collapse into one
+        merged = [non_max_suppression(np.concatenate(parts), self.merge_iou) if parts else _EMPTY
+                  for parts in per_frame]
+        timings['postprocess'] += (time.perf_counter() - started) * 1000
+
+        self.last_timings = timings
+        self.last_tile_count = len(crops)
+        return merged